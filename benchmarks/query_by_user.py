@@ -0,0 +1,286 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2016 CERN.
+#
+# Invenio is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Benchmark of ``Group.query_by_user``.
+
+Compares the current implementation (``IN`` on a ``UNION ALL`` of the
+membership and effective admin lookups) with the previous one (``UNION`` of
+two joined queries wrapped in an outer ``IN``) and with a variant using an
+``OR`` of two correlated ``EXISTS`` on a generated dataset, and prints the
+query plan of each:
+
+.. code-block:: console
+
+   $ python benchmarks/query_by_user.py --memberships 1000000
+
+The database is a temporary SQLite file unless ``--database-uri`` is given.
+The dataset is created from scratch and dropped afterwards, so the benchmark
+refuses to run on a database which already has tables. Eager variants also
+read the members of every fetched group.
+
+Results on SQLite with 1,000,000 memberships (20,000 groups, 50,000 users,
+200 sampled users, best of 5):
+
+=========================  ===========
+variant                    ms per user
+=========================  ===========
+legacy                     4.220
+legacy, with pending       4.041
+legacy, eager              26.155
+exists                     34.247
+exists, with pending       24.221
+exists, eager              40.157
+current                    1.828
+current, with pending      1.636
+current, eager             13.438
+=========================  ===========
+
+The planner cannot turn the ``OR`` of ``EXISTS`` into index lookups: it scans
+every group and probes both tables for each of them, so its cost grows with
+the number of groups. The ``IN`` of the ``UNION ALL`` is planned as two index
+searches followed by primary key lookups of the matching groups only.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import argparse
+import os
+import random
+import tempfile
+import timeit
+from datetime import datetime
+
+from flask import Flask
+from invenio_accounts import InvenioAccounts
+from invenio_accounts.models import User
+from invenio_db import InvenioDB, db
+from sqlalchemy.orm import joinedload, selectinload
+
+from invenio_groups import InvenioGroups
+from invenio_groups.models import Group, GroupAdmin, GroupAdminClosure, \
+    Membership, MembershipState, resolve_admin_type
+
+
+def legacy_query_by_user(user, with_pending=False, eager=False):
+    """Implementation of :meth:`Group.query_by_user` before the rewrite."""
+    q1 = Group.query.join(Membership).filter_by(user_id=user.get_id())
+    if not with_pending:
+        q1 = q1.filter_by(state=MembershipState.ACTIVE)
+    if eager:
+        q1 = q1.options(joinedload(Group.members))
+
+    q2 = Group.query.join(GroupAdmin).filter_by(
+        admin_id=user.get_id(), admin_type=resolve_admin_type(user))
+    if eager:
+        q2 = q2.options(joinedload(Group.members))
+
+    query = q1.union(q2).with_entities(Group.id)
+
+    return Group.query.filter(Group.id.in_(query))
+
+
+def exists_query_by_user(user, with_pending=False, eager=False):
+    """:meth:`Group.query_by_user` with ``EXISTS`` instead of ``IN``."""
+    members = db.exists().where(db.and_(
+        Membership.id_group == Group.id,
+        Membership.user_id == user.get_id(),
+    ))
+    if not with_pending:
+        members = members.where(Membership.state == MembershipState.ACTIVE)
+
+    admins = db.exists().where(db.and_(
+        GroupAdminClosure.group_id == Group.id,
+        GroupAdminClosure.admin_type == resolve_admin_type(user),
+        GroupAdminClosure.admin_id == user.get_id(),
+    ))
+
+    query = Group.query.filter(db.or_(members, admins)).order_by(
+        Group.name, Group.id)
+    if eager:
+        query = query.options(selectinload(Group.members))
+    return query
+
+
+def explain(query):
+    """Get the query plan of a query as text."""
+    sql = str(query.statement.compile(
+        dialect=db.engine.dialect, compile_kwargs={'literal_binds': True}))
+    if db.engine.name == 'postgresql':
+        return '\n'.join(
+            row[0] for row in db.session.execute('EXPLAIN ' + sql))
+    return '\n'.join(
+        row[-1] for row in db.session.execute('EXPLAIN QUERY PLAN ' + sql))
+
+
+def create_app(database_uri):
+    """Create a minimal application."""
+    app = Flask('benchmark')
+    app.config.update(
+        SECRET_KEY='benchmark',
+        SQLALCHEMY_DATABASE_URI=database_uri,
+        SQLALCHEMY_TRACK_MODIFICATIONS=False,
+    )
+    InvenioDB(app)
+    InvenioAccounts(app)
+    InvenioGroups(app)
+    return app
+
+
+def populate(memberships, groups, users, admins_per_group, chunk_size=10000):
+    """Create users, groups, memberships and admins with bulk inserts."""
+    now = datetime.now()
+    rnd = random.Random(42)
+
+    def insert(table, rows):
+        for i in range(0, len(rows), chunk_size):
+            db.session.execute(table.insert(), rows[i:i + chunk_size])
+
+    insert(User.__table__, [
+        dict(id=i, email='user{0}@example.org'.format(i), active=True)
+        for i in range(1, users + 1)
+    ])
+    insert(Group.__table__, [
+        dict(id=i, name='group{0:07d}'.format(i), description='',
+             is_managed=False, privacy_policy='A', subscription_policy='C',
+             created=now, modified=now)
+        for i in range(1, groups + 1)
+    ])
+
+    states = [MembershipState.ACTIVE] * 8 + [
+        MembershipState.PENDING_ADMIN, MembershipState.PENDING_USER]
+    pairs = set()
+    while len(pairs) < memberships:
+        pairs.add((rnd.randint(1, users), rnd.randint(1, groups)))
+    insert(Membership.__table__, [
+        dict(user_id=user_id, id_group=group_id, state=rnd.choice(states),
+             created=now, modified=now)
+        for user_id, group_id in pairs
+    ])
+
+    admins = set()
+    for group_id in range(1, groups + 1):
+        for dummy in range(admins_per_group):
+            admins.add((rnd.randint(1, users), group_id))
+    insert(GroupAdmin.__table__, [
+        dict(group_id=group_id, admin_type='User', admin_id=user_id)
+        for user_id, group_id in admins
+    ])
+    insert(GroupAdminClosure.__table__, [
+        dict(group_id=group_id, admin_type='User', admin_id=user_id)
+        for user_id, group_id in admins
+    ])
+    db.session.commit()
+
+
+def measure(func, users, repeat, members=False):
+    """Get the best mean latency (in ms) of running func for all users.
+
+    With ``members``, the members of every fetched group are read too.
+    """
+    def run():
+        for user in users:
+            for group in func(user).all():
+                if members:
+                    group.members
+            db.session.expunge_all()
+    return min(timeit.repeat(run, number=1, repeat=repeat)) / len(users) * 1e3
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--memberships', type=int, default=100000)
+    parser.add_argument('--groups', type=int, default=None,
+                        help='Default: memberships / 50')
+    parser.add_argument('--users', type=int, default=None,
+                        help='Default: memberships / 20')
+    parser.add_argument('--admins-per-group', type=int, default=2)
+    parser.add_argument('--samples', type=int, default=200,
+                        help='Number of users to query.')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--database-uri', default=None,
+                        help='Empty database to use. Default: a temporary '
+                        'SQLite file.')
+    args = parser.parse_args()
+
+    groups = args.groups or max(args.memberships // 50, 1)
+    users = args.users or max(args.memberships // 20, 1)
+
+    path = None
+    database_uri = args.database_uri
+    if not database_uri:
+        dummy, path = tempfile.mkstemp(suffix='.db')
+        database_uri = 'sqlite:///' + path
+
+    app = create_app(database_uri)
+    try:
+        with app.app_context():
+            if db.engine.table_names():
+                parser.error('the database is not empty.')
+            db.create_all()
+            print('Populating {0} memberships, {1} groups, '
+                  '{2} users...'.format(args.memberships, groups, users))
+            populate(args.memberships, groups, users, args.admins_per_group)
+
+            sample = User.query.filter(User.id.in_(
+                random.Random(0).sample(range(1, users + 1),
+                                        min(args.samples, users)))).all()
+            for user in sample:
+                groups = set(g.id for g in Group.query_by_user(user))
+                assert groups == set(
+                    g.id for g in exists_query_by_user(user))
+                # Admin groups are only resolved transitively since the
+                # rewrite, the dataset has none.
+                assert groups == set(g.id for g in legacy_query_by_user(user))
+
+            print('{0:<28}{1:>14}'.format('variant', 'ms per user'))
+            for name, func in [
+                ('legacy', legacy_query_by_user),
+                ('exists', exists_query_by_user),
+                ('current', Group.query_by_user),
+            ]:
+                for variant, kwargs in [
+                    (name, {}),
+                    (name + ', with pending', dict(with_pending=True)),
+                    (name + ', eager', dict(eager=True)),
+                ]:
+                    print('{0:<28}{1:>14.3f}'.format(variant, measure(
+                        lambda u: func(u, **kwargs), sample, args.repeat,
+                        members=kwargs.get('eager', False))))
+            for name, func in [
+                ('legacy', legacy_query_by_user),
+                ('exists', exists_query_by_user),
+                ('current', Group.query_by_user),
+            ]:
+                print('\nQuery plan of {0}:\n{1}'.format(
+                    name, explain(func(sample[0]))))
+            db.session.remove()
+            db.drop_all()
+    finally:
+        if path:
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2016 CERN.
+#
+# Invenio is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Add member search table.
+
+The table is filled from the existing memberships.
+"""
+
+import re
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '1c9e5a3f7b28'
+down_revision = 'f8a2c6e4b1d7'
+branch_labels = ()
+depends_on = None
+
+CHUNK_SIZE = 1000
+"""Number of memberships loaded at once by the data migration."""
+
+
+def _tokens(email):
+    """Get the tokens of an email as ``MemberSearchToken.tokens`` does."""
+    email = (email or u'').strip().lower()
+    if not email:
+        return set()
+    local, dummy_at, domain = email.rpartition('@')
+    tokens = set([email])
+    if local:
+        labels = domain.split(u'.')
+        tokens.update(u'.'.join(labels[i:]) for i in range(len(labels) - 1))
+        tokens.update([local, u'@' + domain])
+    tokens.update(re.split(r'[\W_]+', email, flags=re.UNICODE))
+    tokens.discard(u'')
+    return tokens
+
+
+def _fill_members_search():
+    """Index the emails of the members of the existing groups."""
+    members = sa.table('groups_members', sa.column('id_group'),
+                       sa.column('user_id'))
+    users = sa.table('accounts_user', sa.column('id'), sa.column('email'))
+    tokens = sa.table('groups_members_search', sa.column('id_group'),
+                      sa.column('token'), sa.column('user_id'))
+    bind = op.get_bind()
+    last = None
+    while True:
+        query = sa.select([
+            members.c.id_group, members.c.user_id, users.c.email,
+        ]).select_from(members.join(
+            users, users.c.id == members.c.user_id
+        )).order_by(members.c.id_group, members.c.user_id).limit(CHUNK_SIZE)
+        if last is not None:
+            query = query.where(sa.or_(
+                members.c.id_group > last.id_group,
+                sa.and_(members.c.id_group == last.id_group,
+                        members.c.user_id > last.user_id)))
+        rows = bind.execute(query).fetchall()
+        if not rows:
+            break
+        last = rows[-1]
+        values = [dict(id_group=row.id_group, user_id=row.user_id,
+                       token=token)
+                  for row in rows for token in _tokens(row.email)]
+        if values:
+            bind.execute(tokens.insert(), values)
+
+
+def upgrade():
+    """Upgrade database."""
+    op.create_table(
+        'groups_members_search',
+        sa.Column('id_group', sa.Integer(), nullable=False),
+        sa.Column('token', sa.Unicode(length=255).with_variant(
+            sa.Unicode(length=255, collation='C'), 'postgresql'
+        ).with_variant(
+            sa.Unicode(length=255, collation='NOCASE'), 'sqlite'
+        ), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['id_group'], [u'groups.id'],
+                                ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], [u'accounts_user.id'],
+                                ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id_group', 'token', 'user_id')
+    )
+    _fill_members_search()
+
+
+def downgrade():
+    """Downgrade database."""
+    op.drop_table('groups_members_search')
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2016 CERN.
+#
+# Invenio is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Add an index on the lower-cased emails of users.
+
+MySQL has no functional indexes before 8.0 and compares emails case
+insensitively with its default collations, so it is left untouched.
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '3e8b5a0c6d91'
+down_revision = 'd2c8a4f6e1b3'
+branch_labels = ()
+depends_on = None
+
+DIALECTS = ('postgresql', 'sqlite')
+"""Databases which get the index."""
+
+
+def upgrade():
+    """Upgrade database."""
+    if op.get_bind().dialect.name in DIALECTS:
+        # Tables created from the models already have the index.
+        op.execute('CREATE INDEX IF NOT EXISTS ix_accounts_user_email_lower '
+                   'ON accounts_user (lower(email))')
+
+
+def downgrade():
+    """Downgrade database."""
+    if op.get_bind().dialect.name in DIALECTS:
+        op.drop_index('ix_accounts_user_email_lower',
+                      table_name='accounts_user')
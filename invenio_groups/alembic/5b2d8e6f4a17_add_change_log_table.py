@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2016 CERN.
+#
+# Invenio is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Add change log table."""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '5b2d8e6f4a17'
+down_revision = '7f3e2c1a9b04'
+branch_labels = ()
+depends_on = None
+
+
+def upgrade():
+    """Upgrade database."""
+    op.create_table(
+        'groups_change',
+        sa.Column('seq', sa.Integer(), nullable=False),
+        sa.Column('operation', sa.String(length=32), nullable=False),
+        sa.Column('group_id', sa.Integer(), nullable=False),
+        sa.Column('principal_type', sa.Unicode(length=255), nullable=False),
+        sa.Column('principal_id', sa.Integer(), nullable=False),
+        sa.Column('state', sa.String(length=1), nullable=True),
+        sa.Column('created', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('seq')
+    )
+    op.create_index('ix_groups_change_principal', 'groups_change',
+                    ['group_id', 'principal_type', 'principal_id'],
+                    unique=False)
+    op.create_index(op.f('ix_groups_change_created'), 'groups_change',
+                    ['created'], unique=False)
+
+
+def downgrade():
+    """Downgrade database."""
+    op.drop_index(op.f('ix_groups_change_created'),
+                  table_name='groups_change')
+    op.drop_index('ix_groups_change_principal', table_name='groups_change')
+    op.drop_table('groups_change')
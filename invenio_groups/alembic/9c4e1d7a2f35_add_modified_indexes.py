@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2016 CERN.
+#
+# Invenio is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Add indexes on modification dates."""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '9c4e1d7a2f35'
+down_revision = '5b2d8e6f4a17'
+branch_labels = ()
+depends_on = None
+
+
+def upgrade():
+    """Upgrade database."""
+    op.create_index(op.f('ix_groups_modified'), 'groups', ['modified'],
+                    unique=False)
+    op.create_index(op.f('ix_groups_members_modified'), 'groups_members',
+                    ['modified'], unique=False)
+
+
+def downgrade():
+    """Downgrade database."""
+    op.drop_index(op.f('ix_groups_members_modified'),
+                  table_name='groups_members')
+    op.drop_index(op.f('ix_groups_modified'), table_name='groups')
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2016 CERN.
+#
+# Invenio is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Add membership counters to groups.
+
+The counters are filled from the existing memberships.
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'b7d3e1f5a902'
+down_revision = 'e8a1b4d5c3f2'
+branch_labels = ()
+depends_on = None
+
+COUNTERS = (
+    ('active_members_count', 'M'),
+    ('pending_requests_count', 'A'),
+    ('pending_invitations_count', 'U'),
+)
+"""Counter columns and the membership states they count."""
+
+
+def upgrade():
+    """Upgrade database."""
+    for name, dummy_state in COUNTERS:
+        op.add_column('groups', sa.Column(
+            name, sa.Integer(), server_default='0', nullable=False))
+
+    groups = sa.table('groups', sa.column('id'),
+                      *[sa.column(name) for name, dummy_state in COUNTERS])
+    members = sa.table('groups_members', sa.column('id_group'),
+                       sa.column('state'))
+    op.execute(groups.update().values(**dict(
+        (name, sa.select([sa.func.count()]).where(sa.and_(
+            members.c.id_group == groups.c.id,
+            members.c.state == state,
+        )).as_scalar())
+        for name, state in COUNTERS
+    )))
+
+
+def downgrade():
+    """Downgrade database."""
+    for name, dummy_state in reversed(COUNTERS):
+        op.drop_column('groups', name)
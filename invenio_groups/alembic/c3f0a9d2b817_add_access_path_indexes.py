@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2016 CERN.
+#
+# Invenio is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Add indexes for the membership and admin access paths."""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'c3f0a9d2b817'
+down_revision = '1c9e5a3f7b28'
+branch_labels = ()
+depends_on = None
+
+
+def upgrade():
+    """Upgrade database."""
+    op.create_index('ix_groups_members_id_group_state', 'groups_members',
+                    ['id_group', 'state', 'user_id'], unique=False)
+    op.create_index('ix_groups_members_user_id_state', 'groups_members',
+                    ['user_id', 'state', 'id_group'], unique=False)
+    op.create_index('ix_groups_admin_admin', 'groups_admin',
+                    ['admin_type', 'admin_id', 'group_id'], unique=False)
+
+
+def downgrade():
+    """Downgrade database."""
+    op.drop_index('ix_groups_admin_admin', table_name='groups_admin')
+    op.drop_index('ix_groups_members_user_id_state',
+                  table_name='groups_members')
+    op.drop_index('ix_groups_members_id_group_state',
+                  table_name='groups_members')
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2016 CERN.
+#
+# Invenio is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Add admin closure table.
+
+The closure is filled from the existing admins and memberships.
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'd2c8a4f6e1b3'
+down_revision = 'b7d3e1f5a902'
+branch_labels = ()
+depends_on = None
+
+
+def _fill_admin_closure():
+    """Fill the admin closure from the direct admins and memberships.
+
+    See ``GroupAdminClosure`` for the rules. Only ``INSERT ... SELECT``
+    statements are used, so no row is loaded.
+    """
+    closure = sa.table('groups_admin_closure', sa.column('admin_type'),
+                       sa.column('admin_id'), sa.column('group_id'))
+    admins = sa.table('groups_admin', sa.column('group_id'),
+                      sa.column('admin_type'), sa.column('admin_id'))
+    members = sa.table('groups_members', sa.column('id_group'),
+                       sa.column('user_id'), sa.column('state'))
+    admin_group = closure.alias('admin_group')
+    known = closure.alias('known')
+    columns = ['admin_type', 'admin_id', 'group_id']
+
+    def _insert_inherited(admin_type, admin_id, source, onclause):
+        """Insert the missing admins inherited from the admin groups.
+
+        :returns: Number of inserted rows.
+        """
+        return op.get_bind().execute(closure.insert().from_select(
+            columns, sa.select([
+                admin_type, admin_id, admin_group.c.group_id,
+            ]).distinct().select_from(
+                admin_group.join(source, onclause)
+            ).where(
+                admin_group.c.admin_type == 'Group'
+            ).where(~sa.exists().where(sa.and_(
+                known.c.admin_type == admin_type,
+                known.c.admin_id == admin_id,
+                known.c.group_id == admin_group.c.group_id,
+            )))
+        )).rowcount
+
+    op.execute(closure.insert().from_select(columns, sa.select([
+        admins.c.admin_type, admins.c.admin_id, admins.c.group_id,
+    ]).where(admins.c.admin_type.isnot(None))))
+
+    # Admins of admin groups, one level per statement until none is missing.
+    while _insert_inherited(
+            sa.literal(u'Group'), admins.c.admin_id, admins, sa.and_(
+                admins.c.group_id == admin_group.c.admin_id,
+                admins.c.admin_type == 'Group')):
+        pass
+    _insert_inherited(
+        admins.c.admin_type, admins.c.admin_id, admins, sa.and_(
+            admins.c.group_id == admin_group.c.admin_id,
+            admins.c.admin_type != 'Group'))
+    _insert_inherited(
+        sa.literal(u'User'), members.c.user_id, members, sa.and_(
+            members.c.id_group == admin_group.c.admin_id,
+            members.c.state == 'M'))
+
+
+def upgrade():
+    """Upgrade database."""
+    op.create_table(
+        'groups_admin_closure',
+        sa.Column('admin_type', sa.Unicode(length=255), nullable=False),
+        sa.Column('admin_id', sa.Integer(), nullable=False),
+        sa.Column('group_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['group_id'], [u'groups.id'],
+                                ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('admin_type', 'admin_id', 'group_id')
+    )
+    op.create_index(op.f('ix_groups_admin_closure_group_id'),
+                    'groups_admin_closure', ['group_id'], unique=False)
+    _fill_admin_closure()
+
+
+def downgrade():
+    """Downgrade database."""
+    op.drop_index(op.f('ix_groups_admin_closure_group_id'),
+                  table_name='groups_admin_closure')
+    op.drop_table('groups_admin_closure')
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2016 CERN.
+#
+# Invenio is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Delete the memberships and admins of groups with the groups."""
+
+from alembic import op
+from sqlalchemy.engine.reflection import Inspector
+
+# revision identifiers, used by Alembic.
+revision = 'e5f1b7c3d9a4'
+down_revision = '3e8b5a0c6d91'
+branch_labels = ()
+depends_on = None
+
+CASCADES = (
+    ('groups_members', 'id_group'),
+    ('groups_admin', 'group_id'),
+)
+"""Foreign keys to groups which get ON DELETE CASCADE."""
+
+
+def _replace_foreign_key(table, column, ondelete):
+    """Recreate the foreign key from a column to groups."""
+    name = 'fk_{0}_{1}_groups'.format(table, column)
+    if op.get_bind().dialect.name == 'sqlite':
+        # SQLite cannot alter constraints, the table is copied instead. The
+        # naming convention names the reflected (unnamed) foreign keys.
+        with op.batch_alter_table(table, naming_convention={
+            'fk': 'fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s'
+        }) as batch_op:
+            batch_op.drop_constraint(name, type_='foreignkey')
+            batch_op.create_foreign_key(
+                name, 'groups', [column], ['id'], ondelete=ondelete)
+        return
+
+    inspector = Inspector.from_engine(op.get_bind())
+    for fk in inspector.get_foreign_keys(table):
+        if fk['constrained_columns'] == [column]:
+            op.drop_constraint(fk['name'], table, type_='foreignkey')
+    op.create_foreign_key(
+        name, table, 'groups', [column], ['id'], ondelete=ondelete)
+
+
+def upgrade():
+    """Upgrade database."""
+    for table, column in CASCADES:
+        _replace_foreign_key(table, column, 'CASCADE')
+
+
+def downgrade():
+    """Downgrade database."""
+    for table, column in CASCADES:
+        _replace_foreign_key(table, column, None)
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2016 CERN.
+#
+# Invenio is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Create groups tables."""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'e8a1b4d5c3f2'
+down_revision = 'a1a28be1b2c5'
+branch_labels = ()
+depends_on = '9848d0149abd'
+
+
+def upgrade():
+    """Upgrade database."""
+    op.create_table(
+        'groups',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=255), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('is_managed', sa.Boolean(name='is_managed'),
+                  nullable=False),
+        sa.Column('privacy_policy', sa.String(length=1), nullable=False),
+        sa.Column('subscription_policy', sa.String(length=1),
+                  nullable=False),
+        sa.Column('created', sa.DateTime(), nullable=False),
+        sa.Column('modified', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_groups_name'), 'groups', ['name'], unique=True)
+    op.create_table(
+        'groups_admin',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('group_id', sa.Integer(), nullable=False),
+        sa.Column('admin_type', sa.Unicode(length=255), nullable=True),
+        sa.Column('admin_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['group_id'], [u'groups.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('group_id', 'admin_type', 'admin_id')
+    )
+    op.create_table(
+        'groups_members',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('id_group', sa.Integer(), nullable=False),
+        sa.Column('state', sa.String(length=1), nullable=False),
+        sa.Column('created', sa.DateTime(), nullable=False),
+        sa.Column('modified', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['id_group'], [u'groups.id'], ),
+        sa.ForeignKeyConstraint(['user_id'], [u'accounts_user.id'], ),
+        sa.PrimaryKeyConstraint('user_id', 'id_group')
+    )
+
+
+def downgrade():
+    """Downgrade database."""
+    op.drop_table('groups_members')
+    op.drop_table('groups_admin')
+    op.drop_index(op.f('ix_groups_name'), table_name='groups')
+    op.drop_table('groups')
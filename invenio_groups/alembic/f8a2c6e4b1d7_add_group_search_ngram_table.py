@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2016 CERN.
+#
+# Invenio is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Add group search table and trigram indexes.
+
+On PostgreSQL, groups are searched with trigram indexes on their names and
+descriptions; elsewhere the n-gram table is filled from the existing groups.
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'f8a2c6e4b1d7'
+down_revision = 'e5f1b7c3d9a4'
+branch_labels = ()
+depends_on = None
+
+CHUNK_SIZE = 1000
+"""Number of groups loaded at once by the data migration."""
+
+
+def _ngrams(name, description):
+    """Get the trigrams of a group as ``GroupSearchNGram.ngrams`` does."""
+    text = u' '.join(
+        u' '.join(t.lower().split()) for t in (name, description) if t)
+    return set(text[i:i + 3] for i in range(len(text) - 2))
+
+
+def _fill_search_ngrams():
+    """Index the names and descriptions of the existing groups."""
+    groups = sa.table('groups', sa.column('id'), sa.column('name'),
+                      sa.column('description'))
+    ngrams = sa.table('groups_search_ngram', sa.column('ngram'),
+                      sa.column('group_id'))
+    bind = op.get_bind()
+    last_id = 0
+    while True:
+        rows = bind.execute(sa.select([
+            groups.c.id, groups.c.name, groups.c.description,
+        ]).where(groups.c.id > last_id).order_by(groups.c.id).limit(
+            CHUNK_SIZE)).fetchall()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        values = [dict(ngram=ngram, group_id=row.id) for row in rows
+                  for ngram in _ngrams(row.name, row.description)]
+        if values:
+            bind.execute(ngrams.insert(), values)
+
+
+def upgrade():
+    """Upgrade database."""
+    op.create_table(
+        'groups_search_ngram',
+        sa.Column('ngram', sa.Unicode(length=3), nullable=False),
+        sa.Column('group_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['group_id'], [u'groups.id'],
+                                ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('ngram', 'group_id')
+    )
+    op.create_index(op.f('ix_groups_search_ngram_group_id'),
+                    'groups_search_ngram', ['group_id'], unique=False)
+
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        op.execute('CREATE INDEX ix_groups_name_trgm ON groups '
+                   'USING gin (lower(name) gin_trgm_ops)')
+        op.execute('CREATE INDEX ix_groups_description_trgm ON groups '
+                   'USING gin (lower(description) gin_trgm_ops)')
+    else:
+        _fill_search_ngrams()
+
+
+def downgrade():
+    """Downgrade database."""
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_index('ix_groups_description_trgm', table_name='groups')
+        op.drop_index('ix_groups_name_trgm', table_name='groups')
+
+    op.drop_index(op.f('ix_groups_search_ngram_group_id'),
+                  table_name='groups_search_ngram')
+    op.drop_table('groups_search_ngram')
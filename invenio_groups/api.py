@@ -21,8 +21,8 @@
 
 from __future__ import absolute_import, print_function
 
-from .models import Group, GroupAdmin, Membership, MembershipState, \
-    PrivacyPolicy, SubscriptionPolicy
+from .models import Group, GroupAdmin, InvitationStatus, Membership, \
+    MembershipState, PrivacyPolicy, SubscriptionPolicy
 
-__all__ = ('GroupAdmin', 'Group', 'Membership', 'MembershipState',
-           'PrivacyPolicy', 'SubscriptionPolicy')
+__all__ = ('GroupAdmin', 'Group', 'InvitationStatus', 'Membership',
+           'MembershipState', 'PrivacyPolicy', 'SubscriptionPolicy')
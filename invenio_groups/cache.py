@@ -0,0 +1,284 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2016 CERN.
+#
+# Invenio is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Caches of per-user group data."""
+
+from __future__ import absolute_import, print_function
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from .models import Group, Membership
+
+
+class CacheBackend(object):
+    """Interface of cache backends.
+
+    It is a subset of :class:`werkzeug.contrib.cache.BaseCache`, so any
+    Werkzeug cache (e.g. ``RedisCache``) can be used as a backend. Values are
+    strings or lists of integers.
+    """
+
+    def get(self, key):
+        """Get a value.
+
+        :param key: Cache key.
+        :returns: The value or None if the key is not cached.
+        """
+        raise NotImplementedError()
+
+    def set(self, key, value, timeout=None):
+        """Set a value.
+
+        :param key: Cache key.
+        :param value: Value to cache.
+        :param timeout: Number of seconds to keep the value. Default: the
+            default timeout of the backend.
+        """
+        raise NotImplementedError()
+
+    def delete_many(self, *keys):
+        """Delete values.
+
+        :param keys: Cache keys.
+        """
+        raise NotImplementedError()
+
+
+class LRUCache(CacheBackend):
+    """In-process least recently used cache with expiration.
+
+    Safe to share between threads of a process.
+    """
+
+    def __init__(self, maxsize=10000, default_timeout=300):
+        """Initialize the cache.
+
+        :param maxsize: Maximum number of cached keys.
+        :param default_timeout: Default number of seconds to keep a value.
+            ``0`` or None keeps values until they are evicted.
+        """
+        self.maxsize = maxsize
+        self.default_timeout = default_timeout
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Get a value and mark it as recently used."""
+        with self._lock:
+            item = self._data.pop(key, None)
+            if item is None:
+                return None
+            value, expires = item
+            if expires and expires < time.time():
+                return None
+            self._data[key] = item
+            return value
+
+    def set(self, key, value, timeout=None):
+        """Set a value, evicting the least recently used ones if needed."""
+        if timeout is None:
+            timeout = self.default_timeout
+        expires = time.time() + timeout if timeout else None
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = (value, expires)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete_many(self, *keys):
+        """Delete values."""
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        """Delete all values."""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        """Get number of cached keys (including expired ones)."""
+        return len(self._data)
+
+
+def lru_backend_factory(app):
+    """Create the in-process LRU backend configured for the application."""
+    return LRUCache(
+        maxsize=app.config['GROUPS_CACHE_LRU_MAXSIZE'],
+        default_timeout=app.config['GROUPS_CACHE_TIMEOUT'],
+    )
+
+
+class UserGroupsCache(object):
+    """Cache of the groups a user is an active member or an admin of.
+
+    Entries are invalidated by the data models whenever memberships or admins
+    of a user change. A version stamp of each user is kept and replaced
+    at the same time, so that copies kept elsewhere (e.g. the group needs
+    stored in the session, see :mod:`invenio_groups.permissions`) can be
+    checked with one cache lookup.
+    """
+
+    key_prefix = 'invenio_groups:user_groups:'
+    """Prefix of the cache keys."""
+
+    version_key_prefix = 'invenio_groups:user_groups_version:'
+    """Prefix of the cache keys of the version stamps."""
+
+    def __init__(self, backend, timeout=None):
+        """Initialize the cache.
+
+        :param backend: A :class:`CacheBackend`.
+        :param timeout: Number of seconds to keep values. Default: the default
+            timeout of the backend.
+        """
+        self.backend = backend
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, user_id):
+        """Get the cache key of a user."""
+        return '{0}{1}'.format(self.key_prefix, user_id)
+
+    def get(self, user_id):
+        """Get identifiers of the groups of a user.
+
+        :param user_id: User identifier.
+        :returns: Frozen set of group identifiers.
+        """
+        user_id = int(user_id)
+        value = self.backend.get(self._key(user_id))
+        if value is not None:
+            self.hits += 1
+            return frozenset(value)
+
+        self.misses += 1
+        groups_ids = frozenset(
+            row[0] for row in Group.query_ids_by_user(user_id))
+        self.backend.set(self._key(user_id), sorted(groups_ids),
+                         timeout=self.timeout)
+        return groups_ids
+
+    def version(self, user_id):
+        """Get the version stamp of the groups of a user.
+
+        A new stamp is created if the user has none, e.g. after an
+        invalidation, an eviction or an expiration, so a stamp never matches
+        groups computed before a change. Stamps expire like the cached groups,
+        so that changes which were not invalidated in this cache (e.g. made by
+        another process with an in-process backend) are picked up too.
+
+        :param user_id: User identifier.
+        :returns: String.
+        """
+        key = '{0}{1}'.format(self.version_key_prefix, int(user_id))
+        value = self.backend.get(key)
+        if value is None:
+            value = uuid.uuid4().hex
+            self.backend.set(key, value, timeout=self.timeout)
+        return value
+
+    def invalidate(self, users_ids):
+        """Invalidate the cached groups and the version stamps of users.
+
+        :param users_ids: Iterable of user identifiers.
+        """
+        users_ids = [int(user_id) for user_id in users_ids]
+        keys = [self._key(user_id) for user_id in users_ids]
+        keys.extend('{0}{1}'.format(self.version_key_prefix, user_id)
+                    for user_id in users_ids)
+        if keys:
+            self.backend.delete_many(*keys)
+
+    def stats(self):
+        """Get hit and miss counters of the current process.
+
+        :returns: Dictionary with ``hits``, ``misses`` and ``hit_ratio``.
+        """
+        total = self.hits + self.misses
+        return dict(
+            hits=self.hits,
+            misses=self.misses,
+            hit_ratio=float(self.hits) / total if total else 0.0,
+        )
+
+
+class BadgeCountsCache(object):
+    """Short-lived cache of the pending requests and invitations of users.
+
+    The data models invalidate the entries of the users whose pending
+    memberships change, including every effective admin of a group whose
+    requests change (see
+    :func:`invenio_groups.models.invalidate_badge_counts`).
+    Changes made without the models (e.g. with raw SQL) are only seen after
+    the timeout. A timeout of ``0`` or None disables the cache.
+    """
+
+    key_prefix = 'invenio_groups:badge_counts:'
+    """Prefix of the cache keys."""
+
+    def __init__(self, backend, timeout=None):
+        """Initialize the cache.
+
+        :param backend: A :class:`CacheBackend`.
+        :param timeout: Number of seconds to keep values.
+        """
+        self.backend = backend
+        self.timeout = timeout
+
+    def _key(self, user_id):
+        """Get the cache key of a user."""
+        return '{0}{1}'.format(self.key_prefix, user_id)
+
+    def get(self, user):
+        """Get the number of pending requests and invitations of a user.
+
+        :param user: User object.
+        :returns: Dictionary with ``requests`` and ``invitations``.
+        """
+        if not self.timeout:
+            return Membership.badge_counts(user)
+
+        key = self._key(int(user.get_id()))
+        value = self.backend.get(key)
+        if value is not None:
+            return dict(requests=value[0], invitations=value[1])
+
+        counts = Membership.badge_counts(user)
+        self.backend.set(key, [counts['requests'], counts['invitations']],
+                         timeout=self.timeout)
+        return counts
+
+    def invalidate(self, users_ids):
+        """Invalidate the cached counts of users.
+
+        :param users_ids: Iterable of user identifiers.
+        """
+        keys = [self._key(int(user_id)) for user_id in users_ids]
+        if keys and self.timeout:
+            self.backend.delete_many(*keys)
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2016 CERN.
+#
+# Invenio is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Click command-line interface for groups management."""
+
+from __future__ import absolute_import, print_function
+
+from datetime import datetime, timedelta
+
+import click
+from flask.cli import with_appcontext
+from invenio_db import db
+
+from .export import EXPORT_FORMATS, export
+from .importer import IMPORT_FORMATS, load
+from .models import Group, GroupAdminClosure, GroupChange, GroupSearchNGram, \
+    MemberSearchToken
+from .tasks import delete_group
+
+
+@click.group()
+def groups():
+    """Manage groups."""
+
+
+@groups.command('repair-counters')
+@click.option('--group', '-g', 'names', multiple=True,
+              help='Name of a group to repair. Default: all groups.')
+@with_appcontext
+def repair_counters(names):
+    """Recompute the membership counters of groups."""
+    groups_ids = None
+    if names:
+        groups_ids = [g.id for g in Group.query_by_names(list(names))]
+
+    count = Group.repair_counters(groups_ids)
+    db.session.commit()
+    click.secho('Repaired membership counters of {0} group(s).'.format(count),
+                fg='green')
+
+
+@groups.command('rebuild-admin-closure')
+@with_appcontext
+def rebuild_admin_closure():
+    """Recompute the effective admins of all groups."""
+    changed = GroupAdminClosure.rebuild()
+    db.session.commit()
+    click.secho('Updated {0} effective admin row(s).'.format(len(changed)),
+                fg='green')
+
+
+@groups.command('reindex-search')
+@with_appcontext
+def reindex_search():
+    """Rebuild the search indexes of groups and group members."""
+    groups_count = GroupSearchNGram.reindex()
+    members_count = MemberSearchToken.reindex()
+    db.session.commit()
+    click.secho('Indexed {0} group(s) and {1} membership(s).'.format(
+        groups_count, members_count), fg='green')
+
+
+@groups.command('delete')
+@click.argument('name')
+@click.option('--chunk-size', default=1000, show_default=True,
+              help='Number of rows deleted per transaction.')
+@click.option('--background', is_flag=True, default=False,
+              help='Delete the group in a Celery task.')
+@with_appcontext
+def delete(name, chunk_size, background):
+    """Delete a group and its memberships in chunks."""
+    group = Group.get_by_name(name)
+    if group is None:
+        raise click.BadParameter('Group {0} does not exist.'.format(name))
+
+    if background:
+        result = delete_group.delay(group.id, chunk_size=chunk_size)
+        click.secho('Deleting group in task {0}.'.format(result.id),
+                    fg='green')
+        return
+
+    def progress(deleted, total):
+        click.echo('Deleted {0}/{1} row(s).'.format(deleted, total))
+
+    group.delete_in_chunks(chunk_size=chunk_size, progress=progress)
+    click.secho('Deleted group {0}.'.format(name), fg='green')
+
+
+@groups.command('export')
+@click.option('--group', '-g', 'names', multiple=True,
+              help='Name of a group to export. Default: all groups.')
+@click.option('--format', '-f', 'fmt', default='csv', show_default=True,
+              type=click.Choice(list(EXPORT_FORMATS)),
+              help='Output format.')
+@click.option('--output', '-o', type=click.File('w', encoding='utf-8'),
+              default='-', help='Output file. Default: standard output.')
+@click.option('--chunk-size', default=1000, show_default=True,
+              help='Number of memberships fetched per query.')
+@with_appcontext
+def export_memberships(names, fmt, output, chunk_size):
+    """Export memberships as CSV or JSON Lines."""
+    groups_ids = None
+    if names:
+        groups = Group.query_by_names(list(names)).all()
+        missing = set(names) - set(g.name for g in groups)
+        if missing:
+            raise click.BadParameter('Group(s) {0} do not exist.'.format(
+                ', '.join(sorted(missing))))
+        groups_ids = [g.id for g in groups]
+
+    for line in export(fmt, groups_ids=groups_ids, chunk_size=chunk_size):
+        output.write(line)
+
+
+@groups.command('import')
+@click.argument('source', type=click.File('r', encoding='utf-8'))
+@click.option('--format', '-f', 'fmt', default='csv', show_default=True,
+              type=click.Choice(list(IMPORT_FORMATS)),
+              help='Input format.')
+@click.option('--batch-size', default=1000, show_default=True,
+              help='Number of records committed at once.')
+@click.option('--chunk-size', default=500, show_default=True,
+              help='Number of rows resolved or written per statement.')
+@with_appcontext
+def import_memberships(source, fmt, batch_size, chunk_size):
+    """Import memberships and admins from CSV or JSON Lines."""
+    def progress(stats):
+        click.echo('Processed {processed} record(s): {created} created, '
+                   '{updated} updated, {admins} admin(s), {rejected} '
+                   'rejected.'.format(**stats))
+
+    def reject(line_num, reason):
+        click.secho('Line {0}: {1}'.format(line_num, reason), fg='red',
+                    err=True)
+
+    stats = load(IMPORT_FORMATS[fmt](source), batch_size=batch_size,
+                 chunk_size=chunk_size, progress=progress, reject=reject)
+    click.secho('Loaded {0}/{1} record(s).'.format(
+        stats['loaded'], stats['processed']), fg='green')
+
+
+@groups.command('compact-changes')
+@click.option('--days', default=30, show_default=True,
+              help='Compact the change log entries older than this.')
+@click.option('--chunk-size', default=10000, show_default=True,
+              help='Number of sequence numbers compacted per transaction.')
+@with_appcontext
+def compact_changes(days, chunk_size):
+    """Drop superseded entries of the change log."""
+    deleted = GroupChange.compact(
+        datetime.now() - timedelta(days=days), chunk_size=chunk_size)
+    click.secho('Deleted {0} change log entries.'.format(deleted),
+                fg='green')
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2016 CERN.
+#
+# Invenio is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Configuration for Invenio-Groups."""
+
+from __future__ import absolute_import, print_function
+
+GROUPS_CACHE_BACKEND = 'invenio_groups.cache:lru_backend_factory'
+"""Import path of the factory creating the user groups cache backend.
+
+The factory is called with the Flask application and must return an object
+implementing :class:`invenio_groups.cache.CacheBackend`.
+"""
+
+GROUPS_CACHE_LRU_MAXSIZE = 10000
+"""Maximum number of users kept by the in-process LRU cache backend."""
+
+GROUPS_CACHE_TIMEOUT = 300
+"""Number of seconds a user's group identifiers are cached.
+
+It also bounds the age of the groups kept in the session for the identity
+needs (see ``GROUPS_IDENTITY_NEEDS``).
+"""
+
+GROUPS_BADGE_COUNTS_CACHE_TIMEOUT = 0
+"""Number of seconds the requests and invitations badge counts are cached.
+
+Counts are invalidated when the pending memberships of a user change; the
+timeout bounds how long changes made without the data models are missed.
+``0`` disables the cache.
+"""
+
+GROUPS_JOBS_EXECUTOR = 'invenio_groups.jobs:celery_executor_factory'
+"""Import path of the factory creating the background job executor.
+
+The factory is called with the Flask application and must return an object
+implementing :class:`invenio_groups.jobs.JobExecutor`. The default executor
+sends jobs to Celery: they stay pending until a worker consuming the
+application's queue is running. Use
+``'invenio_groups.jobs:thread_pool_executor_factory'`` to run jobs in the
+web process instead of a Celery worker.
+"""
+
+GROUPS_JOBS_THREAD_POOL_SIZE = 2
+"""Number of threads of the thread pool job executor."""
+
+GROUPS_INVITE_SYNC_LIMIT = 100
+"""Maximum number of emails invited within the request.
+
+Larger invitation batches are submitted as background jobs (see
+``GROUPS_JOBS_EXECUTOR``, the default one requires a Celery worker). The
+members view lists the jobs of the group which are not finished yet.
+"""
+
+GROUPS_DELETE_SYNC_LIMIT = 1000
+"""Maximum number of memberships of a group deleted within the request.
+
+Larger groups are deleted in chunks by the
+:func:`invenio_groups.tasks.delete_group` Celery task, which requires a
+running worker.
+"""
+
+GROUPS_MEMBERS_SEARCH_LIMIT = 50
+"""Maximum number of members returned by a search in the members view."""
+
+GROUPS_SYNC_ROLE = 'admin'
+"""Role required to read the synchronization feeds.
+
+See :mod:`invenio_groups.sync`. ``None`` disables the feeds.
+"""
+
+GROUPS_SYNC_MAX_PER_PAGE = 1000
+"""Maximum number of items of a page of a synchronization feed."""
+
+GROUPS_IDENTITY_NEEDS = False
+"""Provide identities with the needs of the groups of their user.
+
+See :mod:`invenio_groups.permissions`. Enable it only with a cache backend
+shared by all processes (see ``GROUPS_CACHE_BACKEND``); with the default
+in-process backend, changes made by other processes (e.g. Celery workers or
+other web workers) are only seen after ``GROUPS_CACHE_TIMEOUT`` seconds and a
+warning is issued.
+"""
+
+GROUPS_IDENTITY_SESSION_LIMIT = 100
+"""Maximum number of groups of a user stored in the session.
+
+The groups of users above the limit are fetched at every identity load.
+Flask's default session is a cookie limited to 4 KB by browsers: only raise
+the limit with a server-side session store.
+"""
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2014, 2015, 2016 CERN.
+#
+# Invenio is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307, USA.
+
+"""Streaming export of group memberships.
+
+Memberships are read in keyset chunks ordered by ``(id_group, user_id)``
+and serialized line by line, so that memory use does not depend on the
+number of exported memberships:
+
+.. code-block:: python
+
+    from invenio_groups.export import export
+
+    with open('members.csv', 'w') as fp:
+        for line in export('csv', groups_ids=[1, 2]):
+            fp.write(line)
+"""
+
+from __future__ import absolute_import, print_function
+
+import csv
+import json
+from collections import OrderedDict
+from datetime import datetime
+
+import six
+from invenio_accounts.models import User
+from invenio_db import db
+
+from .models import Group, Membership, MembershipState
+
+EXPORT_FIELDS = ('group_id', 'group', 'user_id', 'email', 'state',
+                 'created', 'modified')
+"""Exported fields, in column order."""
+
+STATE_NAMES = {
+    MembershipState.ACTIVE: 'active',
+    MembershipState.PENDING_ADMIN: 'pending_admin',
+    MembershipState.PENDING_USER: 'pending_user',
+}
+"""Exported names of the membership states."""
+
+
+def iter_memberships(groups_ids=None, chunk_size=1000):
+    """Iterate over memberships with the details of their group and user.
+
+    Each chunk is fetched with its own ``LIMIT`` query continuing after the
+    last ``(id_group, user_id)`` seen, so no ORM object is kept and no
+    cursor is held open between chunks.
+
+    :param groups_ids: List of group identifiers. Default: all groups.
+    :param int chunk_size: Number of memberships fetched per query.
+    :returns: Iterator of ordered dictionaries keyed by
+        :data:`EXPORT_FIELDS`.
+    """
+    query = db.session.query(
+        Membership.id_group, Group.name, Membership.user_id, User.email,
+        Membership.state, Membership.created, Membership.modified,
+    ).join(
+        Group, Group.id == Membership.id_group
+    ).join(
+        User, User.id == Membership.user_id
+    ).order_by(
+        Membership.id_group, Membership.user_id
+    )
+    if groups_ids is not None:
+        if not groups_ids:
+            return
+        query = query.filter(Membership.id_group.in_(groups_ids))
+
+    last = None
+    while True:
+        chunk = query
+        if last is not None:
+            chunk = chunk.filter(db.or_(
+                Membership.id_group > last[0],
+                db.and_(Membership.id_group == last[0],
+                        Membership.user_id > last[1]),
+            ))
+        rows = chunk.limit(chunk_size).all()
+        for row in rows:
+            state = getattr(row.state, 'code', row.state)
+            yield OrderedDict(zip(EXPORT_FIELDS, (
+                row.id_group, row.name, row.user_id, row.email,
+                STATE_NAMES.get(state, state), row.created, row.modified,
+            )))
+        if len(rows) < chunk_size:
+            return
+        last = (rows[-1].id_group, rows[-1].user_id)
+
+
+def _serialize(value):
+    """Convert a value to a JSON and CSV friendly one."""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+class _LastLine(object):
+    """File-like object keeping only the last written line."""
+
+    value = ''
+
+    def write(self, line):
+        """Keep a line."""
+        self.value = line
+
+
+def to_csv(rows):
+    """Serialize memberships as CSV lines, starting with a header.
+
+    :param rows: Iterable of dictionaries keyed by :data:`EXPORT_FIELDS`.
+    :returns: Iterator of text lines.
+    """
+    buf = _LastLine()
+    writer = csv.writer(buf)
+
+    def _line(values):
+        if six.PY2:
+            writer.writerow([
+                v.encode('utf-8') if isinstance(v, six.text_type) else v
+                for v in values
+            ])
+            return buf.value.decode('utf-8')
+        writer.writerow(values)
+        return buf.value
+
+    yield _line(EXPORT_FIELDS)
+    for row in rows:
+        yield _line([
+            '' if row[k] is None else _serialize(row[k])
+            for k in EXPORT_FIELDS
+        ])
+
+
+def to_jsonl(rows):
+    """Serialize memberships as JSON Lines.
+
+    :param rows: Iterable of dictionaries keyed by :data:`EXPORT_FIELDS`.
+    :returns: Iterator of text lines.
+    """
+    for row in rows:
+        yield json.dumps(OrderedDict(
+            (k, _serialize(v)) for k, v in row.items())) + '\n'
+
+
+EXPORT_FORMATS = OrderedDict([
+    ('csv', (to_csv, 'text/csv')),
+    ('jsonl', (to_jsonl, 'application/x-ndjson')),
+])
+"""Export serializers and mimetypes by format name."""
+
+
+def export(fmt, groups_ids=None, chunk_size=1000):
+    """Stream memberships in the given format.
+
+    :param str fmt: Name of a format of :data:`EXPORT_FORMATS`.
+    :param groups_ids: List of group identifiers. Default: all groups.
+    :param int chunk_size: Number of memberships fetched per query.
+    :returns: Iterator of text lines.
+    """
+    serializer, dummy_mimetype = EXPORT_FORMATS[fmt]
+    return serializer(iter_memberships(groups_ids, chunk_size=chunk_size))
@@ -26,6 +26,15 @@
 
 from __future__ import absolute_import, print_function
 
+import warnings
+
+from flask_principal import identity_loaded
+from werkzeug.utils import import_string
+
+from . import config
+from .cache import BadgeCountsCache, LRUCache, UserGroupsCache
+from .jobs import submit_job
+from .permissions import on_identity_loaded
 from .views import blueprint
 
 
@@ -34,6 +43,9 @@ class InvenioGroups(object):
 
     def __init__(self, app=None):
         """Extension initialization."""
+        self.user_groups_cache = None
+        self.badge_counts_cache = None
+        self.jobs_executor = None
         if app:
             self.init_app(app)
 
@@ -41,6 +53,21 @@ class InvenioGroups(object):
         """Flask application initialization."""
         self.init_config(app)
         app.register_blueprint(blueprint)
+        backend = import_string(app.config['GROUPS_CACHE_BACKEND'])(app)
+        self.user_groups_cache = UserGroupsCache(
+            backend, timeout=app.config['GROUPS_CACHE_TIMEOUT'])
+        self.badge_counts_cache = BadgeCountsCache(
+            backend, timeout=app.config['GROUPS_BADGE_COUNTS_CACHE_TIMEOUT'])
+        self.jobs_executor = import_string(
+            app.config['GROUPS_JOBS_EXECUTOR'])(app)
+        if app.config['GROUPS_IDENTITY_NEEDS']:
+            if isinstance(backend, LRUCache):
+                warnings.warn(
+                    'GROUPS_IDENTITY_NEEDS is used with an in-process '
+                    'GROUPS_CACHE_BACKEND: changes made by other processes '
+                    'reach the identities only after GROUPS_CACHE_TIMEOUT '
+                    'seconds. Use a shared cache backend.', RuntimeWarning)
+            identity_loaded.connect_via(app)(on_identity_loaded)
         app.extensions['invenio-groups'] = self
 
     def init_config(self, app):
@@ -49,3 +76,32 @@ class InvenioGroups(object):
             "GROUPS_BASE_TEMPLATE",
             app.config.get("BASE_TEMPLATE",
                            "invenio_groups/base.html"))
+        for k in dir(config):
+            if k.startswith('GROUPS_'):
+                app.config.setdefault(k, getattr(config, k))
+
+    def get_user_groups_ids(self, user):
+        """Get identifiers of the groups a user is a member or an admin of.
+
+        :param user: User object.
+        :returns: Frozen set of group identifiers.
+        """
+        return self.user_groups_cache.get(user.get_id())
+
+    def get_badge_counts(self, user):
+        """Get the number of pending requests and invitations of a user.
+
+        :param user: User object.
+        :returns: Dictionary with ``requests`` and ``invitations``.
+        """
+        return self.badge_counts_cache.get(user)
+
+    def submit_job(self, kind, group, user=None, **payload):
+        """Submit a background job to the configured executor.
+
+        See :func:`invenio_groups.jobs.submit_job`.
+
+        :returns: :class:`invenio_groups.models.GroupJob` object.
+        """
+        return submit_job(self.jobs_executor, kind, group, user=user,
+                          **payload)
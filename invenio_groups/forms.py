@@ -51,7 +51,7 @@ class EmailsValidator(object):
         self.validate_data(form, field)
 
         emails_org = field.data
-        emails = filter(None, emails_org.splitlines())
+        emails = filter(None, (e.strip() for e in emails_org.splitlines()))
         for email in emails:
             try:
                 field.data = email
@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2014, 2015, 2016 CERN.
+#
+# Invenio is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307, USA.
+
+"""Streaming import of group memberships and admins.
+
+Input records have the fields ``group`` (name), ``email`` or ``user_id``,
+``state`` (one of the names of :data:`invenio_groups.export.STATE_NAMES`,
+default ``active``) and ``admin`` (boolean, default false), e.g.:
+
+.. code-block:: text
+
+    group,email,state,admin
+    staff,jane@example.org,active,true
+    staff,john@example.org,pending_user,
+
+Records are processed in batches: groups and users of a batch are resolved
+with a few queries, memberships are created or updated in bulk (see
+:meth:`invenio_groups.models.Membership.upsert_many`) and each batch is
+committed on its own. A file exported by :mod:`invenio_groups.export` can be
+imported back.
+"""
+
+from __future__ import absolute_import, print_function
+
+import csv
+import json
+from collections import OrderedDict
+from itertools import islice
+
+import six
+from invenio_accounts.models import User
+from invenio_db import db
+
+from .export import STATE_NAMES
+from .models import Group, GroupAdmin, Membership, resolve_users_by_emails
+
+STATES = dict((name, state) for state, name in STATE_NAMES.items())
+"""Membership states by exported name."""
+
+BOOLEANS = {
+    '': False, '0': False, 'false': False, 'no': False, 'n': False,
+    '1': True, 'true': True, 'yes': True, 'y': True,
+}
+"""Accepted values of the ``admin`` field."""
+
+
+def read_csv(fp):
+    """Read records from a CSV file with a header line.
+
+    :param fp: Text file object.
+    :returns: Iterator of ``(line number, record)`` tuples.
+    """
+    if six.PY2:
+        reader = csv.DictReader(
+            line.encode('utf-8') if isinstance(line, six.text_type) else line
+            for line in fp)
+        for row in reader:
+            yield reader.line_num, dict(
+                (k.decode('utf-8'), v.decode('utf-8')
+                 if isinstance(v, bytes) else v)
+                for k, v in row.items() if k is not None)
+    else:
+        reader = csv.DictReader(fp)
+        for row in reader:
+            yield reader.line_num, row
+
+
+def read_jsonl(fp):
+    """Read records from a JSON Lines file.
+
+    Lines which are not JSON objects are returned as None records.
+
+    :param fp: Text file object.
+    :returns: Iterator of ``(line number, record)`` tuples.
+    """
+    for line_num, line in enumerate(fp, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        yield line_num, record if isinstance(record, dict) else None
+
+
+IMPORT_FORMATS = OrderedDict([
+    ('csv', read_csv),
+    ('jsonl', read_jsonl),
+])
+"""Record readers by format name."""
+
+
+def _text(value):
+    """Convert a field value to a stripped string."""
+    if value is None:
+        return ''
+    return six.text_type(value).strip()
+
+
+def _parse(record):
+    """Validate a record.
+
+    :returns: Tuple ``(group, user_id, email, state, admin)``.
+    :raises ValueError: If the record is invalid.
+    """
+    if record is None:
+        raise ValueError('Invalid record.')
+
+    group = _text(record.get('group'))
+    if not group:
+        raise ValueError('Missing group.')
+
+    user_id = _text(record.get('user_id'))
+    email = _text(record.get('email')).lower()
+    if user_id:
+        try:
+            user_id = int(user_id)
+        except ValueError:
+            raise ValueError('Invalid user_id {0}.'.format(user_id))
+    elif not email:
+        raise ValueError('Missing email or user_id.')
+    else:
+        user_id = None
+
+    state = _text(record.get('state')).lower() or 'active'
+    if state not in STATES:
+        raise ValueError('Invalid state {0}.'.format(state))
+
+    admin = record.get('admin')
+    if not isinstance(admin, bool):
+        admin = _text(admin).lower()
+        if admin not in BOOLEANS:
+            raise ValueError('Invalid admin flag {0}.'.format(admin))
+        admin = BOOLEANS[admin]
+
+    return group, user_id, email, STATES[state], admin
+
+
+def _load_batch(batch, chunk_size, reject, stats):
+    """Resolve and store a batch of records."""
+    parsed = []
+    for line_num, record in batch:
+        try:
+            parsed.append((line_num, _parse(record)))
+        except ValueError as e:
+            reject(line_num, str(e))
+
+    groups = dict((g.name, g) for g in Group.query_by_names(
+        list(set(p[0] for dummy, p in parsed))))
+    emails = resolve_users_by_emails(
+        list(set(p[2] for dummy, p in parsed if p[1] is None)),
+        chunk_size=chunk_size)
+    requested = list(set(p[1] for dummy, p in parsed if p[1] is not None))
+    users_ids = set()
+    for i in range(0, len(requested), chunk_size):
+        users_ids.update(row.id for row in User.query.filter(
+            User.id.in_(requested[i:i + chunk_size])).with_entities(User.id))
+
+    states = OrderedDict()
+    admins = OrderedDict()
+    for line_num, (name, user_id, email, state, admin) in parsed:
+        if name not in groups:
+            reject(line_num, 'Group {0} does not exist.'.format(name))
+            continue
+        if user_id is None:
+            user_id = emails.get(email)
+            if user_id is None:
+                reject(line_num, 'User {0} does not exist.'.format(email))
+                continue
+        elif user_id not in users_ids:
+            reject(line_num, 'User {0} does not exist.'.format(user_id))
+            continue
+        # Later lines win over earlier ones.
+        states.setdefault(name, OrderedDict())[user_id] = state
+        if admin:
+            admins.setdefault(name, []).append(user_id)
+        stats['loaded'] += 1
+
+    for name, group_states in states.items():
+        created, updated = Membership.upsert_many(
+            groups[name], group_states, chunk_size=chunk_size)
+        stats['created'] += len(created)
+        stats['updated'] += len(updated)
+    for name, group_admins in admins.items():
+        stats['admins'] += len(GroupAdmin.create_many(
+            groups[name], group_admins, chunk_size=chunk_size))
+
+
+def load(records, batch_size=1000, chunk_size=500, progress=None,
+         reject=None):
+    """Import memberships and admins.
+
+    Each batch of records is committed on its own, so an interrupted
+    import can be resumed by running it again.
+
+    :param records: Iterable of ``(line number, record)`` tuples, e.g. from
+        :func:`read_csv` or :func:`read_jsonl`.
+    :param int batch_size: Number of records committed at once.
+    :param int chunk_size: Number of rows resolved or written per statement.
+    :param progress: Function called with the statistics after each batch.
+    :param reject: Function called with the line number and the reason of
+        each rejected record.
+    :returns: Dictionary with the number of ``processed``, ``loaded`` and
+        ``rejected`` records, of ``created`` and ``updated`` memberships and
+        of new ``admins``.
+    """
+    assert batch_size > 0
+    stats = OrderedDict((k, 0) for k in (
+        'processed', 'loaded', 'rejected', 'created', 'updated', 'admins'))
+
+    def _reject(line_num, reason):
+        stats['rejected'] += 1
+        if reject is not None:
+            reject(line_num, reason)
+
+    records = iter(records)
+    while True:
+        batch = list(islice(records, batch_size))
+        if not batch:
+            break
+        try:
+            _load_batch(batch, chunk_size, _reject, stats)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        stats['processed'] += len(batch)
+        if progress is not None:
+            progress(stats)
+    return stats
@@ -0,0 +1,294 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2014, 2015, 2016 CERN.
+#
+# Invenio is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307, USA.
+
+"""Background jobs for mass group operations.
+
+Operations which can touch many rows (inviting, adding or removing many
+users, deleting a group) can be submitted as jobs instead of being run in
+the request:
+
+.. code-block:: python
+
+    from invenio_groups.proxies import current_groups
+
+    job = current_groups.submit_job(
+        'invite', group, user=current_user, emails=emails)
+    db.session.commit()
+
+The job is handed to the executor once the transaction is committed. A
+:class:`invenio_groups.models.GroupJob` row records the status and the
+progress of each job. Jobs are run by the executor configured with
+``GROUPS_JOBS_EXECUTOR``: :class:`CeleryJobExecutor` hands them to a Celery
+worker, while :class:`ThreadPoolJobExecutor` runs them in threads of the
+web process (e.g. for tests or small deployments).
+"""
+
+from __future__ import absolute_import, print_function
+
+import threading
+from collections import OrderedDict
+from multiprocessing.pool import ThreadPool
+
+from flask import current_app
+from invenio_db import db
+
+from .models import Group, GroupJob, InvitationStatus, JobStatus, Membership, \
+    MembershipState
+from .signals import call_after_commit
+
+JOB_HANDLERS = {}
+"""Job handlers by kind.
+
+A handler is called with the group, the payload of the job and a progress
+function taking the number of processed and total items. It commits its
+changes (progress reports commit too) and returns a JSON serializable
+result.
+"""
+
+
+def job_handler(kind):
+    """Register a job handler for a kind of job."""
+    def decorator(func):
+        JOB_HANDLERS[kind] = func
+        return func
+    return decorator
+
+
+def _chunks(items, chunk_size):
+    """Split a list into chunks."""
+    for i in range(0, len(items), chunk_size):
+        yield items[i:i + chunk_size]
+
+
+@job_handler('invite')
+def _invite(group, payload, progress):
+    """Invite users by emails (see :meth:`Group.invite_by_emails`)."""
+    emails = list(OrderedDict.fromkeys(
+        e.strip().lower() for e in payload['emails'] if e.strip()))
+    chunk_size = payload.get('chunk_size', 500)
+
+    result = dict((status, []) for status in (
+        InvitationStatus.INVITED, InvitationStatus.EXISTING,
+        InvitationStatus.NOT_FOUND))
+    done = 0
+    for chunk in _chunks(emails, chunk_size):
+        for email, status in group.invite_by_emails(
+                chunk, chunk_size=chunk_size).items():
+            result[status].append(email)
+        done += len(chunk)
+        progress(done, len(emails))
+    return result
+
+
+@job_handler('add_members')
+def _add_members(group, payload, progress):
+    """Add users to a group (see :meth:`Membership.create_many`)."""
+    users_ids = payload['users_ids']
+    state = payload.get('state', MembershipState.ACTIVE)
+    chunk_size = payload.get('chunk_size', 1000)
+
+    result = dict(added=0, skipped=0)
+    done = 0
+    for chunk in _chunks(users_ids, chunk_size):
+        created, existing = Membership.create_many(
+            group, chunk, state=state, chunk_size=chunk_size)
+        result['added'] += len(created)
+        result['skipped'] += len(existing)
+        done += len(chunk)
+        progress(done, len(users_ids))
+    return result
+
+
+@job_handler('remove_members')
+def _remove_members(group, payload, progress):
+    """Remove users from a group (see :meth:`Membership.delete_many`)."""
+    users_ids = payload['users_ids']
+    chunk_size = payload.get('chunk_size', 1000)
+
+    result = dict(removed=0, skipped=0)
+    done = 0
+    for chunk in _chunks(users_ids, chunk_size):
+        removed = Membership.delete_many(group, chunk, chunk_size=chunk_size)
+        result['removed'] += len(removed)
+        result['skipped'] += len(chunk) - len(removed)
+        done += len(chunk)
+        progress(done, len(users_ids))
+    return result
+
+
+def _submit(executor, job_id):
+    """Hand a committed job to an executor.
+
+    If the submission fails, the job is marked as failed in a transaction of
+    its own and the error is logged.
+    """
+    try:
+        executor.submit(job_id)
+    except Exception as e:
+        current_app.logger.exception(
+            'Group job {0} could not be submitted.'.format(job_id))
+        table = GroupJob.__table__
+        with db.engine.begin() as connection:
+            connection.execute(table.update().where(
+                table.c.id == job_id
+            ).values(status=JobStatus.FAILURE, error=str(e)))
+
+
+def submit_job(executor, kind, group, user=None, **payload):
+    """Record a job and hand it to an executor once it is committed.
+
+    The job is only flushed: the caller commits it together with its other
+    changes, and the executor gets it after the commit (see
+    :func:`invenio_groups.signals.call_after_commit`). If the transaction is
+    rolled back, the job is never submitted. If the submission fails, the job
+    is marked as failed.
+
+    :param executor: Job executor.
+    :param str kind: Key of :data:`JOB_HANDLERS`.
+    :param group: Group object.
+    :param user: User submitting the job.
+    :param payload: JSON serializable arguments of the job handler.
+    :returns: :class:`invenio_groups.models.GroupJob` object.
+    """
+    assert kind in JOB_HANDLERS
+    job = GroupJob(
+        kind=kind,
+        group_id=group.id,
+        user_id=int(user.get_id()) if user is not None else None,
+        payload=payload,
+    )
+    db.session.add(job)
+    db.session.flush()
+    call_after_commit(_submit, executor, job.id)
+    return job
+
+
+def execute_job(job_id):
+    """Run a pending job.
+
+    Jobs which are not pending (e.g. because a task was delivered twice) are
+    left untouched. Failures are recorded on the job and logged.
+
+    :param job_id: Job identifier.
+    :returns: Final :class:`JobStatus` or None if the job was not run.
+    """
+    job = GroupJob.query.filter_by(
+        id=job_id, status=JobStatus.PENDING).with_for_update().one_or_none()
+    if job is None:
+        db.session.rollback()
+        return None
+    job.status = JobStatus.RUNNING
+    db.session.commit()
+
+    def progress(done, total):
+        job.done = done
+        job.total = total
+        db.session.commit()
+
+    try:
+        group = Group.query.get(job.group_id)
+        if group is None:
+            raise ValueError('Group {0} does not exist.'.format(job.group_id))
+        result = JOB_HANDLERS[job.kind](group, job.payload, progress)
+        job.status = JobStatus.SUCCESS
+        job.result = result
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.exception('Group job {0} failed.'.format(job_id))
+        job = GroupJob.query.get(job_id)
+        job.status = JobStatus.FAILURE
+        job.error = str(e)
+        db.session.commit()
+    return job.status
+
+
+class JobExecutor(object):
+    """Interface of job executors."""
+
+    def submit(self, job_id):
+        """Schedule the execution of a job.
+
+        :param job_id: Identifier of a pending job.
+        :returns: An asynchronous result with a ``get()`` method.
+        """
+        raise NotImplementedError()
+
+
+class CeleryJobExecutor(JobExecutor):
+    """Run jobs with the :func:`invenio_groups.tasks.run_job` Celery task."""
+
+    def submit(self, job_id):
+        """Send the job to a Celery worker."""
+        from .tasks import run_job
+        return run_job.delay(job_id)
+
+
+class ThreadPoolJobExecutor(JobExecutor):
+    """Run jobs in a pool of threads of the current process.
+
+    Jobs are lost if the process stops before running them.
+    """
+
+    def __init__(self, app, max_workers=2):
+        """Initialize the executor.
+
+        :param app: Flask application providing the context of the jobs.
+        :param int max_workers: Number of threads.
+        """
+        self.app = app
+        self.max_workers = max_workers
+        self._pool = None
+        self._lock = threading.Lock()
+
+    @property
+    def pool(self):
+        """Get the thread pool, started on first use."""
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPool(self.max_workers)
+            return self._pool
+
+    def _run(self, job_id):
+        """Run a job in an application context."""
+        with self.app.app_context():
+            return execute_job(job_id)
+
+    def submit(self, job_id):
+        """Queue the job in the thread pool."""
+        return self.pool.apply_async(self._run, (job_id, ))
+
+    def shutdown(self):
+        """Wait for the queued jobs and stop the threads."""
+        with self._lock:
+            if self._pool is not None:
+                self._pool.close()
+                self._pool.join()
+                self._pool = None
+
+
+def celery_executor_factory(app):
+    """Create the Celery job executor."""
+    return CeleryJobExecutor()
+
+
+def thread_pool_executor_factory(app):
+    """Create the thread pool job executor configured for the application."""
+    return ThreadPoolJobExecutor(
+        app, max_workers=app.config['GROUPS_JOBS_THREAD_POOL_SIZE'])
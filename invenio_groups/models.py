@@ -21,21 +21,25 @@
 
 from __future__ import absolute_import, print_function
 
+import re
+from collections import OrderedDict
 from datetime import datetime
 
-from flask import current_app
+from flask import current_app, g, has_app_context
 from flask_babelex import gettext as _
 from flask_login import UserMixin, current_user
 from invenio_accounts.models import User
 from invenio_db import db
-from sqlalchemy import func
+from sqlalchemy import DDL, case, event, func, inspect, literal, null
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import Session, aliased, joinedload, selectinload
 from sqlalchemy.orm.exc import NoResultFound
 from sqlalchemy.sql.expression import asc, desc
-from sqlalchemy_utils import generic_relationship
+from sqlalchemy_utils import JSONType, generic_relationship
 from sqlalchemy_utils.types.choice import ChoiceType
 
+from . import signals
+from .pagination import KeysetPagination
 from .widgets import RadioGroupWidget
 
 
@@ -125,6 +129,35 @@ class MembershipState(object):
         return state in [cls.ACTIVE, cls.PENDING_ADMIN, cls.PENDING_USER]
 
 
+class InvitationStatus(object):
+    """Outcome of inviting a user by email."""
+
+    INVITED = 'invited'
+    """User was invited."""
+
+    EXISTING = 'existing'
+    """User already has a membership (in any state)."""
+
+    NOT_FOUND = 'not_found'
+    """No user has the email."""
+
+
+class JobStatus(object):
+    """Status of a background job."""
+
+    PENDING = 'pending'
+    """Job is waiting for an executor."""
+
+    RUNNING = 'running'
+    """Job is being executed."""
+
+    SUCCESS = 'success'
+    """Job finished successfully."""
+
+    FAILURE = 'failure'
+    """Job failed, its changes since the last progress report are lost."""
+
+
 class Group(db.Model):
     """Group data model."""
 
@@ -192,9 +225,28 @@ class Group(db.Model):
     """Creation timestamp."""
 
     modified = db.Column(db.DateTime, nullable=False, default=datetime.now,
-                         onupdate=datetime.now)
+                         onupdate=datetime.now, index=True)
     """Modification timestamp."""
 
+    active_members_count = db.Column(
+        db.Integer, nullable=False, default=0, server_default='0')
+    """Number of active memberships."""
+
+    pending_requests_count = db.Column(
+        db.Integer, nullable=False, default=0, server_default='0')
+    """Number of memberships pending admin approval."""
+
+    pending_invitations_count = db.Column(
+        db.Integer, nullable=False, default=0, server_default='0')
+    """Number of memberships pending user approval."""
+
+    COUNTERS = {
+        MembershipState.ACTIVE: 'active_members_count',
+        MembershipState.PENDING_ADMIN: 'pending_requests_count',
+        MembershipState.PENDING_USER: 'pending_invitations_count',
+    }
+    """Membership counter column names by membership state."""
+
     def get_id(self):
         """Get group id.
 
@@ -202,6 +254,21 @@ class Group(db.Model):
         """
         return self.id
 
+    def to_dict(self):
+        """Get a JSON serializable representation of the group."""
+        return dict(
+            id=self.id,
+            name=self.name,
+            description=self.description,
+            privacy_policy=getattr(
+                self.privacy_policy, 'code', self.privacy_policy),
+            subscription_policy=getattr(
+                self.subscription_policy, 'code', self.subscription_policy),
+            is_managed=self.is_managed,
+            created=self.created.isoformat(),
+            modified=self.modified.isoformat(),
+        )
+
     @classmethod
     def create(cls, name=None, description='', privacy_policy=None,
                subscription_policy=None, is_managed=False, admins=None):
@@ -236,15 +303,146 @@ class Group(db.Model):
                     group=obj, admin_id=a.get_id(),
                     admin_type=resolve_admin_type(a)))
 
+        if admins:
+            GroupAdminClosure.refresh([obj.id])
+        PermissionCache.invalidate(group_id=obj.id)
+        signals.send_after_commit(signals.group_created, groups_ids=[obj.id])
+        if admins:
+            _admins_changed(signals.admin_added, [
+                (obj.id, resolve_admin_type(a), a.get_id()) for a in admins])
         return obj
 
-    def delete(self):
-        """Delete a group and all associated memberships."""
+    def delete(self, chunk_size=1000):
+        """Delete a group and all associated memberships.
+
+        The memberships and admins are read ``chunk_size`` rows at a time to
+        record and signal their removal, and then deleted in bulk. The
+        signals are still queued until commit; use :meth:`delete_in_chunks`
+        for very large groups.
+
+        :param int chunk_size: Number of rows loaded at once.
+        """
+        administered_ids = GroupAdminClosure.administered_ids(self)
+        for rows in _iter_chunks(Membership.query.filter_by(
+                id_group=self.id).with_entities(
+                    Membership.user_id, Membership.state),
+                Membership.user_id, chunk_size):
+            invalidate_user_groups(row.user_id for row in rows
+                                   if row.state == MembershipState.ACTIVE)
+            invalidate_badge_counts(users_ids=[
+                row.user_id for row in rows
+                if row.state == MembershipState.PENDING_USER])
+            _membership_changed(signals.membership_removed, self.id, rows)
+        for rows in _iter_chunks(GroupAdmin.query.filter(db.or_(
+            GroupAdmin.group_id == self.id,
+            db.and_(GroupAdmin.admin_type == resolve_admin_type(self),
+                    GroupAdmin.admin_id == self.id),
+        )).with_entities(
+            GroupAdmin.id, GroupAdmin.group_id, GroupAdmin.admin_type,
+            GroupAdmin.admin_id,
+        ), GroupAdmin.id, chunk_size):
+            _admins_changed(signals.admin_removed, [
+                (row.group_id, row.admin_type, row.admin_id) for row in rows])
+        for rows in _iter_chunks(GroupAdminClosure.query.filter_by(
+                group_id=self.id, admin_type='User'
+        ).with_entities(GroupAdminClosure.admin_id),
+                GroupAdminClosure.admin_id, chunk_size):
+            invalidate_user_groups(row.admin_id for row in rows)
+            invalidate_badge_counts(users_ids=[row.admin_id for row in rows])
+
         with db.session.begin_nested():
-            Membership.query_by_group(self).delete()
+            Membership.query.filter_by(id_group=self.id).delete()
+            MemberSearchToken.unindex(self.id)
             GroupAdmin.query_by_group(self).delete()
             GroupAdmin.query_by_admin(self).delete()
+            GroupAdminClosure.query.filter_by(group_id=self.id).delete()
             db.session.delete(self)
+            GroupAdminClosure.refresh(
+                gid for gid in administered_ids if gid != self.id)
+        PermissionCache.invalidate(group_id=self.id)
+        PermissionCache.invalidate(
+            principal_type=resolve_admin_type(self), principal_id=self.id)
+        GroupChange.record(signals.group_deleted.name, [
+            (self.id, 'Group', self.id, None)])
+        signals.send_after_commit(signals.group_deleted, groups_ids=[self.id])
+
+    def delete_in_chunks(self, chunk_size=1000, progress=None):
+        """Delete a very large group in bounded chunks.
+
+        Memberships and admins are deleted ``chunk_size`` rows at a time and
+        the session is committed after each chunk, so that neither memory
+        usage nor lock duration grow with the size of the group. Each chunk
+        also updates the effective admins (see :class:`GroupAdminClosure`)
+        it affects. The group itself is finally removed with :meth:`delete`.
+
+        .. note:: The session is committed by this method.
+
+        :param int chunk_size: Number of rows deleted per transaction.
+        :param progress: Callable receiving the number of deleted rows and
+            the total number of rows to delete.
+        :returns: Number of deleted memberships and admins.
+        """
+        assert chunk_size > 0
+        group_id = self.id
+        total = self.active_members_count + self.pending_requests_count + \
+            self.pending_invitations_count + \
+            GroupAdmin.query.filter_by(group_id=group_id).count()
+        administered_ids = GroupAdminClosure.administered_ids(self)
+        deleted = 0
+
+        def _report():
+            if progress is not None:
+                progress(deleted, max(deleted, total))
+
+        while True:
+            rows = Membership.query.filter_by(id_group=group_id).with_entities(
+                Membership.user_id, Membership.state).limit(chunk_size).all()
+            if not rows:
+                break
+            with db.session.begin_nested():
+                Membership.query.filter(
+                    Membership.id_group == group_id,
+                    Membership.user_id.in_([row.user_id for row in rows]),
+                ).delete(synchronize_session=False)
+                deltas = {}
+                for row in rows:
+                    deltas[row.state] = deltas.get(row.state, 0) - 1
+                Group._update_counters(group_id, deltas, users_ids=[
+                    row.user_id for row in rows])
+                MemberSearchToken.unindex(
+                    group_id, [row.user_id for row in rows])
+                GroupAdminClosure.refresh(administered_ids, users_ids=[
+                    row.user_id for row in rows
+                    if row.state == MembershipState.ACTIVE])
+            invalidate_user_groups(row.user_id for row in rows
+                                   if row.state == MembershipState.ACTIVE)
+            _membership_changed(signals.membership_removed, group_id, rows)
+            db.session.commit()
+            deleted += len(rows)
+            _report()
+
+        while True:
+            rows = GroupAdmin.query.filter_by(
+                group_id=group_id).with_entities(
+                    GroupAdmin.id, GroupAdmin.group_id, GroupAdmin.admin_type,
+                    GroupAdmin.admin_id).limit(chunk_size).all()
+            if not rows:
+                break
+            with db.session.begin_nested():
+                GroupAdmin.query.filter(
+                    GroupAdmin.id.in_([row.id for row in rows])).delete(
+                        synchronize_session=False)
+                GroupAdminClosure.refresh([group_id] + administered_ids)
+            _admins_changed(signals.admin_removed, [
+                (row.group_id, row.admin_type, row.admin_id) for row in rows])
+            db.session.commit()
+            deleted += len(rows)
+            _report()
+
+        Group.query.get(group_id).delete()
+        db.session.commit()
+        _report()
+        return deleted
 
     def update(self, name=None, description=None, privacy_policy=None,
                subscription_policy=None, is_managed=None):
@@ -276,8 +474,20 @@ class Group(db.Model):
 
             db.session.merge(self)
 
+        signals.send_after_commit(signals.group_updated, groups_ids=[self.id])
         return self
 
+    @classmethod
+    def query_modified_since(cls, since=None):
+        """Get the groups modified since a date, in modification order.
+
+        :param datetime since: Only get the groups modified since this date.
+        """
+        query = cls.query
+        if since is not None:
+            query = query.filter(cls.modified >= since)
+        return query.order_by(cls.modified, cls.id)
+
     @classmethod
     def get_by_name(cls, name):
         """Query group by a group name.
@@ -304,35 +514,162 @@ class Group(db.Model):
     def query_by_user(cls, user, with_pending=False, eager=False):
         """Query group by user.
 
+        Groups are selected with a single semi-join on the identifiers of
+        the groups the user is a member of or effectively administers. Both
+        are index lookups (see :class:`GroupAdminClosure`), so only the
+        matching groups are read. An ``OR`` of two ``EXISTS`` would instead
+        scan all groups (see ``benchmarks/query_by_user.py``).
+
         :param user: User object.
         :param bool with_pending: Whether to include pending users.
-        :param bool eager: Eagerly fetch group members.
-        :returns: Query object.
+        :param bool eager: Eagerly fetch group members. They are loaded with
+            one additional query for the fetched groups only.
+        :returns: Query object ordered by name and id.
         """
-        q1 = Group.query.join(Membership).filter_by(user_id=user.get_id())
+        members = db.session.query(Membership.id_group).filter(
+            Membership.user_id == user.get_id())
         if not with_pending:
-            q1 = q1.filter_by(state=MembershipState.ACTIVE)
-        if eager:
-            q1 = q1.options(joinedload(Group.members))
+            members = members.filter(
+                Membership.state == MembershipState.ACTIVE)
+
+        admins = db.session.query(GroupAdminClosure.group_id).filter(
+            GroupAdminClosure.admin_type == resolve_admin_type(user),
+            GroupAdminClosure.admin_id == user.get_id(),
+        )
 
-        q2 = Group.query.join(GroupAdmin).filter_by(
-            admin_id=user.get_id(), admin_type=resolve_admin_type(user))
+        query = cls.query.filter(
+            cls.id.in_(members.union_all(admins))
+        ).order_by(cls.name, cls.id)
         if eager:
-            q2 = q2.options(joinedload(Group.members))
+            query = query.options(selectinload(cls.members))
+        return query
+
+    @classmethod
+    def paginate(cls, query, cursor=None, per_page=20, total=None, q=None):
+        """Paginate groups by name with a cursor.
+
+        Groups are ordered by ``(name, id)``, which is backed by the unique
+        index on the name. When the query was filtered with :meth:`search`,
+        pass the search string as ``q`` to order by relevance first.
+
+        :param query: Query of groups, e.g. from :meth:`query_by_user`.
+        :param cursor: Token of the page to fetch or None for the first page.
+        :param int per_page: Number of groups per page.
+        :param total: Total number of groups, if known.
+        :param str q: Search string or None.
+        :returns: :class:`invenio_groups.pagination.KeysetPagination` object.
+        :raises ValueError: If the cursor is invalid.
+        """
+        keys = [(cls.name, 'asc'), (cls.id, 'asc')]
+        rank = cls._search_rank(q) if q else None
+        if rank is not None:
+            keys.insert(0, (rank.label('rank'), 'asc'))
+        return KeysetPagination(
+            query, keys, per_page=per_page, cursor=cursor, total=total)
+
+    @classmethod
+    def query_ids_by_user(cls, user_id):
+        """Query identifiers of groups a user is an active member or admin of.
+
+        Nested administration is taken into account (see
+        :class:`GroupAdminClosure`).
+
+        :param user_id: User identifier.
+        :returns: Query object yielding one-element rows.
+        """
+        members = db.session.query(Membership.id_group).filter(
+            Membership.user_id == user_id,
+            Membership.state == MembershipState.ACTIVE,
+        )
+        admins = db.session.query(GroupAdminClosure.group_id).filter(
+            GroupAdminClosure.admin_type == 'User',
+            GroupAdminClosure.admin_id == user_id,
+        )
+        return members.union(admins)
+
+    @classmethod
+    def query_roles_by_user(cls, user_id):
+        """Query the groups a user is an active member or an admin of.
+
+        Unlike :meth:`query_ids_by_user`, memberships and (effective) admin
+        rights are told apart, in a single query.
+
+        :param user_id: User identifier.
+        :returns: Query object yielding ``(group_id, is_admin)`` rows.
+        """
+        members = db.session.query(
+            Membership.id_group, literal(False)
+        ).filter(
+            Membership.user_id == user_id,
+            Membership.state == MembershipState.ACTIVE,
+        )
+        admins = db.session.query(
+            GroupAdminClosure.group_id, literal(True)
+        ).filter(
+            GroupAdminClosure.admin_type == 'User',
+            GroupAdminClosure.admin_id == user_id,
+        )
+        return members.union_all(admins)
 
-        query = q1.union(q2).with_entities(Group.id)
+    @staticmethod
+    def _normalize_search(q):
+        """Lower-case a search string and normalize its whitespace."""
+        return ' '.join((q or '').lower().split())
 
-        return Group.query.filter(Group.id.in_(query))
+    @classmethod
+    def _search_rank(cls, q):
+        """Get the relevance of groups for a search string.
+
+        Exact name matches come first (0), then names starting with the
+        search string (1), then other name matches (2) and finally
+        description matches (3).
+
+        :param str q: Search string.
+        :returns: SQL expression or None if the search string is empty.
+        """
+        q = cls._normalize_search(q)
+        if not q:
+            return None
+        name = func.lower(cls.name)
+        return case([
+            (name == q, 0),
+            (name.like('{0}%'.format(_like_escape(q)), escape='\\'), 1),
+            (name.like('%{0}%'.format(_like_escape(q)), escape='\\'), 2),
+        ], else_=3)
 
     @classmethod
     def search(cls, query, q):
-        """Modify query as so include only specific group names.
+        """Modify query as so include only groups matching a search string.
+
+        Groups whose name or description contains the search string (case
+        insensitive) are kept. From three characters on, the condition is
+        served by trigram indexes on PostgreSQL and by
+        :class:`GroupSearchNGram` on other databases; shorter strings are
+        only matched with ``LIKE``.
+
+        Results are ordered by relevance (see :meth:`_search_rank`), then by
+        name. Pass the search string to :meth:`paginate` to keep this order
+        across pages.
 
         :param query: Query object.
         :param str q: Search string.
         :returs: Query object.
         """
-        return query.filter(Group.name.like('%{0}%'.format(q)))
+        q = cls._normalize_search(q)
+        if not q:
+            return query
+
+        pattern = '%{0}%'.format(_like_escape(q))
+        criteria = [db.or_(
+            func.lower(cls.name).like(pattern, escape='\\'),
+            func.lower(cls.description).like(pattern, escape='\\'),
+        )]
+        if db.engine.dialect.name != 'postgresql' and \
+                len(q) >= GroupSearchNGram.N:
+            criteria.append(cls.id.in_(GroupSearchNGram.match(q)))
+
+        return query.filter(*criteria).order_by(None).order_by(
+            cls._search_rank(q), cls.name, cls.id)
 
     def add_admin(self, admin):
         """Invite an admin to a group.
@@ -358,6 +695,35 @@ class Group(db.Model):
         """
         return Membership.create(self, user, state)
 
+    def add_members(self, users, state=MembershipState.ACTIVE,
+                    chunk_size=1000):
+        """Add many users to a group at once.
+
+        Users which already have a membership in the group (in any state) are
+        skipped.
+
+        :param users: Iterable of User objects and/or user identifiers.
+        :param state: MembershipState. Default: MembershipState.ACTIVE.
+        :param int chunk_size: Number of rows inserted per statement.
+        :returns: Dictionary with the number of ``added`` and ``skipped``
+            users.
+        """
+        created, existing = Membership.create_many(
+            self, users, state=state, chunk_size=chunk_size)
+        return dict(added=len(created), skipped=len(existing))
+
+    def remove_members(self, users, chunk_size=1000):
+        """Remove many users from a group at once.
+
+        :param users: Iterable of User objects and/or user identifiers.
+        :param int chunk_size: Number of rows deleted per statement.
+        :returns: Dictionary with the number of ``removed`` and ``skipped``
+            users.
+        """
+        users = list(users)
+        removed = Membership.delete_many(self, users, chunk_size=chunk_size)
+        return dict(removed=len(removed), skipped=len(users) - len(removed))
+
     def remove_member(self, user):
         """Remove a user from a group (independent of their membership state).
 
@@ -379,22 +745,37 @@ class Group(db.Model):
             return self.add_member(user, state=MembershipState.PENDING_USER)
         return None
 
-    def invite_by_emails(self, emails):
+    def invite_by_emails(self, emails, chunk_size=500):
         """Invite users to a group by emails.
 
-        :param list emails: Emails of users that shall be invited.
-        :returns list: Newly created Memberships or Nones.
-        """
-        assert emails is None or isinstance(emails, list)
+        Emails are stripped, lower-cased and deduplicated. Users are resolved
+        with one query per chunk of emails and invitations are created in
+        bulk (see :meth:`Membership.create_many`).
 
-        results = []
+        :param emails: Iterable of emails of users that shall be invited.
+        :param int chunk_size: Number of emails resolved per query.
+        :returns: Ordered dictionary mapping each normalized email to an
+            :class:`InvitationStatus`.
+        """
+        assert emails is not None
 
+        results = OrderedDict()
         for email in emails:
-            try:
-                user = User.query.filter_by(email=email).one()
-                results.append(self.invite(user))
-            except NoResultFound:
-                results.append(None)
+            email = email.strip().lower()
+            if email:
+                results[email] = InvitationStatus.NOT_FOUND
+
+        normalized = list(results)
+        users = resolve_users_by_emails(normalized, chunk_size=chunk_size)
+
+        created, existing = Membership.create_many(
+            self, (users[e] for e in normalized if e in users),
+            state=MembershipState.PENDING_USER, chunk_size=chunk_size)
+        existing = set(existing)
+        for email, user_id in users.items():
+            if email in results:
+                results[email] = InvitationStatus.EXISTING \
+                    if user_id in existing else InvitationStatus.INVITED
 
         return results
 
@@ -416,25 +797,52 @@ class Group(db.Model):
     def is_admin(self, admin):
         """Verify if given admin is the group admin.
 
+        Nested administration is taken into account (see
+        :class:`GroupAdminClosure`). The answer is served from the
+        request-scoped :class:`PermissionCache`.
+
         :param admin: Admin to be checked.
         :returns: True or False.
         """
-        if GroupAdmin.get(self, admin) is not None:
-            return True
-        return False
+        is_admin, dummy_state = PermissionCache.get(self, admin)
+        return is_admin
+
+    def admin_users_ids(self, users_ids=None):
+        """Get identifiers of the users effectively administering the group.
+
+        Computed with a single query on :class:`GroupAdminClosure`, e.g. to
+        flag the admins of a whole page of members.
+
+        :param users_ids: Iterable of user identifiers to restrict the answer
+            to. Default: all admins.
+        :returns: Set of user identifiers.
+        """
+        query = db.session.query(GroupAdminClosure.admin_id).filter(
+            GroupAdminClosure.group_id == self.id,
+            GroupAdminClosure.admin_type == 'User',
+        )
+        if users_ids is not None:
+            users_ids = set(int(user_id) for user_id in users_ids)
+            if not users_ids:
+                return set()
+            query = query.filter(GroupAdminClosure.admin_id.in_(users_ids))
+        return set(row[0] for row in query)
 
     def is_member(self, user, with_pending=False):
         """Verify if given user is a group member.
 
+        The answer is served from the request-scoped
+        :class:`PermissionCache`.
+
         :param user: User to be checked.
         :param bool with_pending: Whether to include pending users or not.
         :returns: True or False.
         """
-        m = Membership.get(self, user)
-        if m is not None:
+        dummy_admin, state = PermissionCache.get(self, user)
+        if state is not None:
             if with_pending:
                 return True
-            elif m.state == MembershipState.ACTIVE:
+            elif state == MembershipState.ACTIVE:
                 return True
         return False
 
@@ -492,12 +900,149 @@ class Group(db.Model):
         else:
             return self.is_member(user)
 
+    @classmethod
+    def permissions_for(cls, user, groups):
+        """Evaluate the permissions of a user in many groups at once.
+
+        Groups given by id are loaded with one query and the
+        :class:`PermissionCache` is filled with another one, independently of
+        the number of groups.
+
+        :param user: User object.
+        :param groups: List of Group objects and/or group ids.
+        :returns: Dictionary mapping group ids to dictionaries with the results
+            of ``is_admin``, ``is_member``, ``can_edit``, ``can_leave``,
+            ``can_invite_others`` and ``can_see_members``.
+        """
+        objs = [g for g in groups if isinstance(g, Group)]
+        ids = [g for g in groups if not isinstance(g, Group)]
+        if ids:
+            objs.extend(cls.query.filter(cls.id.in_(ids)))
+
+        PermissionCache.preload(objs, user)
+
+        return dict(
+            (g.id, dict(
+                is_admin=g.is_admin(user),
+                is_member=g.is_member(user),
+                can_edit=g.can_edit(user),
+                can_leave=g.can_leave(user),
+                can_invite_others=g.can_invite_others(user),
+                can_see_members=g.can_see_members(user),
+            )) for g in objs
+        )
+
     def members_count(self):
         """Determine members count.
 
-        :returns: Number of memberships.
+        :returns: Number of active memberships.
         """
-        return Membership.query_by_group(self).count()
+        return self.active_members_count
+
+    @classmethod
+    def _update_counters(cls, group_id, deltas, users_ids=()):
+        """Atomically apply changes to the membership counters of a group.
+
+        The counters are incremented in SQL, so concurrent updates are never
+        lost. The modification timestamp of the group is left untouched.
+
+        The cached badge counts of the effective admins of the group are
+        invalidated when its requests change, and those of the given users
+        when their invitations change (see :func:`invalidate_badge_counts`).
+
+        :param group_id: Group identifier.
+        :param dict deltas: Mapping of membership states to count changes.
+        :param users_ids: Identifiers of the users whose memberships changed.
+        """
+        values = {}
+        changed = set()
+        for state, delta in deltas.items():
+            if delta:
+                state = getattr(state, 'code', state)
+                column = getattr(cls, cls.COUNTERS[state])
+                values[column] = column + delta
+                changed.add(state)
+        if not values:
+            return
+        if changed & set([MembershipState.PENDING_ADMIN,
+                          MembershipState.PENDING_USER]):
+            invalidate_badge_counts(
+                group_id=group_id
+                if MembershipState.PENDING_ADMIN in changed else None,
+                users_ids=users_ids
+                if MembershipState.PENDING_USER in changed else ())
+        values[cls.modified] = cls.modified
+
+        cls.query.filter_by(id=group_id).update(
+            values, synchronize_session=False)
+
+        obj = db.session.identity_map.get(
+            inspect(cls).identity_key_from_primary_key([group_id]))
+        if obj is not None:
+            db.session.expire(obj, list(cls.COUNTERS.values()))
+
+    @classmethod
+    def repair_counters(cls, groups_ids=None, chunk_size=1000):
+        """Recompute the membership counters of groups in bulk.
+
+        Groups are processed ``chunk_size`` at a time: the counts of a chunk
+        are computed with :meth:`Membership.query_counts_by_group_ids` and
+        only the groups whose counters differ are updated, with one
+        executemany statement.
+
+        :param list groups_ids: Identifiers of the groups to repair. Default:
+            all groups.
+        :param int chunk_size: Number of groups processed per query.
+        :returns: Number of repaired groups.
+        """
+        assert groups_ids is None or isinstance(groups_ids, list)
+        assert chunk_size > 0
+
+        states = (MembershipState.ACTIVE, MembershipState.PENDING_ADMIN,
+                  MembershipState.PENDING_USER)
+        columns = [getattr(cls, cls.COUNTERS[state]) for state in states]
+        table = cls.__table__
+        update = table.update().where(
+            table.c.id == db.bindparam('_id')
+        ).values(dict(
+            [(cls.COUNTERS[state], db.bindparam('_' + cls.COUNTERS[state]))
+             for state in states],
+            modified=table.c.modified,
+        ))
+
+        count = 0
+        last_id = None
+        while True:
+            query = db.session.query(cls.id, *columns).order_by(cls.id)
+            if groups_ids is not None:
+                query = query.filter(cls.id.in_(groups_ids))
+            if last_id is not None:
+                query = query.filter(cls.id > last_id)
+            rows = query.limit(chunk_size).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+
+            counts = dict(
+                (row.id_group, tuple(int(c or 0) for c in row[1:]))
+                for row in Membership.query_counts_by_group_ids(
+                    [row.id for row in rows]))
+            changed = [
+                dict(_id=row.id, **dict(
+                    ('_' + cls.COUNTERS[state], value)
+                    for state, value in zip(
+                        states, counts.get(row.id, (0, 0, 0)))))
+                for row in rows
+                if tuple(row[1:]) != counts.get(row.id, (0, 0, 0))
+            ]
+            if changed:
+                db.session.execute(update, changed)
+                count += len(changed)
+
+        for obj in list(db.session.identity_map.values()):
+            if isinstance(obj, cls):
+                db.session.expire(obj, list(cls.COUNTERS.values()))
+        return count
 
 
 class Membership(db.Model):
@@ -510,15 +1055,31 @@ class Membership(db.Model):
     }
     """Membership state choices."""
 
+    SORT_KEYS = {
+        'state': ('state', 'user_id'),
+        'user': ('user_id', ),
+        'created': ('created', 'user_id'),
+        'group': ('id_group', 'user_id'),
+    }
+    """Sort keys supported by :meth:`paginate`."""
+
     __tablename__ = 'groups_members'
 
+    __table_args__ = (
+        db.Index('ix_groups_members_id_group_state', 'id_group', 'state',
+                 'user_id'),
+        db.Index('ix_groups_members_user_id_state', 'user_id', 'state',
+                 'id_group'),
+        getattr(db.Model, '__table_args__', {})
+    )
+
     user_id = db.Column(db.Integer, db.ForeignKey(User.id),
                         nullable=False, primary_key=True)
     """User for membership."""
 
     id_group = db.Column(
-        db.Integer, db.ForeignKey(Group.id), nullable=False,
-        primary_key=True)
+        db.Integer, db.ForeignKey(Group.id, ondelete='CASCADE'),
+        nullable=False, primary_key=True)
     """Group for membership."""
 
     state = db.Column(ChoiceType(MEMBERSHIP_STATE, impl=db.String(1)),
@@ -529,7 +1090,7 @@ class Membership(db.Model):
     """Creation timestamp."""
 
     modified = db.Column(db.DateTime, nullable=False, default=datetime.now,
-                         onupdate=datetime.now)
+                         onupdate=datetime.now, index=True)
     """Modification timestamp."""
 
     #
@@ -541,7 +1102,7 @@ class Membership(db.Model):
     """User relaionship."""
 
     group = db.relationship(Group, backref=db.backref(
-        'members', cascade='all, delete-orphan'))
+        'members', cascade='all, delete-orphan', passive_deletes=True))
     """Group relationship."""
 
     @classmethod
@@ -587,68 +1148,225 @@ class Membership(db.Model):
 
     @classmethod
     def query_requests(cls, admin, eager=False):
-        """Get all pending group requests."""
-        # Get direct pending request
+        """Get all pending group requests.
+
+        Requests of all groups effectively administered by the admin are
+        included, whatever the nesting depth (see :class:`GroupAdminClosure`).
+        """
         if hasattr(admin, 'is_superadmin') and admin.is_superadmin:
-            q1 = GroupAdmin.query.with_entities(
+            groups_ids = GroupAdmin.query.with_entities(
                 GroupAdmin.group_id)
         else:
-            q1 = GroupAdmin.query_by_admin(admin).with_entities(
-                GroupAdmin.group_id)
-        q2 = Membership.query.filter(
+            groups_ids = GroupAdminClosure.query_by_admin(
+                admin).with_entities(GroupAdminClosure.group_id)
+
+        query = Membership.query.filter(
             Membership.state == MembershipState.PENDING_ADMIN,
-            Membership.id_group.in_(q1),
+            Membership.id_group.in_(groups_ids),
         )
+        if eager:
+            query = query.options(joinedload(Membership.group),
+                                  joinedload(Membership.user))
+        return query
 
-        # Get request from admin groups your are member of
-        q3 = Membership.query_by_user(
-            user=admin, state=MembershipState.ACTIVE
-        ).with_entities(Membership.id_group)
-        q4 = GroupAdmin.query.filter(
-            GroupAdmin.admin_type == 'Group', GroupAdmin.admin_id.in_(q3)
-        ).with_entities(GroupAdmin.group_id)
-        q5 = Membership.query.filter(
-            Membership.state == MembershipState.PENDING_ADMIN,
-            Membership.id_group.in_(q4))
+    @classmethod
+    def query_badge_counts(cls, user):
+        """Get the number of pending requests and invitations of a user.
 
-        query = q2.union(q5)
+        Both numbers are fetched by a single row query: requests are summed
+        from the counters of the groups effectively administered by the user
+        (see :meth:`query_requests`) and invitations are counted on the
+        ``(user_id, state)`` index.
 
-        return query
+        :param user: User object.
+        :returns: Query of one ``(requests, invitations)`` row.
+        """
+        if hasattr(user, 'is_superadmin') and user.is_superadmin:
+            groups_ids = db.session.query(GroupAdmin.group_id)
+        else:
+            groups_ids = db.session.query(GroupAdminClosure.group_id).filter(
+                GroupAdminClosure.admin_type == resolve_admin_type(user),
+                GroupAdminClosure.admin_id == user.get_id(),
+            )
+
+        requests = db.session.query(
+            func.coalesce(func.sum(Group.pending_requests_count), 0)
+        ).filter(Group.id.in_(groups_ids))
+        invitations = db.session.query(func.count()).select_from(
+            cls).filter(
+            cls.user_id == user.get_id(),
+            cls.state == MembershipState.PENDING_USER,
+        )
+
+        return db.session.query(
+            requests.as_scalar().label('requests'),
+            invitations.as_scalar().label('invitations'),
+        )
+
+    @classmethod
+    def badge_counts(cls, user):
+        """Get the number of pending requests and invitations of a user.
+
+        :param user: User object.
+        :returns: Dictionary with ``requests`` and ``invitations``.
+        """
+        row = cls.query_badge_counts(user).one()
+        return dict(requests=int(row.requests),
+                    invitations=int(row.invitations))
 
     @classmethod
-    def query_by_group(cls, group_or_id, with_invitations=False, **kwargs):
-        """Get a group's members."""
+    def query_by_group(cls, group_or_id, with_invitations=False,
+                       options=None, **kwargs):
+        """Get a group's members.
+
+        :param group_or_id: Group object or identifier.
+        :param bool with_invitations: Include pending invitations in addition
+            to active memberships.
+        :param options: List of loader options applied to the query, e.g.
+            ``[selectinload(Membership.user)]`` to fetch the users of a page
+            with one extra query.
+        :returns: Query object.
+        """
         if isinstance(group_or_id, Group):
             id_group = group_or_id.id
         else:
             id_group = group_or_id
 
         if not with_invitations:
-            return cls._filter(
+            query = cls._filter(
                 cls.query.filter_by(id_group=id_group),
                 **kwargs
             )
         else:
-            return cls.query.filter(
+            query = cls.query.filter(
                 Membership.id_group == id_group,
                 db.or_(
                     Membership.state == MembershipState.PENDING_USER,
                     Membership.state == MembershipState.ACTIVE
                 )
             )
+        if options:
+            query = query.options(*options)
+        return query
 
     @classmethod
-    def search(cls, query, q):
+    def query_modified_since(cls, since=None):
+        """Get memberships modified since a date, in modification order.
+
+        Memberships in every state are returned.
+
+        :param datetime since: Only get memberships modified since this date.
+        """
+        query = cls.query
+        if since is not None:
+            query = query.filter(cls.modified >= since)
+        return query.order_by(cls.modified, cls.id_group, cls.user_id)
+
+    @classmethod
+    def query_counts_by_group_ids(cls, groups_ids=None):
+        """Get count of memberships per group and state.
+
+        All counts are computed with a single grouped query.
+
+        :param list groups_ids: Identifiers of the groups to count. Default:
+            all groups.
+        :returns: Query of ``(id_group, active, pending_admin, pending_user)``
+            rows.
+        """
+        assert groups_ids is None or isinstance(groups_ids, list)
+
+        def _count(state):
+            return func.sum(case([(cls.state == state, 1)], else_=0))
+
+        query = db.session.query(
+            cls.id_group,
+            _count(MembershipState.ACTIVE).label('active'),
+            _count(MembershipState.PENDING_ADMIN).label('pending_admin'),
+            _count(MembershipState.PENDING_USER).label('pending_user'),
+        ).group_by(
+            cls.id_group
+        )
+
+        if groups_ids is not None:
+            query = query.filter(cls.id_group.in_(groups_ids))
+
+        return query
+
+    @classmethod
+    def search(cls, query, q, group_or_id=None):
         """Modify query as so include only specific members.
 
-        :param query: Query object.
+        Every whitespace separated term of the search string has to be a
+        prefix of one of the tokens of the member's email (see
+        :class:`MemberSearchToken`): the email, its local part, its domain
+        and parent domains (with or without a leading ``@``) and its words.
+        Other substrings of the email, e.g. the middle of a word, do not
+        match. Matching is case insensitive. Members with a token equal to
+        the first term come first.
+
+        When the group is given, each term is a range scan on the tokens of
+        the group; otherwise the tokens are looked up per membership.
+
+        :param query: Query object, e.g. from :meth:`query_by_group`.
         :param str q: Search string.
+        :param group_or_id: Group object or identifier the query is limited
+            to.
         :returs: Query object.
         """
-        query = query.join(User).filter(
-                User.email.like('%{0}%'.format(q)),
-        )
-        return query
+        terms = q.lower().split()
+        if not terms:
+            return query
+
+        token = MemberSearchToken
+        if group_or_id is None:
+            scope = token.id_group == cls.id_group
+        elif isinstance(group_or_id, Group):
+            scope = token.id_group == group_or_id.id
+        else:
+            scope = token.id_group == group_or_id
+
+        query = query.filter(*[
+            cls.user_id.in_(db.select([token.user_id]).where(db.and_(
+                scope,
+                token.token.like(_like_escape(term) + u'%', escape='\\'),
+            )))
+            for term in terms
+        ])
+
+        exact = aliased(token)
+        return query.outerjoin(exact, db.and_(
+            exact.id_group == cls.id_group,
+            exact.token == terms[0],
+            exact.user_id == cls.user_id,
+        )).order_by(None).order_by(
+            case([(exact.user_id.is_(None), 1)], else_=0), cls.user_id)
+
+    @classmethod
+    def paginate(cls, query, cursor=None, per_page=20, sort='state', s='asc',
+                 total=None):
+        """Paginate memberships with a cursor.
+
+        All sort keys are ordered in direction ``s``, so that a single
+        (backward) scan of an index on them serves any page. Ties are broken
+        by the (unique) user id. Memberships spanning several groups must be
+        sorted by ``group``, the only key unique across groups.
+
+        :param query: Query of memberships, e.g. from :meth:`query_by_group`
+            or :meth:`query_requests`.
+        :param cursor: Token of the page to fetch or None for the first page.
+        :param int per_page: Number of memberships per page.
+        :param str sort: Key of :attr:`SORT_KEYS`.
+        :param str s: Ordering: ``asc`` or ``desc``.
+        :param total: Total number of memberships, if known.
+        :returns: :class:`invenio_groups.pagination.KeysetPagination` object.
+        :raises ValueError: If the cursor is invalid.
+        """
+        assert sort in cls.SORT_KEYS
+        assert s in ('asc', 'desc')
+        columns = [getattr(cls, name) for name in cls.SORT_KEYS[sort]]
+        keys = [(c, s) for c in columns]
+        return KeysetPagination(query, keys, per_page=per_page,
+                                cursor=cursor, total=total)
 
     @classmethod
     def order(cls, query, field, s):
@@ -674,29 +1392,330 @@ class Membership(db.Model):
                 state=state,
             )
             db.session.add(membership)
+            Group._update_counters(group.id, {state: 1},
+                                   users_ids=[membership.user_id])
+            MemberSearchToken.index(group.id, [membership.user_id])
+        if membership.is_active():
+            GroupAdminClosure.refresh_members_of(
+                group.id, users_ids=[membership.user_id])
+            invalidate_user_groups([membership.user_id])
+        membership._invalidate_permissions()
+        _membership_changed(signals.membership_created, group.id, [
+            (membership.user_id, state)])
         return membership
 
+    @classmethod
+    def create_many(cls, group, users, state=MembershipState.ACTIVE,
+                    chunk_size=1000):
+        """Create memberships of many users in chunks.
+
+        Rows are inserted with one executemany statement per chunk, without
+        creating ORM objects. Users with an existing membership are skipped.
+        If a concurrent transaction adds some of the users meanwhile, the
+        chunk is inserted again row by row, skipping those users.
+
+        :raises sqlalchemy.exc.IntegrityError: If a row fails for another
+            reason than an existing membership (e.g. an unknown user).
+
+        :param group: Group object.
+        :param users: Iterable of User objects and/or user identifiers.
+        :param state: MembershipState.
+        :param int chunk_size: Number of users processed per chunk.
+        :returns: Tuple ``(created, existing)`` of lists of user identifiers.
+        """
+        assert MembershipState.validate(state)
+        assert chunk_size > 0
+
+        created = []
+        existing = []
+        seen = set()
+        chunk = []
+
+        def _existing(users_ids):
+            return set(row.user_id for row in cls.query.filter(
+                cls.id_group == group.id,
+                cls.user_id.in_(users_ids),
+            ).with_entities(cls.user_id))
+
+        def _flush(chunk):
+            found = _existing(chunk)
+            new = [user_id for user_id in chunk if user_id not in found]
+            now = datetime.now()
+            rows = [dict(user_id=user_id, id_group=group.id, state=state,
+                         created=now, modified=now) for user_id in new]
+            try:
+                with db.session.begin_nested():
+                    if rows:
+                        db.session.execute(cls.__table__.insert(), rows)
+            except IntegrityError:
+                new, failed, error = [], [], None
+                for row in rows:
+                    try:
+                        with db.session.begin_nested():
+                            db.session.execute(cls.__table__.insert(), row)
+                        new.append(row['user_id'])
+                    except IntegrityError as exc:
+                        failed.append(row['user_id'])
+                        error = exc
+                # Only the rows added meanwhile are existing memberships.
+                raced = _existing(failed) if failed else set()
+                if len(raced) < len(failed):
+                    raise error
+                found.update(raced)
+            MemberSearchToken.index(group.id, new)
+            existing.extend(user_id for user_id in chunk if user_id in found)
+            created.extend(new)
+
+        with db.session.begin_nested():
+            for user in users:
+                user_id = int(
+                    user.get_id() if hasattr(user, 'get_id') else user)
+                if user_id in seen:
+                    continue
+                seen.add(user_id)
+                chunk.append(user_id)
+                if len(chunk) >= chunk_size:
+                    _flush(chunk)
+                    chunk = []
+            if chunk:
+                _flush(chunk)
+            if created:
+                Group._update_counters(group.id, {state: len(created)},
+                                       users_ids=created)
+
+        if created:
+            if state == MembershipState.ACTIVE:
+                GroupAdminClosure.refresh_members_of(
+                    group.id, users_ids=created)
+                invalidate_user_groups(created)
+            PermissionCache.invalidate(
+                group_id=group.id, principal_type='User')
+            _membership_changed(signals.membership_created, group.id, [
+                (user_id, state) for user_id in created])
+        return created, existing
+
+    @classmethod
+    def upsert_many(cls, group, states, chunk_size=1000):
+        """Create or update memberships of many users in chunks.
+
+        Missing memberships are inserted with one executemany statement per
+        chunk and existing memberships in another state are updated with one
+        statement per chunk and target state, without creating ORM objects.
+        Counters, search tokens and effective admins are kept consistent.
+
+        :param group: Group object.
+        :param dict states: Mapping of user identifiers to MembershipState.
+        :param int chunk_size: Number of users processed per chunk.
+        :returns: Tuple ``(created, updated)`` of lists of user identifiers.
+        """
+        assert all(MembershipState.validate(s) for s in states.values())
+        assert chunk_size > 0
+
+        created = []
+        updated = []
+        active_changed = []
+        deltas = dict((state, 0) for state in Group.COUNTERS)
+        items = [(int(user_id), state) for user_id, state in states.items()]
+
+        with db.session.begin_nested():
+            for i in range(0, len(items), chunk_size):
+                chunk = dict(items[i:i + chunk_size])
+                found = dict(
+                    (row.user_id, getattr(row.state, 'code', row.state))
+                    for row in cls.query.filter(
+                        cls.id_group == group.id,
+                        cls.user_id.in_(list(chunk)),
+                    ).with_entities(cls.user_id, cls.state))
+
+                now = datetime.now()
+                new = [u for u in chunk if u not in found]
+                if new:
+                    db.session.execute(cls.__table__.insert(), [
+                        dict(user_id=u, id_group=group.id, state=chunk[u],
+                             created=now, modified=now)
+                        for u in new
+                    ])
+                    MemberSearchToken.index(group.id, new)
+
+                changed = [u for u in chunk
+                           if u in found and found[u] != chunk[u]]
+                for state in set(chunk[u] for u in changed):
+                    cls.query.filter(
+                        cls.id_group == group.id,
+                        cls.user_id.in_(
+                            [u for u in changed if chunk[u] == state]),
+                    ).update({cls.state: state, cls.modified: now},
+                             synchronize_session=False)
+
+                for u in new:
+                    deltas[chunk[u]] += 1
+                for u in changed:
+                    deltas[found[u]] -= 1
+                    deltas[chunk[u]] += 1
+                active_changed.extend(
+                    u for u in new if chunk[u] == MembershipState.ACTIVE)
+                active_changed.extend(
+                    u for u in changed if MembershipState.ACTIVE in (
+                        found[u], chunk[u]))
+                created.extend((u, chunk[u]) for u in new)
+                updated.extend((u, chunk[u]) for u in changed)
+
+            Group._update_counters(group.id, deltas, users_ids=[
+                u for u, dummy in created + updated])
+
+        if active_changed:
+            GroupAdminClosure.refresh_members_of(
+                group.id, users_ids=active_changed)
+            invalidate_user_groups(active_changed)
+        if created or updated:
+            PermissionCache.invalidate(
+                group_id=group.id, principal_type='User')
+        accepted = [(u, state) for u, state in updated
+                    if state == MembershipState.ACTIVE]
+        if created:
+            _membership_changed(signals.membership_created, group.id, created)
+        if accepted:
+            _membership_changed(
+                signals.membership_accepted, group.id, accepted)
+        if len(accepted) < len(updated):
+            _membership_changed(signals.membership_updated, group.id, [
+                (u, state) for u, state in updated
+                if state != MembershipState.ACTIVE])
+        return [u for u, dummy in created], [u for u, dummy in updated]
+
+    @classmethod
+    def delete_many(cls, group, users, chunk_size=1000):
+        """Delete memberships of many users in chunks.
+
+        Rows are deleted with one statement per chunk, independently of their
+        state. Users without a membership are skipped.
+
+        :param group: Group object.
+        :param users: Iterable of User objects and/or user identifiers.
+        :param int chunk_size: Number of users processed per chunk.
+        :returns: List of identifiers of the users whose membership was
+            deleted.
+        """
+        assert chunk_size > 0
+        users_ids = []
+        seen = set()
+        for user in users:
+            user_id = int(user.get_id() if hasattr(user, 'get_id') else user)
+            if user_id not in seen:
+                seen.add(user_id)
+                users_ids.append(user_id)
+
+        deleted = []
+        active = []
+        deltas = dict((state, 0) for state in Group.COUNTERS)
+        with db.session.begin_nested():
+            for i in range(0, len(users_ids), chunk_size):
+                found = dict(
+                    (row.user_id, getattr(row.state, 'code', row.state))
+                    for row in cls.query.filter(
+                        cls.id_group == group.id,
+                        cls.user_id.in_(users_ids[i:i + chunk_size]),
+                    ).with_entities(cls.user_id, cls.state))
+                if not found:
+                    continue
+                cls.query.filter(
+                    cls.id_group == group.id,
+                    cls.user_id.in_(list(found)),
+                ).delete(synchronize_session=False)
+                MemberSearchToken.unindex(group.id, list(found))
+                for user_id, state in found.items():
+                    deltas[state] -= 1
+                active.extend(user_id for user_id, state in found.items()
+                              if state == MembershipState.ACTIVE)
+                deleted.extend(found.items())
+            Group._update_counters(group.id, deltas, users_ids=[
+                u for u, dummy in deleted])
+
+        if active:
+            GroupAdminClosure.refresh_members_of(
+                group.id, users_ids=active)
+            invalidate_user_groups(active)
+        if deleted:
+            PermissionCache.invalidate(
+                group_id=group.id, principal_type='User')
+            _membership_changed(signals.membership_removed, group.id, deleted)
+        return [user_id for user_id, dummy in deleted]
+
     @classmethod
     def delete(cls, group, user):
         """Delete membership."""
         with db.session.begin_nested():
-            cls.query.filter_by(group=group, user_id=user.get_id()).delete()
+            query = cls.query.filter_by(group=group, user_id=user.get_id())
+            state = query.with_entities(cls.state).with_for_update().scalar()
+            if query.delete() and state is not None:
+                Group._update_counters(group.id, {state: -1},
+                                       users_ids=[user.get_id()])
+                MemberSearchToken.unindex(group.id, [user.get_id()])
+        if state == MembershipState.ACTIVE:
+            GroupAdminClosure.refresh_members_of(
+                group.id, users_ids=[user.get_id()])
+            invalidate_user_groups([user.get_id()])
+        PermissionCache.invalidate(
+            group_id=group.id, principal_type='User',
+            principal_id=user.get_id())
+        if state is not None:
+            _membership_changed(signals.membership_removed, group.id, [
+                (user.get_id(), state)])
 
     def accept(self):
         """Activate membership."""
         with db.session.begin_nested():
+            previous_state = self.state
             self.state = MembershipState.ACTIVE
             db.session.merge(self)
+            if previous_state != MembershipState.ACTIVE:
+                Group._update_counters(self.id_group, {
+                    previous_state: -1,
+                    MembershipState.ACTIVE: 1,
+                }, users_ids=[self.user_id])
+        if previous_state != MembershipState.ACTIVE:
+            GroupAdminClosure.refresh_members_of(
+                self.id_group, users_ids=[self.user_id])
+            invalidate_user_groups([self.user_id])
+            _membership_changed(signals.membership_accepted, self.id_group, [
+                (self.user_id, self.state)])
+        self._invalidate_permissions()
 
     def reject(self):
         """Remove membership."""
         with db.session.begin_nested():
             db.session.delete(self)
+            Group._update_counters(self.id_group, {self.state: -1},
+                                   users_ids=[self.user_id])
+            MemberSearchToken.unindex(self.id_group, [self.user_id])
+        if self.is_active():
+            GroupAdminClosure.refresh_members_of(
+                self.id_group, users_ids=[self.user_id])
+            invalidate_user_groups([self.user_id])
+        self._invalidate_permissions()
+        _membership_changed(signals.membership_rejected, self.id_group, [
+            (self.user_id, self.state)])
+
+    def _invalidate_permissions(self):
+        """Drop the cached permissions of the membership's user."""
+        PermissionCache.invalidate(
+            group_id=self.id_group, principal_type='User',
+            principal_id=self.user_id)
 
     def is_active(self):
         """Check if membership is in an active state."""
         return self.state == MembershipState.ACTIVE
 
+    def to_dict(self):
+        """Get a JSON serializable representation of the membership."""
+        return dict(
+            group_id=self.id_group,
+            user_id=self.user_id,
+            state=getattr(self.state, 'code', self.state),
+            created=self.created.isoformat(),
+            modified=self.modified.isoformat(),
+        )
+
 
 # NOTE: Below database model should be refactored once the ACL system have been
 # rewritten to allow efficient list queries (i.e. list me all groups i have
@@ -708,13 +1727,17 @@ class GroupAdmin(db.Model):
 
     __table_args__ = (
         db.UniqueConstraint('group_id', 'admin_type', 'admin_id'),
+        db.Index('ix_groups_admin_admin', 'admin_type', 'admin_id',
+                 'group_id'),
         getattr(db.Model, '__table_args__', {})
     )
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     """GroupAdmin identifier."""
 
-    group_id = db.Column(db.Integer, db.ForeignKey(Group.id), nullable=False)
+    group_id = db.Column(
+        db.Integer, db.ForeignKey(Group.id, ondelete='CASCADE'),
+        nullable=False)
     """Group for membership."""
 
     admin_type = db.Column(db.Unicode(255))
@@ -728,7 +1751,7 @@ class GroupAdmin(db.Model):
     #
 
     group = db.relationship(Group, backref=db.backref(
-        'admins', cascade='all, delete-orphan'))
+        'admins', cascade='all, delete-orphan', passive_deletes=True))
     """Group relationship."""
 
     admin = generic_relationship(admin_type, admin_id)
@@ -749,8 +1772,60 @@ class GroupAdmin(db.Model):
                 admin=admin,
             )
             db.session.add(obj)
+        GroupAdminClosure.refresh_administered_by(group)
+        PermissionCache.invalidate(
+            group_id=group.id, principal_type=obj.admin_type,
+            principal_id=obj.admin_id)
+        _admins_changed(signals.admin_added, [
+            (group.id, obj.admin_type, obj.admin_id)])
         return obj
 
+    @classmethod
+    def create_many(cls, group, users, chunk_size=1000):
+        """Make many users admins of a group at once.
+
+        Rows are inserted with one executemany statement per chunk and the
+        effective admins are refreshed once. Existing admins are skipped.
+
+        :param group: Group object.
+        :param users: Iterable of User objects and/or user identifiers.
+        :param int chunk_size: Number of users processed per chunk.
+        :returns: List of identifiers of the new admins.
+        """
+        assert chunk_size > 0
+        users_ids = []
+        seen = set()
+        for user in users:
+            user_id = int(user.get_id() if hasattr(user, 'get_id') else user)
+            if user_id not in seen:
+                seen.add(user_id)
+                users_ids.append(user_id)
+
+        created = []
+        with db.session.begin_nested():
+            for i in range(0, len(users_ids), chunk_size):
+                chunk = users_ids[i:i + chunk_size]
+                found = set(row.admin_id for row in cls.query.filter(
+                    cls.group_id == group.id,
+                    cls.admin_type == 'User',
+                    cls.admin_id.in_(chunk),
+                ).with_entities(cls.admin_id))
+                new = [u for u in chunk if u not in found]
+                if new:
+                    db.session.execute(cls.__table__.insert(), [
+                        dict(group_id=group.id, admin_type='User', admin_id=u)
+                        for u in new
+                    ])
+                created.extend(new)
+
+        if created:
+            GroupAdminClosure.refresh_administered_by(group)
+            PermissionCache.invalidate(
+                group_id=group.id, principal_type='User')
+            _admins_changed(signals.admin_added, [
+                (group.id, 'User', user_id) for user_id in created])
+        return created
+
     @classmethod
     def get(cls, group, admin):
         """Get specific GroupAdmin object."""
@@ -773,6 +1848,12 @@ class GroupAdmin(db.Model):
             obj = cls.query.filter(
                 cls.admin == admin, cls.group == group).one()
             db.session.delete(obj)
+        GroupAdminClosure.refresh_administered_by(group)
+        PermissionCache.invalidate(
+            group_id=group.id, principal_type=obj.admin_type,
+            principal_id=obj.admin_id)
+        _admins_changed(signals.admin_removed, [
+            (group.id, obj.admin_type, obj.admin_id)])
 
     @classmethod
     def query_by_group(cls, group):
@@ -804,11 +1885,1006 @@ class GroupAdmin(db.Model):
         return query
 
 
+class GroupAdminClosure(db.Model):
+    """Effective administrators of groups.
+
+    Transitive closure of :class:`GroupAdmin`. A principal effectively
+    administers a group if it is a direct admin of it, or if it directly or
+    effectively administers a group which is an admin of it. Active members
+    of a group effectively administer everything that the group effectively
+    administers.
+
+    The table is kept up to date incrementally whenever admins or memberships
+    change, so that both "who administers group X" and "which groups does
+    principal P administer" are single indexed lookups.
+    """
+
+    __tablename__ = 'groups_admin_closure'
+
+    admin_type = db.Column(db.Unicode(255), primary_key=True)
+    """Type of the effective admin."""
+
+    admin_id = db.Column(db.Integer, primary_key=True)
+    """Identifier of the effective admin."""
+
+    group_id = db.Column(
+        db.Integer, db.ForeignKey(Group.id, ondelete='CASCADE'),
+        primary_key=True, index=True)
+    """Administered group."""
+
+    @classmethod
+    def query_by_group(cls, group):
+        """Get all effective admins of a group."""
+        return cls.query.filter_by(group_id=group.id)
+
+    @classmethod
+    def query_by_admin(cls, admin):
+        """Get all groups effectively administered by an admin."""
+        return cls.query.filter_by(
+            admin_type=resolve_admin_type(admin), admin_id=admin.get_id())
+
+    @classmethod
+    def administered_ids(cls, admin):
+        """Get identifiers of groups effectively administered by an admin.
+
+        :param admin: Admin object.
+        :returns: List of group identifiers.
+        """
+        return [row.group_id for row in cls.query_by_admin(
+            admin).with_entities(cls.group_id)]
+
+    @classmethod
+    def _resolve(cls, group_id, users_ids=None):
+        """Compute the effective admins of a group from :class:`GroupAdmin`.
+
+        :param group_id: Group identifier.
+        :param users_ids: Identifiers of the users to resolve, or None for
+            all admins.
+        :returns: Set of ``(admin_type, admin_id)`` tuples.
+        """
+        admin_groups = set()
+        frontier = set([group_id])
+        while frontier:
+            found = set(row.admin_id for row in GroupAdmin.query.filter(
+                GroupAdmin.group_id.in_(frontier),
+                GroupAdmin.admin_type == 'Group',
+            ).with_entities(GroupAdmin.admin_id))
+            frontier = found - admin_groups
+            admin_groups |= found
+
+        admins = GroupAdmin.query.filter(
+            GroupAdmin.group_id.in_(admin_groups | set([group_id])),
+            GroupAdmin.admin_type != 'Group',
+        )
+        members = Membership.query.filter(
+            Membership.id_group.in_(admin_groups),
+            Membership.state == MembershipState.ACTIVE,
+        )
+        if users_ids is None:
+            principals = set(('Group', gid) for gid in admin_groups)
+        else:
+            principals = set()
+            admins = admins.filter(GroupAdmin.admin_type == 'User',
+                                   GroupAdmin.admin_id.in_(users_ids))
+            members = members.filter(Membership.user_id.in_(users_ids))
+        principals.update(admins.with_entities(
+            GroupAdmin.admin_type, GroupAdmin.admin_id))
+        if admin_groups:
+            principals.update(('User', row.user_id) for row in
+                              members.with_entities(Membership.user_id))
+        return principals
+
+    @classmethod
+    def refresh(cls, groups_ids, users_ids=None):
+        """Recompute the effective admins of groups.
+
+        Only the difference to the stored rows is written.
+
+        :param groups_ids: Identifiers of the administered groups.
+        :param users_ids: Identifiers of the users to recompute, e.g. the
+            members who left an admin group, or None for all admins.
+        :returns: Set of ``(admin_type, admin_id, group_id)`` tuples which
+            were added or removed.
+        """
+        if users_ids is not None:
+            users_ids = list(set(int(user_id) for user_id in users_ids))
+            if not users_ids:
+                return set()
+        changed = set()
+        for group_id in set(groups_ids):
+            current = cls.query.filter_by(group_id=group_id)
+            if users_ids is not None:
+                current = current.filter(cls.admin_type == 'User',
+                                         cls.admin_id.in_(users_ids))
+            current = set(current.with_entities(cls.admin_type, cls.admin_id))
+            resolved = cls._resolve(group_id, users_ids=users_ids)
+
+            removed = current - resolved
+            for admin_type in set(t for t, dummy_id in removed):
+                cls.query.filter(
+                    cls.group_id == group_id,
+                    cls.admin_type == admin_type,
+                    cls.admin_id.in_(
+                        [i for t, i in removed if t == admin_type]),
+                ).delete(synchronize_session=False)
+
+            added = resolved - current
+            if added:
+                db.session.execute(cls.__table__.insert(), [
+                    dict(admin_type=t, admin_id=i, group_id=group_id)
+                    for t, i in added
+                ])
+
+            for admin_type, admin_id in removed | added:
+                changed.add((admin_type, admin_id, group_id))
+                PermissionCache.invalidate(
+                    group_id=group_id, principal_type=admin_type,
+                    principal_id=admin_id)
+        invalidate_user_groups(
+            admin_id for admin_type, admin_id, dummy_group in changed
+            if admin_type == 'User')
+        return changed
+
+    @classmethod
+    def refresh_administered_by(cls, group):
+        """Refresh a group and all groups it effectively administers.
+
+        Needed when the admins of the group change.
+
+        :param group: Group object.
+        :returns: Set of changed rows, see :meth:`refresh`.
+        """
+        return cls.refresh([group.id] + cls.administered_ids(group))
+
+    @classmethod
+    def refresh_members_of(cls, group_id, users_ids=None):
+        """Refresh all groups effectively administered by a group.
+
+        Needed when the active members of the group change.
+
+        :param group_id: Group identifier.
+        :param users_ids: Identifiers of the members who joined or left, or
+            None to recompute all admins.
+        :returns: Set of changed rows, see :meth:`refresh`.
+        """
+        return cls.refresh((row.group_id for row in cls.query.filter_by(
+            admin_type='Group', admin_id=group_id
+        ).with_entities(cls.group_id)), users_ids=users_ids)
+
+    @classmethod
+    def rebuild(cls):
+        """Recompute the effective admins of all groups.
+
+        :returns: Set of changed rows, see :meth:`refresh`.
+        """
+        return cls.refresh(row.id for row in Group.query.with_entities(
+            Group.id))
+
+
+class GroupSearchNGram(db.Model):
+    """Trigrams of group names and descriptions.
+
+    Side table used by :meth:`Group.search` to find substrings without
+    scanning all groups on databases without trigram indexes. On PostgreSQL
+    the ``pg_trgm`` indexes on the group table are used instead and this
+    table stays empty.
+
+    Rows are maintained by mapper events on :class:`Group`; use
+    :meth:`reindex` to fill the table for existing groups.
+    """
+
+    __tablename__ = 'groups_search_ngram'
+
+    N = 3
+    """Length of the n-grams."""
+
+    ngram = db.Column(db.Unicode(N), primary_key=True)
+    """Lower-cased n-gram."""
+
+    group_id = db.Column(
+        db.Integer, db.ForeignKey(Group.id, ondelete='CASCADE'),
+        primary_key=True, index=True)
+    """Group containing the n-gram."""
+
+    @classmethod
+    def ngrams(cls, name, description=None):
+        """Get the n-grams of a group name and description.
+
+        The text is lower-cased and whitespace is normalized.
+
+        :returns: Set of n-grams.
+        """
+        text = u' '.join(
+            u' '.join(t.lower().split()) for t in (name, description) if t)
+        return set(text[i:i + cls.N] for i in range(len(text) - cls.N + 1))
+
+    @classmethod
+    def match(cls, q):
+        """Query identifiers of groups which may contain a search string.
+
+        The result is a superset of the matching groups: all n-grams of the
+        search string are present, but not necessarily contiguously.
+
+        :param str q: Lower-cased search string, at least :attr:`N`
+            characters long.
+        :returns: Query object.
+        """
+        assert len(q) >= cls.N
+        ngrams = set(q[i:i + cls.N] for i in range(len(q) - cls.N + 1))
+        return db.session.query(cls.group_id).filter(
+            cls.ngram.in_(ngrams)
+        ).group_by(cls.group_id).having(func.count(cls.ngram) == len(ngrams))
+
+    @classmethod
+    def index(cls, connection, group_id, name, description):
+        """Replace the n-grams of a group.
+
+        :param connection: Connection to execute the statements with.
+        """
+        table = cls.__table__
+        connection.execute(table.delete().where(table.c.group_id == group_id))
+        rows = [dict(ngram=ngram, group_id=group_id)
+                for ngram in cls.ngrams(name, description)]
+        if rows:
+            connection.execute(table.insert(), rows)
+
+    @classmethod
+    def reindex(cls, chunk_size=1000):
+        """Rebuild the n-grams of all groups.
+
+        Nothing is done on PostgreSQL.
+
+        :param int chunk_size: Number of groups loaded at once.
+        :returns: Number of indexed groups.
+        """
+        if db.engine.dialect.name == 'postgresql':
+            return 0
+
+        cls.query.delete(synchronize_session=False)
+        connection = db.session.connection()
+        count = 0
+        for row in Group.query.with_entities(
+                Group.id, Group.name, Group.description
+        ).order_by(Group.id).yield_per(chunk_size):
+            cls.index(connection, row.id, row.name, row.description)
+            count += 1
+        return count
+
+
+@event.listens_for(Group, 'after_insert')
+@event.listens_for(Group, 'after_update')
+def _index_group_ngrams(mapper, connection, target):
+    """Keep the n-grams of a group up to date."""
+    if connection.dialect.name == 'postgresql':
+        return
+    state = inspect(target)
+    if state.attrs.name.history.has_changes() or \
+            state.attrs.description.history.has_changes():
+        GroupSearchNGram.index(
+            connection, target.id, target.name, target.description)
+
+
+@event.listens_for(Group, 'after_delete')
+def _delete_group_ngrams(mapper, connection, target):
+    """Remove the n-grams of a deleted group."""
+    table = GroupSearchNGram.__table__
+    connection.execute(table.delete().where(table.c.group_id == target.id))
+
+
+class MemberSearchToken(db.Model):
+    """Tokens of the emails of group members.
+
+    Each membership has a row per token of the lower-cased email of its
+    user: the whole email, the local part, the domain with and without a
+    leading ``@``, the parent domains and the alphanumeric words of the
+    email. The primary key starts with the group, so prefix searches are
+    range scans limited to one group (see :meth:`Membership.search`). Tokens
+    are compared bytewise on PostgreSQL and case insensitively on SQLite, the
+    collations with which ``LIKE`` prefixes can use the index.
+
+    Rows are maintained together with memberships and when the email of a
+    user changes; use :meth:`reindex` to fill the table for existing
+    memberships.
+    """
+
+    __tablename__ = 'groups_members_search'
+
+    id_group = db.Column(
+        db.Integer, db.ForeignKey(Group.id, ondelete='CASCADE'),
+        primary_key=True)
+    """Group of the membership."""
+
+    token = db.Column(
+        db.Unicode(255).with_variant(
+            db.Unicode(255, collation='C'), 'postgresql'
+        ).with_variant(db.Unicode(255, collation='NOCASE'), 'sqlite'),
+        primary_key=True)
+    """Lower-cased token of the member's email."""
+
+    user_id = db.Column(
+        db.Integer, db.ForeignKey(User.id, ondelete='CASCADE'),
+        primary_key=True)
+    """User of the membership."""
+
+    @staticmethod
+    def tokens(email):
+        """Split an email into search tokens.
+
+        :param str email: Email.
+        :returns: Set of tokens.
+        """
+        email = (email or u'').strip().lower()
+        if not email:
+            return set()
+        local, dummy_at, domain = email.rpartition('@')
+        tokens = set([email])
+        if local:
+            labels = domain.split(u'.')
+            tokens.update(u'.'.join(labels[i:])
+                          for i in range(len(labels) - 1))
+            tokens.update([local, u'@' + domain])
+        tokens.update(re.split(r'[\W_]+', email, flags=re.UNICODE))
+        tokens.discard(u'')
+        return tokens
+
+    @classmethod
+    def _rows(cls, connection, group_id, users_ids):
+        """Get the token rows of users in a group."""
+        users = User.__table__
+        rows = []
+        for user_id, email in connection.execute(
+                db.select([users.c.id, users.c.email]).where(
+                    users.c.id.in_(users_ids))):
+            rows.extend(dict(id_group=group_id, user_id=user_id, token=token)
+                        for token in cls.tokens(email))
+        return rows
+
+    @classmethod
+    def index(cls, group_id, users_ids):
+        """Add the tokens of new members of a group.
+
+        :param group_id: Group identifier.
+        :param users_ids: List of user identifiers.
+        """
+        if not users_ids:
+            return
+        connection = db.session.connection()
+        rows = cls._rows(connection, group_id, users_ids)
+        if rows:
+            connection.execute(cls.__table__.insert(), rows)
+
+    @classmethod
+    def unindex(cls, group_id, users_ids=None):
+        """Remove the tokens of members of a group.
+
+        :param group_id: Group identifier.
+        :param users_ids: List of user identifiers or None for all members.
+        """
+        query = cls.query.filter_by(id_group=group_id)
+        if users_ids is not None:
+            if not users_ids:
+                return
+            query = query.filter(cls.user_id.in_(users_ids))
+        query.delete(synchronize_session=False)
+
+    @classmethod
+    def reindex(cls, chunk_size=1000):
+        """Rebuild the tokens of all memberships.
+
+        :param int chunk_size: Number of memberships processed at once.
+        :returns: Number of indexed memberships.
+        """
+        cls.query.delete(synchronize_session=False)
+        connection = db.session.connection()
+        members = Membership.__table__
+        users = User.__table__
+        count = 0
+        rows = []
+        for id_group, user_id, email in connection.execute(db.select([
+            members.c.id_group, members.c.user_id, users.c.email,
+        ]).select_from(members.join(users))):
+            rows.extend(dict(id_group=id_group, user_id=user_id, token=token)
+                        for token in cls.tokens(email))
+            count += 1
+            if count % chunk_size == 0:
+                connection.execute(cls.__table__.insert(), rows)
+                rows = []
+        if rows:
+            connection.execute(cls.__table__.insert(), rows)
+        return count
+
+
+@event.listens_for(User, 'after_update')
+def _reindex_member_tokens(mapper, connection, target):
+    """Update the member search tokens of a user whose email changed."""
+    if not inspect(target).attrs.email.history.has_changes():
+        return
+    table = MemberSearchToken.__table__
+    members = Membership.__table__
+    connection.execute(table.delete().where(table.c.user_id == target.id))
+    rows = [
+        dict(id_group=id_group, user_id=target.id, token=token)
+        for (id_group, ) in connection.execute(
+            db.select([members.c.id_group]).where(
+                members.c.user_id == target.id))
+        for token in MemberSearchToken.tokens(target.email)
+    ]
+    if rows:
+        connection.execute(table.insert(), rows)
+
+
+for _ddl in (
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX ix_groups_name_trgm ON groups '
+    'USING gin (lower(name) gin_trgm_ops)',
+    'CREATE INDEX ix_groups_description_trgm ON groups '
+    'USING gin (lower(description) gin_trgm_ops)',
+):
+    event.listen(Group.__table__, 'after_create',
+                 DDL(_ddl).execute_if(dialect='postgresql'))
+
+LOWER_EMAIL_INDEX_DIALECTS = ('postgresql', 'sqlite')
+"""Databases with an index on the lower-cased emails of users.
+
+MySQL compares emails case insensitively with its default collations.
+"""
+
+event.listen(User.__table__, 'after_create', DDL(
+    'CREATE INDEX ix_accounts_user_email_lower ON accounts_user '
+    '(lower(email))'
+).execute_if(callable_=lambda ddl, target, bind, **kwargs:
+             bind.dialect.name in LOWER_EMAIL_INDEX_DIALECTS))
+
+
+class GroupJob(db.Model):
+    """Background operation on a group.
+
+    Jobs are submitted and executed by :mod:`invenio_groups.jobs`; the row
+    keeps their status and progress so that it can be polled.
+    """
+
+    __tablename__ = 'groups_job'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    """Job identifier."""
+
+    kind = db.Column(db.String(32), nullable=False)
+    """Name of the operation, a key of ``invenio_groups.jobs.JOB_HANDLERS``."""
+
+    group_id = db.Column(db.Integer, nullable=False, index=True)
+    """Target group (not a foreign key, jobs may delete their group)."""
+
+    user_id = db.Column(
+        db.Integer, db.ForeignKey(User.id, ondelete='SET NULL'),
+        nullable=True, index=True)
+    """User who submitted the job."""
+
+    status = db.Column(db.String(16), nullable=False,
+                       default=JobStatus.PENDING)
+    """Job status, see :class:`JobStatus`."""
+
+    payload = db.Column(JSONType, nullable=False, default=dict)
+    """Arguments of the operation."""
+
+    result = db.Column(JSONType, nullable=True)
+    """Result of the operation once successful."""
+
+    error = db.Column(db.Text, nullable=True)
+    """Error message of a failed job."""
+
+    done = db.Column(db.Integer, nullable=False, default=0)
+    """Number of processed items."""
+
+    total = db.Column(db.Integer, nullable=True)
+    """Number of items to process, if known."""
+
+    created = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    """Creation timestamp."""
+
+    modified = db.Column(db.DateTime, nullable=False, default=datetime.now,
+                         onupdate=datetime.now)
+    """Modification timestamp."""
+
+    @classmethod
+    def query_unfinished(cls, group_id):
+        """Get the pending and running jobs of a group, oldest first."""
+        return cls.query.filter(
+            cls.group_id == group_id,
+            cls.status.in_([JobStatus.PENDING, JobStatus.RUNNING]),
+        ).order_by(cls.id)
+
+    def to_dict(self):
+        """Get a JSON serializable representation of the job."""
+        return dict(
+            id=self.id,
+            kind=self.kind,
+            group_id=self.group_id,
+            status=self.status,
+            done=self.done,
+            total=self.total,
+            result=self.result,
+            error=self.error,
+            created=self.created.isoformat(),
+            modified=self.modified.isoformat(),
+        )
+
+
+class GroupChange(db.Model):
+    """Entry of the ordered change log of memberships and admins.
+
+    An entry is appended in the same transaction as every membership or admin
+    mutation and every group deletion, so that other services can stay in
+    sync by reading the changes after the last sequence number they have seen
+    (see :meth:`query_since`) instead of reading whole tables.
+
+    .. note:: Sequence numbers are allocated when entries are written, not
+       when they are committed: an entry of a long running transaction can
+       become visible after entries with higher numbers. Consumers needing
+       every entry should read again a short window before their cursor.
+    """
+
+    __tablename__ = 'groups_change'
+
+    __table_args__ = (
+        db.Index('ix_groups_change_principal',
+                 'group_id', 'principal_type', 'principal_id'),
+        getattr(db.Model, '__table_args__', {})
+    )
+
+    seq = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    """Sequence number."""
+
+    operation = db.Column(db.String(32), nullable=False)
+    """Name of the operation, the name of the signal of
+    :mod:`invenio_groups.signals` sent for it (e.g. ``membership-created``).
+    """
+
+    group_id = db.Column(db.Integer, nullable=False)
+    """Group (not a foreign key, entries outlive their group)."""
+
+    principal_type = db.Column(db.Unicode(255), nullable=False)
+    """Type of the member (``User``) or admin (``User`` or ``Group``), or
+    ``Group`` for deletions of groups."""
+
+    principal_id = db.Column(db.Integer, nullable=False)
+    """Identifier of the member or admin, or of the deleted group."""
+
+    state = db.Column(db.String(1), nullable=True)
+    """Membership state, see :class:`MembershipState` (before the deletion
+    of removed memberships, ``None`` for admins)."""
+
+    created = db.Column(db.DateTime, nullable=False, default=datetime.now,
+                        index=True)
+    """Creation timestamp."""
+
+    ADMIN_OPERATIONS = (signals.admin_added.name, signals.admin_removed.name)
+    """Operations on admins, all others are operations on memberships."""
+
+    TOMBSTONE_OPERATIONS = (
+        signals.group_deleted.name,
+        signals.membership_rejected.name,
+        signals.membership_removed.name,
+    )
+    """Operations deleting groups or memberships."""
+
+    @classmethod
+    def record(cls, operation, changes):
+        """Append entries to the change log with one executemany statement.
+
+        :param str operation: Name of the operation.
+        :param changes: List of ``(group_id, principal_type, principal_id,
+            state)`` tuples.
+        """
+        if not changes:
+            return
+        now = datetime.now()
+        db.session.execute(cls.__table__.insert(), [
+            dict(operation=operation, group_id=group_id,
+                 principal_type=principal_type, principal_id=principal_id,
+                 state=state, created=now)
+            for group_id, principal_type, principal_id, state in changes
+        ])
+
+    @classmethod
+    def query_since(cls, seq=0, groups_ids=None):
+        """Get the entries following a sequence number, in order.
+
+        :param int seq: Last sequence number seen by the consumer.
+        :param groups_ids: Restrict the entries to these groups.
+        """
+        query = cls.query.filter(cls.seq > seq)
+        if groups_ids is not None:
+            query = query.filter(cls.group_id.in_(list(groups_ids)))
+        return query.order_by(cls.seq)
+
+    @classmethod
+    def query_tombstones(cls, since=None):
+        """Get the deletions of groups and memberships, in order.
+
+        The date is turned into the first sequence number written since then,
+        so that the entries are read as a range of the primary key.
+
+        :param datetime since: Only get the deletions made since this date.
+        """
+        query = cls.query.filter(cls.operation.in_(cls.TOMBSTONE_OPERATIONS))
+        if since is not None:
+            query = query.filter(cls.seq >= db.session.query(
+                func.min(cls.seq)).filter(cls.created >= since).as_scalar())
+        return query.order_by(cls.seq)
+
+    @classmethod
+    def last_seq(cls):
+        """Get the last sequence number, ``0`` if the log is empty."""
+        return db.session.query(func.max(cls.seq)).scalar() or 0
+
+    @classmethod
+    def compact(cls, before, chunk_size=10000):
+        """Drop the superseded entries older than a date in bulk.
+
+        Among the entries created before ``before``, only the last one of each
+        membership and admin is kept, so that the log still holds the state of
+        every membership and admin (removals included). The superseded
+        entries are looked up per ``chunk_size`` sequence numbers and deleted
+        by sequence number.
+
+        .. note:: The session is committed by this method.
+
+        :param datetime before: Entries created before this date are compacted.
+        :param int chunk_size: Number of sequence numbers per transaction.
+        :returns: Number of deleted entries.
+        """
+        assert chunk_size > 0
+        upto = db.session.query(func.max(cls.seq)).filter(
+            cls.created < before).scalar()
+        if upto is None:
+            return 0
+        first = db.session.query(func.min(cls.seq)).scalar()
+
+        table = cls.__table__
+        later = table.alias('later')
+
+        def _kind(t):
+            return case([(t.c.operation.in_(cls.ADMIN_OPERATIONS), 'admin')],
+                        else_='membership')
+
+        superseded = db.exists().where(db.and_(
+            later.c.group_id == table.c.group_id,
+            later.c.principal_type == table.c.principal_type,
+            later.c.principal_id == table.c.principal_id,
+            later.c.seq > table.c.seq,
+            _kind(later) == _kind(table),
+        ))
+
+        deleted = 0
+        for start in range(first - 1, upto, chunk_size):
+            # MySQL cannot delete from a table used in a subquery, so the
+            # superseded entries are selected first.
+            seqs = [row.seq for row in db.session.execute(
+                db.select([table.c.seq]).where(db.and_(
+                    table.c.seq > start,
+                    table.c.seq <= min(start + chunk_size, upto),
+                    superseded,
+                )))]
+            for i in range(0, len(seqs), 500):
+                deleted += db.session.execute(table.delete().where(
+                    table.c.seq.in_(seqs[i:i + 500]))).rowcount
+            db.session.commit()
+        return deleted
+
+    def to_dict(self):
+        """Get a JSON serializable representation of the entry."""
+        return dict(
+            seq=self.seq,
+            operation=self.operation,
+            group_id=self.group_id,
+            principal_type=self.principal_type,
+            principal_id=self.principal_id,
+            state=self.state,
+            created=self.created.isoformat(),
+        )
+
+
+class PermissionCache(object):
+    """Request-scoped cache of group permissions.
+
+    Entries are keyed by ``(group id, principal type, principal id)`` and hold
+    a tuple ``(is_admin, membership_state)``. They live on :data:`flask.g`, so
+    they are dropped together with the application context. A whole page of
+    groups is filled with a single query via :meth:`preload`; single misses
+    are filled the same way for the one group being asked about.
+    """
+
+    attr_name = '_invenio_groups_permissions'
+    """Name of the attribute on :data:`flask.g` holding the cache."""
+
+    @classmethod
+    def _store(cls):
+        """Get the cache dictionary of the current application context."""
+        if not has_app_context():
+            return {}
+        store = getattr(g, cls.attr_name, None)
+        if store is None:
+            store = {}
+            setattr(g, cls.attr_name, store)
+        return store
+
+    @staticmethod
+    def principal_key(principal):
+        """Get ``(principal type, principal id)`` of a user or group.
+
+        :param principal: User or Group object.
+        :returns: Tuple or None if the object is not a valid principal.
+        """
+        try:
+            return (resolve_admin_type(principal), int(principal.get_id()))
+        except (AttributeError, TypeError, ValueError):
+            return None
+
+    @classmethod
+    def get(cls, group, principal):
+        """Get permissions of a principal in a group.
+
+        :param group: Group object.
+        :param principal: User or Group object.
+        :returns: Tuple ``(is_admin, membership_state)``.
+        """
+        principal_key = cls.principal_key(principal)
+        if principal_key is None or group.id is None:
+            return (False, None)
+
+        key = (group.id, ) + principal_key
+        store = cls._store()
+        if key not in store:
+            cls.preload([group.id], principal)
+        return store.get(key, (False, None))
+
+    @classmethod
+    def preload(cls, groups, principal):
+        """Fill the cache for a list of groups with a single query.
+
+        :param groups: List of Group objects or group ids.
+        :param principal: User or Group object.
+        """
+        principal_key = cls.principal_key(principal)
+        if principal_key is None:
+            return
+        principal_type, principal_id = principal_key
+
+        group_ids = set(
+            g.id if isinstance(g, Group) else g for g in groups
+        )
+        group_ids.discard(None)
+        if not group_ids:
+            return
+
+        entries = dict(
+            (gid, [False, None]) for gid in group_ids
+        )
+        memberships = db.session.query(
+            Membership.id_group, Membership.state, literal(False)
+        ).filter(
+            Membership.user_id == principal_id,
+            Membership.id_group.in_(group_ids),
+        )
+        admins = db.session.query(
+            GroupAdminClosure.group_id, null(), literal(True)
+        ).filter(
+            GroupAdminClosure.admin_type == principal_type,
+            GroupAdminClosure.admin_id == principal_id,
+            GroupAdminClosure.group_id.in_(group_ids),
+        )
+        if principal_type != 'User':
+            # Only users can be members of a group.
+            query = admins
+        else:
+            query = memberships.union_all(admins)
+
+        for group_id, state, is_admin in query:
+            if is_admin:
+                entries[group_id][0] = True
+            else:
+                entries[group_id][1] = state
+
+        store = cls._store()
+        for group_id, (is_admin, state) in entries.items():
+            store[(group_id, principal_type, principal_id)] = (is_admin, state)
+
+    @classmethod
+    def invalidate(cls, group_id=None, principal_type=None,
+                   principal_id=None):
+        """Drop cache entries matching all the given criteria.
+
+        :param group_id: Group identifier or None for any group.
+        :param principal_type: Principal type or None for any type.
+        :param principal_id: Principal identifier or None for any principal.
+        """
+        store = cls._store()
+        if principal_id is not None:
+            principal_id = int(principal_id)
+        criteria = (group_id, principal_type, principal_id)
+        for key in list(store):
+            if all(c is None or c == k for c, k in zip(criteria, key)):
+                del store[key]
+
+    @classmethod
+    def clear(cls):
+        """Drop all cache entries."""
+        cls._store().clear()
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _clear_permission_cache(session, previous_transaction):
+    """Forget cached permissions which may come from rolled back data."""
+    PermissionCache.clear()
+
+
+_USER_GROUPS_INFO_KEY = 'invenio_groups_changed_users'
+"""Key in :attr:`Session.info` of users whose groups changed."""
+
+
+def invalidate_user_groups(users_ids):
+    """Invalidate the cached groups of users.
+
+    Entries are dropped immediately and once more when the outermost
+    transaction ends, so that no concurrent reader can keep the state from
+    before the commit (or a rolled back state) in the cache.
+
+    :param users_ids: Iterable of user identifiers.
+    """
+    users_ids = set(int(user_id) for user_id in users_ids)
+    if not users_ids or not has_app_context():
+        return
+    ext = current_app.extensions.get('invenio-groups')
+    if ext is None or ext.user_groups_cache is None:
+        return
+    ext.user_groups_cache.invalidate(users_ids)
+    db.session.info.setdefault(_USER_GROUPS_INFO_KEY, set()).update(
+        users_ids)
+
+
+@event.listens_for(Session, 'after_transaction_end')
+def _invalidate_user_groups_cache(session, transaction):
+    """Invalidate cached groups of changed users after commit or rollback."""
+    if transaction.parent is not None:
+        return
+    users_ids = session.info.pop(_USER_GROUPS_INFO_KEY, None)
+    if users_ids and has_app_context():
+        ext = current_app.extensions.get('invenio-groups')
+        if ext is not None and ext.user_groups_cache is not None:
+            ext.user_groups_cache.invalidate(users_ids)
+
+
+_BADGE_COUNTS_INFO_KEY = 'invenio_groups_badge_counts_users'
+"""Key of the session info holding users with changed badge counts."""
+
+
+def invalidate_badge_counts(group_id=None, users_ids=()):
+    """Invalidate the cached badge counts of users.
+
+    Entries are dropped immediately and once more when the outermost
+    transaction ends, as for :func:`invalidate_user_groups`. Nothing is
+    queried when the badge counts are not cached.
+
+    :param group_id: Group whose effective admins (see
+        :class:`GroupAdminClosure`) are invalidated, e.g. because its pending
+        requests changed.
+    :param users_ids: Iterable of other user identifiers.
+    """
+    if not has_app_context():
+        return
+    ext = current_app.extensions.get('invenio-groups')
+    if ext is None or ext.badge_counts_cache is None or \
+            not ext.badge_counts_cache.timeout:
+        return
+    users_ids = set(int(user_id) for user_id in users_ids)
+    if group_id is not None:
+        users_ids.update(
+            row.admin_id for row in GroupAdminClosure.query.filter_by(
+                group_id=group_id, admin_type='User',
+            ).with_entities(GroupAdminClosure.admin_id))
+    if users_ids:
+        ext.badge_counts_cache.invalidate(users_ids)
+        db.session.info.setdefault(_BADGE_COUNTS_INFO_KEY, set()).update(
+            users_ids)
+
+
+@event.listens_for(Session, 'after_transaction_end')
+def _invalidate_badge_counts_cache(session, transaction):
+    """Invalidate cached badge counts of users after commit or rollback."""
+    if transaction.parent is not None:
+        return
+    users_ids = session.info.pop(_BADGE_COUNTS_INFO_KEY, None)
+    if users_ids and has_app_context():
+        ext = current_app.extensions.get('invenio-groups')
+        if ext is not None and ext.badge_counts_cache is not None:
+            ext.badge_counts_cache.invalidate(users_ids)
+
+
 #
 # Helpers
 #
 
 
+def _membership_changed(signal, group_id, memberships):
+    """Record membership changes in the change log and signal them.
+
+    :param signal: Signal sent after commit, its name is the operation.
+    :param group_id: Group identifier.
+    :param memberships: Iterable of ``(user_id, state)``.
+    """
+    memberships = [
+        (int(group_id), int(user_id), getattr(state, 'code', state))
+        for user_id, state in memberships]
+    GroupChange.record(signal.name, [
+        (group_id, 'User', user_id, state)
+        for group_id, user_id, state in memberships])
+    signals.send_after_commit(signal, memberships=memberships)
+
+
+def _admins_changed(signal, admins):
+    """Record admin changes in the change log and signal them.
+
+    :param signal: Signal sent after commit, its name is the operation.
+    :param admins: Iterable of ``(group_id, admin_type, admin_id)``.
+    """
+    admins = [(int(group_id), admin_type, int(admin_id))
+              for group_id, admin_type, admin_id in admins]
+    GroupChange.record(signal.name, [
+        (group_id, admin_type, admin_id, None)
+        for group_id, admin_type, admin_id in admins])
+    signals.send_after_commit(signal, admins=admins)
+
+
+def _iter_chunks(query, key, chunk_size):
+    """Iterate over the rows of a query in chunks, by keyset.
+
+    :param query: Query object, ``key`` has to be among its entities.
+    :param key: Column unique within the query results.
+    :param int chunk_size: Number of rows per chunk.
+    :returns: Iterator of lists of rows.
+    """
+    last = None
+    while True:
+        chunk = query.order_by(key)
+        if last is not None:
+            chunk = chunk.filter(key > last)
+        rows = chunk.limit(chunk_size).all()
+        if not rows:
+            return
+        last = getattr(rows[-1], key.key)
+        yield rows
+
+
+def _like_escape(value):
+    r"""Escape the wildcards of a LIKE pattern (with ``\`` as escape)."""
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace(
+        '_', '\\_')
+
+
+def resolve_users_by_emails(emails, chunk_size=500):
+    """Get identifiers of the users with the given emails.
+
+    Users are looked up case insensitively with one query per chunk of
+    emails, on ``lower(email)`` where it is indexed and on the stored emails
+    elsewhere, where the collation compares them case insensitively (see
+    :data:`LOWER_EMAIL_INDEX_DIALECTS`).
+
+    :param emails: List of stripped and lower-cased emails.
+    :param int chunk_size: Number of emails resolved per query.
+    :returns: Dictionary mapping lower-cased emails to user identifiers.
+    """
+    email = User.email
+    if db.engine.dialect.name in LOWER_EMAIL_INDEX_DIALECTS:
+        email = func.lower(email)
+    users = {}
+    for i in range(0, len(emails), chunk_size):
+        users.update(
+            (row.email.lower(), row.id) for row in User.query.filter(
+                email.in_(emails[i:i + chunk_size])
+            ).with_entities(User.id, User.email))
+    return users
+
+
 def resolve_admin_type(admin):
     """Determine admin type."""
     if admin is current_user or isinstance(admin, UserMixin):
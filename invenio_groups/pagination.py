@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2016 CERN.
+#
+# Invenio is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Keyset (cursor) pagination."""
+
+from __future__ import absolute_import, print_function
+
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+from sqlalchemy.sql.elements import Label
+from sqlalchemy_utils.types.choice import Choice
+
+_DATETIME_FORMAT = '%Y-%m-%dT%H:%M:%S.%f'
+
+
+def _dump_value(value):
+    """Convert a key value to a JSON serializable value."""
+    if isinstance(value, Choice):
+        return value.code
+    if isinstance(value, datetime):
+        return {'dt': value.strftime(_DATETIME_FORMAT)}
+    return value
+
+
+def _load_value(value):
+    """Convert a JSON value back to a key value."""
+    if isinstance(value, dict):
+        return datetime.strptime(value['dt'], _DATETIME_FORMAT)
+    return value
+
+
+def encode_cursor(values, directions, backward=False):
+    """Encode the position after (or before) a row as an opaque token.
+
+    :param values: Values of the sort keys of the row.
+    :param directions: Directions (``asc`` or ``desc``) of the sort keys.
+    :param bool backward: Whether the token points to the previous page.
+    :returns: URL-safe string.
+    """
+    data = json.dumps(dict(
+        k=[_dump_value(v) for v in values],
+        o=''.join(d[0] for d in directions),
+        b=backward,
+    ), separators=(',', ':'), sort_keys=True)
+    return base64.urlsafe_b64encode(
+        data.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, directions):
+    """Decode a token created by :func:`encode_cursor`.
+
+    :param cursor: Token.
+    :param directions: Directions of the sort keys. They have to match the
+        directions used to create the token.
+    :returns: Tuple ``(values, backward)``.
+    :raises ValueError: If the token is malformed or does not match the sort
+        keys.
+    """
+    try:
+        padding = '=' * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(
+            (cursor + padding).encode('ascii')).decode('utf-8'))
+        values = [_load_value(v) for v in data['k']]
+        order, backward = data['o'], bool(data['b'])
+    except (TypeError, ValueError, KeyError, UnicodeError):
+        raise ValueError('Invalid cursor.')
+    if order != ''.join(d[0] for d in directions) or \
+            len(values) != len(directions):
+        raise ValueError('Cursor does not match the sort order.')
+    return values, backward
+
+
+def _after(keys, values):
+    """Build the criterion selecting rows after the given key values.
+
+    ``(k1, k2, ...) > (v1, v2, ...)`` is expanded to
+    ``k1 >= v1 AND (k1 > v1 OR (k1 = v1 AND k2 > v2) OR ...)``, with ``<``
+    instead of ``>`` for descending keys, so that mixed sort directions are
+    supported and an index on the keys can be used for the leading key.
+    """
+    def _cmp(column, direction, value, strict):
+        if direction == 'desc':
+            return column < value if strict else column <= value
+        return column > value if strict else column >= value
+
+    clauses = []
+    for i, ((column, direction), value) in enumerate(zip(keys, values)):
+        clauses.append(and_(*(
+            [c == v for (c, dummy_d), v in zip(keys[:i], values[:i])] +
+            [_cmp(column, direction, value, True)]
+        )))
+    column, direction = keys[0]
+    return and_(_cmp(column, direction, values[0], False), or_(*clauses))
+
+
+def _element(column):
+    """Get the expression of a labelled key, which WHERE cannot refer to."""
+    return column.element if isinstance(column, Label) else column
+
+
+class KeysetPagination(object):
+    """Page of a query fetched with keyset (cursor) pagination.
+
+    Rows are ordered by ``keys`` and a page is selected with a range
+    condition on them instead of an offset, so fetching any page costs the
+    same as fetching the first one. The last key has to be unique.
+
+    The interface is close to the Flask-SQLAlchemy ``Pagination`` object:
+    ``query``, ``items``, ``per_page``, ``total``, ``has_next`` and
+    ``has_prev``, plus ``next_cursor`` and ``prev_cursor`` tokens to pass
+    back as ``cursor``. Here ``query`` is the ordered query of the page,
+    without its limit.
+    """
+
+    def __init__(self, query, keys, per_page=20, cursor=None, total=None):
+        """Fetch a page.
+
+        :param query: Query object of ORM entities.
+        :param keys: List of ``(column, direction)`` tuples, where direction
+            is ``asc`` or ``desc``. Columns have to be attributes of the
+            queried entity or labelled SQL expressions, which are selected
+            along with it.
+        :param int per_page: Number of items per page.
+        :param cursor: Token of the page to fetch or None for the first page.
+        :param total: Total number of items, if known. It is not computed.
+        :raises ValueError: If the cursor is invalid.
+        """
+        assert keys
+        assert per_page > 0
+        self.keys = keys
+        self.per_page = per_page
+        self.total = total
+        self.cursor = cursor or None
+
+        directions = [d for dummy_c, d in keys]
+        backward = False
+        if self.cursor:
+            values, backward = decode_cursor(self.cursor, directions)
+
+        order = keys
+        if backward:
+            order = [(c, 'asc' if d == 'desc' else 'desc') for c, d in keys]
+        order = [(_element(c), d) for c, d in order]
+        query = query.order_by(None).order_by(
+            *[c.desc() if d == 'desc' else c.asc() for c, d in order])
+        if self.cursor:
+            query = query.filter(_after(order, values))
+        self.query = query
+
+        labels = [c for c, dummy_d in keys if isinstance(c, Label)]
+        if labels:
+            rows = query.add_columns(*labels).limit(per_page + 1).all()
+            items = [row[0] for row in rows]
+            self._labels = [dict(zip((c.key for c in labels), row[1:]))
+                            for row in rows]
+        else:
+            items = query.limit(per_page + 1).all()
+            self._labels = [{}] * len(items)
+        has_more = len(items) > per_page
+        items, self._labels = items[:per_page], self._labels[:per_page]
+        if backward:
+            items.reverse()
+            self._labels.reverse()
+            self.has_prev, self.has_next = has_more, True
+        else:
+            self.has_prev, self.has_next = bool(self.cursor), has_more
+        self.items = items
+
+    def _cursor(self, index, backward):
+        """Create the token of the position of the item at an index."""
+        item, labels = self.items[index], self._labels[index]
+        return encode_cursor(
+            [labels[c.key] if isinstance(c, Label) else getattr(item, c.key)
+             for c, dummy_d in self.keys],
+            [d for dummy_c, d in self.keys],
+            backward=backward,
+        )
+
+    @property
+    def next_cursor(self):
+        """Token of the next page or None."""
+        if self.has_next and self.items:
+            return self._cursor(-1, False)
+
+    @property
+    def prev_cursor(self):
+        """Token of the previous page or None."""
+        if self.has_prev and self.items:
+            return self._cursor(0, True)
+
+    @property
+    def last_cursor(self):
+        """Token of the position after the last item, even on the last page.
+
+        It allows to fetch later the items added after the page.
+        """
+        if self.items:
+            return self._cursor(-1, False)
+        return self.cursor
+
+
+class SinglePage(object):
+    """Page without further pages, e.g. capped search results.
+
+    It has the same interface as :class:`KeysetPagination`.
+    """
+
+    has_next = False
+    has_prev = False
+    next_cursor = None
+    prev_cursor = None
+
+    def __init__(self, items, total=None):
+        """Initialize the page.
+
+        :param items: List of items.
+        :param total: Total number of items, if known.
+        """
+        self.items = items
+        self.per_page = len(items)
+        self.total = total
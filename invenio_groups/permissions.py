@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2014, 2015, 2016 CERN.
+#
+# Invenio is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307, USA.
+
+"""Group needs of Flask-Principal identities.
+
+When an identity is loaded, :func:`on_identity_loaded` provides it with a
+:data:`GroupNeed` for each group the user is an active member of and a
+:data:`GroupAdminNeed` for each group the user (effectively) administers, so
+that permissions are checked against the identity without querying the
+memberships again:
+
+.. code-block:: python
+
+    from flask_principal import Permission
+    from invenio_groups.permissions import GroupNeed
+
+    permission = Permission(GroupNeed(group.id))
+
+The groups are fetched with one query and kept in the session together with
+the version stamp of the user's groups (see
+:meth:`invenio_groups.cache.UserGroupsCache.version`), which is replaced
+whenever the memberships or admins of the user change. The stamp is only
+shared between processes with a shared ``GROUPS_CACHE_BACKEND``, so the
+groups are fetched again anyway once they are older than
+``GROUPS_CACHE_TIMEOUT`` seconds. The handler is connected by the extension
+when ``GROUPS_IDENTITY_NEEDS`` is enabled.
+"""
+
+from __future__ import absolute_import, print_function
+
+import time
+from functools import partial
+
+from flask import current_app, has_request_context, session
+from flask_principal import Need
+
+from .models import Group
+
+GroupNeed = partial(Need, 'group')
+"""Need provided to the active members of a group."""
+
+GroupAdminNeed = partial(Need, 'group_admin')
+"""Need provided to the (effective) admins of a group."""
+
+_SESSION_KEY = 'invenio_groups_needs'
+"""Key of the session holding the groups of the user."""
+
+
+def get_user_groups(user_id):
+    """Get the groups a user is an active member or an admin of.
+
+    The groups stored in the session are used as long as their version stamp
+    is the current one and they are not older than ``GROUPS_CACHE_TIMEOUT``
+    seconds.
+
+    :param user_id: User identifier.
+    :returns: Tuple ``(members_ids, admins_ids)`` of sorted lists of group
+        identifiers.
+    """
+    user_id = int(user_id)
+    cache = current_app.extensions['invenio-groups'].user_groups_cache
+    # Get the stamp first, a change made while fetching replaces it.
+    version = cache.version(user_id)
+    now = int(time.time())
+    max_age = current_app.config['GROUPS_CACHE_TIMEOUT']
+    stored = session.get(_SESSION_KEY) if has_request_context() else None
+    if stored and stored.get('user') == user_id and \
+            stored.get('version') == version and \
+            (not max_age or now - stored.get('loaded', 0) < max_age):
+        return stored['members'], stored['admins']
+
+    members_ids, admins_ids = set(), set()
+    for group_id, is_admin in Group.query_roles_by_user(user_id):
+        (admins_ids if is_admin else members_ids).add(group_id)
+    members_ids, admins_ids = sorted(members_ids), sorted(admins_ids)
+
+    if has_request_context():
+        if len(members_ids) + len(admins_ids) <= \
+                current_app.config['GROUPS_IDENTITY_SESSION_LIMIT']:
+            session[_SESSION_KEY] = dict(
+                user=user_id, version=version, loaded=now,
+                members=members_ids, admins=admins_ids)
+        else:
+            session.pop(_SESSION_KEY, None)
+    return members_ids, admins_ids
+
+
+def on_identity_loaded(sender, identity):
+    """Provide an identity with the needs of the groups of its user.
+
+    Receiver of :data:`flask_principal.identity_loaded`. Identities without a
+    user identifier (e.g. anonymous ones) are left untouched.
+    """
+    try:
+        user_id = int(identity.id)
+    except (TypeError, ValueError):
+        return
+    members_ids, admins_ids = get_user_groups(user_id)
+    identity.provides.update(GroupNeed(group_id) for group_id in members_ids)
+    identity.provides.update(
+        GroupAdminNeed(group_id) for group_id in admins_ids)
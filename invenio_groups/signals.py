@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2014, 2015, 2016 CERN.
+#
+# Invenio is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307, USA.
+
+"""Signals sent when groups, memberships and admins change.
+
+Signals are sent with the application as sender once the transaction in
+which the change happened is committed. Changes which are rolled back
+(including those of a rolled back savepoint) send nothing, and bulk
+operations send one signal per batch instead of one per row:
+
+.. code-block:: python
+
+    from invenio_groups.signals import membership_created
+
+    @membership_created.connect_via(app)
+    def index_members(sender, memberships=None):
+        for group_id, user_id, state in memberships:
+            ...
+
+Membership signals carry a list of ``(group_id, user_id, state)`` tuples,
+where ``state`` is the state of the membership (before its deletion for
+removed memberships). Admin signals carry a list of ``(group_id,
+admin_type, admin_id)`` tuples.
+
+Receivers are called outside of any transaction: they may read from the
+database, but changes must be deferred (e.g. to a Celery task) instead of
+being written with the session.
+"""
+
+from __future__ import absolute_import, print_function
+
+from blinker import Namespace
+from flask import current_app, has_app_context
+from invenio_db import db
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+_signals = Namespace()
+
+group_created = _signals.signal('group-created')
+"""Groups were created.
+
+Keyword argument ``groups_ids``: list of group identifiers.
+"""
+
+group_updated = _signals.signal('group-updated')
+"""Groups were updated.
+
+Keyword argument ``groups_ids``: list of group identifiers.
+"""
+
+group_deleted = _signals.signal('group-deleted')
+"""Groups were deleted.
+
+Keyword argument ``groups_ids``: list of group identifiers. Removal of their
+memberships and admins is signaled as well.
+"""
+
+membership_created = _signals.signal('membership-created')
+"""Memberships were created, in any state.
+
+Keyword argument ``memberships``: list of ``(group_id, user_id, state)``.
+"""
+
+membership_accepted = _signals.signal('membership-accepted')
+"""Pending memberships became active.
+
+Keyword argument ``memberships``: list of ``(group_id, user_id, state)``.
+"""
+
+membership_updated = _signals.signal('membership-updated')
+"""Memberships changed to a pending state (e.g. by a bulk import).
+
+Keyword argument ``memberships``: list of ``(group_id, user_id, state)``.
+"""
+
+membership_rejected = _signals.signal('membership-rejected')
+"""Memberships were rejected (and deleted).
+
+Keyword argument ``memberships``: list of ``(group_id, user_id, state)``.
+"""
+
+membership_removed = _signals.signal('membership-removed')
+"""Memberships were removed.
+
+Keyword argument ``memberships``: list of ``(group_id, user_id, state)``.
+"""
+
+admin_added = _signals.signal('admin-added')
+"""Admins were added to groups.
+
+Keyword argument ``admins``: list of ``(group_id, admin_type, admin_id)``.
+"""
+
+admin_removed = _signals.signal('admin-removed')
+"""Admins were removed from groups.
+
+Keyword argument ``admins``: list of ``(group_id, admin_type, admin_id)``.
+"""
+
+
+_CALLBACKS_INFO_KEY = 'invenio_groups_after_commit'
+"""Key in :attr:`Session.info` of callbacks waiting for a commit."""
+
+_COMMITTED_CALLBACKS_INFO_KEY = 'invenio_groups_committed'
+"""Key in :attr:`Session.info` of callbacks ready to be called."""
+
+
+def call_after_commit(func, *args):
+    """Call a function once the current transaction is committed.
+
+    The call is dropped if the transaction, or a savepoint it was queued in,
+    is rolled back. Like signal receivers, the function is called outside of
+    any transaction and its exceptions are logged.
+
+    :param func: Function to call.
+    :param args: Positional arguments of the function.
+    """
+    session = db.session()
+    session.info.setdefault(_CALLBACKS_INFO_KEY, []).append(
+        (session.transaction, func, args))
+
+
+def _send(signal, kwargs):
+    """Send a signal from the current application."""
+    try:
+        signal.send(current_app._get_current_object(), **kwargs)
+    except Exception:
+        current_app.logger.exception(
+            'Receiver of signal %s failed.', signal.name)
+
+
+def send_after_commit(signal, **kwargs):
+    """Send a signal once the current transaction is committed.
+
+    The signal is dropped if the transaction, or a savepoint it was queued
+    in, is rolled back.
+
+    :param signal: Signal to send.
+    :param kwargs: Keyword arguments of the signal.
+    """
+    call_after_commit(_send, signal, kwargs)
+
+
+def _within(transaction, ancestor):
+    """Check if a transaction is nested in (or is) another one."""
+    while transaction is not None:
+        if transaction is ancestor:
+            return True
+        transaction = transaction.parent
+    return False
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _drop_callbacks(session, previous_transaction):
+    """Forget callbacks of rolled back changes."""
+    queued = session.info.get(_CALLBACKS_INFO_KEY)
+    if queued:
+        session.info[_CALLBACKS_INFO_KEY] = [
+            item for item in queued
+            if not _within(item[0], previous_transaction)]
+
+
+@event.listens_for(Session, 'after_commit')
+def _commit_callbacks(session):
+    """Ready the queued callbacks when the outermost transaction commits."""
+    if session.transaction.parent is None:
+        session.info.setdefault(_COMMITTED_CALLBACKS_INFO_KEY, []).extend(
+            session.info.pop(_CALLBACKS_INFO_KEY, []))
+
+
+@event.listens_for(Session, 'after_transaction_end')
+def _call_callbacks(session, transaction):
+    """Call committed callbacks once the outermost transaction has ended."""
+    if transaction.parent is not None:
+        return
+    # Callbacks left over were neither committed nor rolled back (e.g. the
+    # session was closed), their changes are lost.
+    session.info.pop(_CALLBACKS_INFO_KEY, None)
+    committed = session.info.pop(_COMMITTED_CALLBACKS_INFO_KEY, None)
+    if not committed or not has_app_context():
+        return
+    for dummy, func, args in committed:
+        try:
+            func(*args)
+        except Exception:
+            current_app.logger.exception(
+                'Call of %s after commit failed.', func.__name__)
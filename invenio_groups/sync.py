@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2014, 2015, 2016 CERN.
+#
+# Invenio is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the Free Software Foundation, Inc.,
+# 59 Temple Place, Suite 330, Boston, MA 02111-1307, USA.
+
+"""Incremental synchronization of groups and memberships.
+
+Services keeping a copy of groups or memberships (e.g. caches) refresh it
+with what changed since their previous synchronization instead of reading
+everything again. Three feeds are available, see :data:`SYNC_FEEDS`:
+
+- ``groups`` and ``memberships``: groups and memberships (in any state)
+  modified since a date, in modification order, read with the indexes on
+  their ``modified`` column;
+- ``deletions``: tombstones of deleted groups and memberships, i.e. the
+  matching entries of the change log
+  (:class:`invenio_groups.models.GroupChange`).
+
+A page holds a ``cursor`` pointing after its last item, pass it back to get
+the next page or, once ``has_more`` is false, to get the next changes at the
+next synchronization:
+
+.. code-block:: python
+
+    from invenio_groups.sync import changes
+
+    page = changes('memberships', cursor=last_cursor)
+    for item in page['items']:
+        ...
+    last_cursor = page['cursor']
+
+.. note:: Modification dates are set when rows are written, not when they
+   are committed. A consumer that must not miss a change made by a long
+   transaction should synchronize with ``since`` set a little before its
+   previous synchronization instead of resuming from a cursor.
+"""
+
+from __future__ import absolute_import, print_function
+
+from datetime import datetime
+
+from .models import Group, GroupChange, Membership
+from .pagination import KeysetPagination
+
+SYNC_FEEDS = {
+    'groups': (
+        Group.query_modified_since,
+        [(Group.modified, 'asc'), (Group.id, 'asc')],
+    ),
+    'memberships': (
+        Membership.query_modified_since,
+        [(Membership.modified, 'asc'), (Membership.id_group, 'asc'),
+         (Membership.user_id, 'asc')],
+    ),
+    'deletions': (
+        GroupChange.query_tombstones,
+        [(GroupChange.seq, 'asc')],
+    ),
+}
+"""Feeds by name: query factory taking ``since`` and keyset keys."""
+
+_TIMESTAMP_FORMATS = ('%Y-%m-%dT%H:%M:%S.%f', '%Y-%m-%dT%H:%M:%S',
+                      '%Y-%m-%d')
+
+
+def parse_timestamp(value):
+    """Parse an ISO 8601 date, as returned in the ``modified`` fields.
+
+    :raises ValueError: If the date is malformed.
+    """
+    for fmt in _TIMESTAMP_FORMATS:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            pass
+    raise ValueError('Invalid timestamp {0}.'.format(value))
+
+
+def changes(feed, since=None, cursor=None, per_page=100):
+    """Get a page of the changes of a feed.
+
+    :param str feed: Name of the feed, a key of :data:`SYNC_FEEDS`.
+    :param datetime since: Only get the changes made since this date.
+    :param cursor: Cursor returned with the previous page.
+    :param int per_page: Maximum number of items.
+    :returns: Dictionary with the serialized ``items``, the ``cursor`` to
+        continue from and ``has_more`` telling if more items are available.
+    :raises ValueError: If the cursor is invalid.
+    """
+    query_factory, keys = SYNC_FEEDS[feed]
+    page = KeysetPagination(query_factory(since), keys, per_page=per_page,
+                            cursor=cursor)
+    return dict(
+        items=[item.to_dict() for item in page.items],
+        cursor=page.last_cursor,
+        has_more=page.has_next,
+    )
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2016 CERN.
+#
+# Invenio is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Background tasks for groups."""
+
+from __future__ import absolute_import, print_function
+
+from celery import shared_task
+
+from .jobs import execute_job
+from .models import Group
+
+
+@shared_task(bind=True, ignore_result=False)
+def delete_group(self, group_id, chunk_size=1000):
+    """Delete a group in chunks (see :meth:`Group.delete_in_chunks`).
+
+    Progress is reported as a ``PROGRESS`` task state with ``deleted`` and
+    ``total`` in its meta data.
+
+    :param group_id: Group identifier.
+    :param int chunk_size: Number of rows deleted per transaction.
+    :returns: Number of deleted memberships and admins or None if the group
+        does not exist.
+    """
+    group = Group.query.get(group_id)
+    if group is None:
+        return None
+
+    def progress(deleted, total):
+        if not self.request.called_directly:
+            self.update_state(state='PROGRESS', meta=dict(
+                deleted=deleted, total=total))
+
+    return group.delete_in_chunks(chunk_size=chunk_size, progress=progress)
+
+
+@shared_task(ignore_result=False)
+def run_job(job_id):
+    """Run a background job (see :func:`invenio_groups.jobs.execute_job`).
+
+    :param job_id: Job identifier.
+    :returns: Final job status or None if the job was not pending.
+    """
+    return execute_job(job_id)
@@ -26,17 +26,25 @@
 
 from __future__ import absolute_import, print_function
 
-from flask import Blueprint, flash, redirect, render_template, request, url_for
+from flask import Blueprint, Response, abort, current_app, flash, jsonify, \
+    redirect, render_template, request, stream_with_context, url_for
 from flask_babelex import gettext as _
 from flask_breadcrumbs import default_breadcrumb_root, register_breadcrumb
 from flask_login import current_user, login_required
 from flask_menu import register_menu
 from invenio_accounts.models import User
+from invenio_db import db
 from six.moves.urllib.parse import urlparse
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import selectinload
 
+from .export import EXPORT_FORMATS, export
 from .forms import GroupForm, NewMemberForm
-from .models import Group, Membership
+from .models import Group, GroupJob, InvitationStatus, Membership
+from .pagination import SinglePage
+from .proxies import current_groups
+from .sync import SYNC_FEEDS, changes, parse_timestamp
+from .tasks import delete_group
 
 blueprint = Blueprint(
     'invenio_groups',
@@ -68,24 +76,28 @@ def get_group_name(id_group):
 @login_required
 def index():
     """List all user memberships."""
-    page = request.args.get('page', 1, type=int)
+    cursor = request.args.get('cursor')
     per_page = request.args.get('per_page', 5, type=int)
     q = request.args.get('q', '')
 
-    groups = Group.query_by_user(current_user, eager=True)
+    groups = Group.query_by_user(current_user)
     if q:
         groups = Group.search(groups, q)
-    groups = groups.paginate(page, per_page=per_page)
+    try:
+        groups = Group.paginate(groups, cursor=cursor,
+                                per_page=max(per_page, 1), q=q)
+    except ValueError:
+        abort(400)
+    permissions = Group.permissions_for(current_user, groups.items)
 
-    requests = Membership.query_requests(current_user).count()
-    invitations = Membership.query_invitations(current_user).count()
+    counts = current_groups.get_badge_counts(current_user)
 
     return render_template(
         'invenio_groups/index.html',
         groups=groups,
-        requests=requests,
-        invitations=invitations,
-        page=page,
+        permissions=permissions,
+        requests=counts['requests'],
+        invitations=counts['invitations'],
         per_page=per_page,
         q=q
     )
@@ -96,17 +108,8 @@ def index():
 @login_required
 def requests():
     """List all pending memberships, listed only for group admins."""
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 5, type=int)
-    memberships = Membership.query_requests(current_user, eager=True).all()
-
-    return render_template(
-        'invenio_groups/pending.html',
-        memberships=memberships,
-        requests=True,
-        page=page,
-        per_page=per_page,
-    )
+    return _pending(Membership.query_requests(current_user, eager=True),
+                    'requests', requests=True)
 
 
 @blueprint.route('/invitations', methods=['GET'])
@@ -114,15 +117,26 @@ def requests():
 @login_required
 def invitations():
     """List all user pending memberships."""
-    page = request.args.get('page', 1, type=int)
+    return _pending(Membership.query_invitations(current_user, eager=True),
+                    'invitations')
+
+
+def _pending(query, count_key, **kwargs):
+    """Render a page of pending memberships ordered by group."""
+    cursor = request.args.get('cursor')
     per_page = request.args.get('per_page', 5, type=int)
-    memberships = Membership.query_invitations(current_user, eager=True).all()
+    try:
+        memberships = Membership.paginate(
+            query, cursor=cursor, per_page=max(per_page, 1), sort='group',
+            total=current_groups.get_badge_counts(current_user)[count_key])
+    except ValueError:
+        abort(400)
 
     return render_template(
         'invenio_groups/pending.html',
         memberships=memberships,
-        page=page,
         per_page=per_page,
+        **kwargs
     )
 
 
@@ -198,14 +212,24 @@ def delete(group_id):
     group = Group.query.get_or_404(group_id)
 
     if group.can_edit(current_user):
+        large = group.active_members_count + group.pending_requests_count + \
+            group.pending_invitations_count > \
+            current_app.config['GROUPS_DELETE_SYNC_LIMIT']
         try:
-            group.delete()
+            if large:
+                delete_group.delay(group.id)
+            else:
+                group.delete()
         except Exception as e:
             flash(str(e), "error")
             return redirect(url_for(".index"))
 
-        flash(_('Successfully removed group "%(group_name)s"',
-                group_name=group.name), 'success')
+        if large:
+            flash(_('Group "%(group_name)s" will be removed in the '
+                    'background.', group_name=group.name), 'info')
+        else:
+            flash(_('Successfully removed group "%(group_name)s"',
+                    group_name=group.name), 'success')
         return redirect(url_for(".index"))
 
     flash(
@@ -228,25 +252,40 @@ def delete(group_id):
 )
 def members(group_id):
     """List user group members."""
-    page = request.args.get('page', 1, type=int)
+    cursor = request.args.get('cursor')
     per_page = request.args.get('per_page', 5, type=int)
     q = request.args.get('q', '')
     s = request.args.get('s', '')
 
     group = Group.query.get_or_404(group_id)
     if group.can_see_members(current_user):
-        members = Membership.query_by_group(group_id, with_invitations=True)
+        members = Membership.query_by_group(
+            group_id, with_invitations=True,
+            options=[selectinload(Membership.user)])
         if q:
-            members = Membership.search(members, q)
-        if s:
-            members = Membership.order(members, Membership.state, s)
-        members = members.paginate(page, per_page=per_page)
-
+            members = Membership.search(members, q, group_or_id=group_id)
+            members = SinglePage(members.limit(
+                current_app.config['GROUPS_MEMBERS_SEARCH_LIMIT']).all())
+        else:
+            try:
+                members = Membership.paginate(
+                    members, cursor=cursor, per_page=max(per_page, 1),
+                    s=s if s in ('asc', 'desc') else 'asc',
+                    total=group.active_members_count +
+                    group.pending_invitations_count)
+            except ValueError:
+                abort(400)
+
+        is_admin = group.is_admin(current_user)
         return render_template(
             "invenio_groups/members.html",
             group=group,
             members=members,
-            page=page,
+            is_admin=is_admin,
+            admins_ids=group.admin_users_ids(
+                member.user_id for member in members.items),
+            jobs=GroupJob.query_unfinished(group.id).all()
+            if is_admin else [],
             per_page=per_page,
             q=q,
             s=s,
@@ -262,6 +301,29 @@ def members(group_id):
     return redirect(url_for('.index'))
 
 
+@blueprint.route('/<int:group_id>/members/export', methods=['GET'])
+@login_required
+def export_members(group_id):
+    """Stream the memberships of a group as CSV or JSON Lines."""
+    group = Group.query.get_or_404(group_id)
+    fmt = request.args.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        abort(400)
+    # Admins of managed groups cannot edit them but may export the members.
+    if not group.is_admin(current_user):
+        abort(403)
+
+    dummy_serializer, mimetype = EXPORT_FORMATS[fmt]
+    return Response(
+        stream_with_context(export(fmt, groups_ids=[group.id])),
+        mimetype=mimetype,
+        headers={
+            'Content-Disposition':
+            'attachment; filename=group-{0}-members.{1}'.format(group.id, fmt),
+        },
+    )
+
+
 @blueprint.route('/<int:group_id>/leave', methods=['POST'])
 @login_required
 def leave(group_id):
@@ -408,9 +470,27 @@ def new_member(group_id):
         form = NewMemberForm()
 
         if form.validate_on_submit():
-            emails = filter(None, form.data['emails'].splitlines())
-            group.invite_by_emails(emails)
+            emails = [email.strip() for email in
+                      form.data['emails'].splitlines() if email.strip()]
+            if len(emails) > current_app.config['GROUPS_INVITE_SYNC_LIMIT']:
+                job = current_groups.submit_job(
+                    'invite', group, user=current_user, emails=emails)
+                db.session.commit()
+                flash(_('Invitations of %(count)s email(s) are queued as '
+                        'background job %(job_id)s.',
+                        count=len(emails), job_id=job.id), 'info')
+                return redirect(url_for('.members', group_id=group.id))
+
+            results = group.invite_by_emails(emails)
             flash(_('Requests sent!'), 'success')
+            not_found = [email for email, status in results.items()
+                         if status == InvitationStatus.NOT_FOUND]
+            if not_found:
+                flash(
+                    _('No users found for %(count)s email(s): %(emails)s',
+                      count=len(not_found), emails=', '.join(not_found[:10])),
+                    'warning'
+                )
             return redirect(url_for('.members', group_id=group.id))
 
         return render_template(
@@ -428,3 +508,41 @@ def new_member(group_id):
         'error'
     )
     return redirect(url_for('.index'))
+
+
+@blueprint.route('/jobs/<int:job_id>', methods=['GET'])
+@login_required
+def job_status(job_id):
+    """Get the status and progress of a background job as JSON."""
+    job = GroupJob.query.get_or_404(job_id)
+    if job.user_id != int(current_user.get_id()):
+        group = Group.query.get(job.group_id)
+        if group is None or not group.can_edit(current_user):
+            abort(403)
+    return jsonify(job.to_dict())
+
+
+@blueprint.route('/sync/<feed>', methods=['GET'])
+@login_required
+def sync(feed):
+    """Get the groups, memberships or deletions changed since a date as JSON.
+
+    Query arguments are ``since`` (ISO 8601 date), ``cursor`` (as returned by
+    the previous call) and ``per_page``.
+    """
+    role = current_app.config['GROUPS_SYNC_ROLE']
+    if not role or feed not in SYNC_FEEDS:
+        abort(404)
+    if not current_user.has_role(role):
+        abort(403)
+
+    per_page = min(request.args.get('per_page', 100, type=int),
+                   current_app.config['GROUPS_SYNC_MAX_PER_PAGE'])
+    since = request.args.get('since')
+    try:
+        page = changes(
+            feed, since=parse_timestamp(since) if since else None,
+            cursor=request.args.get('cursor'), per_page=max(per_page, 1))
+    except ValueError:
+        abort(400)
+    return jsonify(page)
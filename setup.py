@@ -72,14 +72,18 @@ setup_requires = [
 ]
 
 install_requires = [
+    'blinker>=1.4',
     'Flask-BabelEx>=0.9.2',
     'Flask-Menu>=0.4.0',
+    'Flask-Principal>=0.4.0',
     'Flask-Breadcrumbs>=0.3.0',
+    'Flask-CeleryExt>=0.2.2',
     'Flask-Security>=1.7.5',
     'Flask-WTF>=0.13',
     'Flask>=0.11.1',
     'invenio-accounts>=1.0.0a15',
     'invenio-assets>=1.0.0b1',
+    'SQLAlchemy>=1.2',
     'WTForms>=2.1.0',
     'WTForms-Alchemy>=0.15.0',
 ]
@@ -108,6 +112,9 @@ setup(
     include_package_data=True,
     platforms='any',
     entry_points={
+        'flask.commands': [
+            'groups = invenio_groups.cli:groups',
+        ],
         'invenio_base.apps': [
             'invenio_groups = invenio_groups:InvenioGroups',
         ],
@@ -119,6 +126,12 @@ setup(
         'invenio_db.models': [
             'invenio_groups = invenio_groups.models',
         ],
+        'invenio_celery.tasks': [
+            'invenio_groups = invenio_groups.tasks',
+        ],
+        'invenio_db.alembic': [
+            'invenio_groups = invenio_groups:alembic',
+        ],
     },
     extras_require=extras_require,
     install_requires=install_requires,
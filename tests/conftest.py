@@ -28,8 +28,10 @@
 from __future__ import absolute_import, print_function
 
 import os
+import re
 import shutil
 import tempfile
+from contextlib import contextmanager
 
 import pytest
 from flask import Flask
@@ -39,6 +41,7 @@ from flask_menu import Menu
 from invenio_accounts import InvenioAccounts
 from invenio_accounts.models import User
 from invenio_db import InvenioDB, db
+from sqlalchemy import event
 from sqlalchemy_utils.functions import create_database, database_exists, \
     drop_database
 
@@ -47,7 +50,19 @@ from invenio_groups.api import Group
 
 
 @pytest.fixture
-def app(request):
+def database_uri():
+    """URI of the test database (in-memory SQLite by default)."""
+    return os.environ.get('SQLALCHEMY_DATABASE_URI', 'sqlite://')
+
+
+@pytest.fixture
+def app_config():
+    """Extra configuration of the application."""
+    return {}
+
+
+@pytest.fixture
+def app(request, database_uri, app_config):
     """Flask application fixture."""
     instance_path = tempfile.mkdtemp()
     app = Flask('testapp', instance_path=instance_path)
@@ -56,11 +71,11 @@ def app(request):
         MAIL_SUPPRESS_SEND=True,
         SECRET_KEY='changeme',
         SERVER_NAME='example.com',
-        SQLALCHEMY_DATABASE_URI=os.environ.get(
-            'SQLALCHEMY_DATABASE_URI', 'sqlite://'),
+        SQLALCHEMY_DATABASE_URI=database_uri,
         TESTING=True,
         WTF_CSRF_ENABLED=False,
     )
+    app.config.update(app_config)
     Babel(app)
     Menu(app)
     Breadcrumbs(app)
@@ -110,3 +125,30 @@ def example_group(app):
     app.get_group = lambda: Group.query.get(group_id)
 
     return app
+
+
+@pytest.fixture
+def count_queries():
+    """Record the SQL statements executed within a block.
+
+    Only statements matching the optional regular expression are kept::
+
+        with count_queries('^SELECT') as queries:
+            ...
+        assert len(queries) == 1
+    """
+    @contextmanager
+    def count(pattern=None):
+        queries = []
+
+        def _count(conn, cursor, statement, *args):
+            if pattern is None or re.search(pattern, statement):
+                queries.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', _count)
+        try:
+            yield queries
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', _count)
+
+    return count
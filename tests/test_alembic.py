@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2016 CERN.
+#
+# Invenio is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Test alembic recipes."""
+
+from __future__ import absolute_import, print_function
+
+from datetime import datetime
+
+import sqlalchemy as sa
+from invenio_db import db
+
+from invenio_groups.models import Group, GroupAdminClosure, GroupSearchNGram, \
+    MemberSearchToken, resolve_users_by_emails
+
+BRANCH_BASE = 'a1a28be1b2c5'
+"""First revision of the invenio_groups branch."""
+
+
+def upgrade_groups_branch(ext, target='heads'):
+    """Create an empty database and upgrade it.
+
+    Recipes of other modules do not all run on SQLite, so there their tables
+    are created from the models and their branches stamped at their heads.
+    """
+    db.drop_all()
+    if db.engine.name == 'sqlite':
+        db.metadata.create_all(db.engine, tables=[
+            table for table in db.metadata.sorted_tables
+            if not table.name.startswith('groups')])
+        ext.alembic.stamp('invenio_accounts@head')
+    ext.alembic.upgrade(target)
+
+
+def test_alembic(app):
+    """Test alembic recipes."""
+    ext = app.extensions['invenio-db']
+
+    with app.app_context():
+        assert not ext.alembic.compare_metadata()
+        upgrade_groups_branch(ext)
+
+        assert not ext.alembic.compare_metadata()
+        ext.alembic.downgrade(target='e8a1b4d5c3f2')
+        ext.alembic.upgrade()
+
+        assert not ext.alembic.compare_metadata()
+        ext.alembic.downgrade(target=BRANCH_BASE)
+        assert not [name for name in db.engine.table_names()
+                    if name.startswith('groups')]
+        ext.alembic.upgrade()
+
+        assert not ext.alembic.compare_metadata()
+
+
+def test_alembic_data(app):
+    """Test that the recipes fill the new tables from existing rows."""
+    ext = app.extensions['invenio-db']
+
+    with app.app_context():
+        upgrade_groups_branch(ext, target='e8a1b4d5c3f2')
+        now = datetime.utcnow()
+        db.engine.execute(sa.table(
+            'accounts_user', sa.column('id'), sa.column('email'),
+            sa.column('active'),
+        ).insert(), [
+            dict(id=i, email=(u'User{0}@inveniosoftware.org' if i == 4 else
+                              u'user{0}@inveniosoftware.org').format(i),
+                 active=True)
+            for i in range(1, 5)
+        ])
+        db.engine.execute(sa.table(
+            'groups', sa.column('id'), sa.column('name'),
+            sa.column('description'), sa.column('is_managed'),
+            sa.column('privacy_policy'), sa.column('subscription_policy'),
+            sa.column('created'), sa.column('modified'),
+        ).insert(), [
+            dict(id=i, name=name, description=u'Group {0}'.format(name),
+                 is_managed=False, privacy_policy='M',
+                 subscription_policy='A', created=now, modified=now)
+            for i, name in enumerate([u'alpha', u'beta', u'gamma'], 1)
+        ])
+        # beta is administered by alpha, which gamma administers in turn.
+        db.engine.execute(sa.table(
+            'groups_admin', sa.column('group_id'), sa.column('admin_type'),
+            sa.column('admin_id'),
+        ).insert(), [
+            dict(group_id=1, admin_type=u'User', admin_id=1),
+            dict(group_id=2, admin_type=u'Group', admin_id=1),
+            dict(group_id=1, admin_type=u'Group', admin_id=3),
+        ])
+        db.engine.execute(sa.table(
+            'groups_members', sa.column('user_id'), sa.column('id_group'),
+            sa.column('state'), sa.column('created'), sa.column('modified'),
+        ).insert(), [
+            dict(user_id=2, id_group=1, state='M', created=now,
+                 modified=now),
+            dict(user_id=3, id_group=1, state='A', created=now,
+                 modified=now),
+            dict(user_id=4, id_group=3, state='M', created=now,
+                 modified=now),
+            dict(user_id=4, id_group=2, state='U', created=now,
+                 modified=now),
+        ])
+
+        ext.alembic.upgrade()
+
+        assert [(g.active_members_count, g.pending_requests_count,
+                 g.pending_invitations_count)
+                for g in Group.query.order_by(Group.id)] == [
+            (1, 1, 0), (0, 0, 1), (1, 0, 0)]
+        assert set(GroupAdminClosure.query.filter_by(
+            group_id=2,
+        ).with_entities(
+            GroupAdminClosure.admin_type, GroupAdminClosure.admin_id,
+        )) == set([(u'Group', 1), (u'Group', 3), (u'User', 1), (u'User', 2),
+                   (u'User', 4)])
+        assert not GroupAdminClosure.rebuild()
+
+        ngrams = set(GroupSearchNGram.query.with_entities(
+            GroupSearchNGram.ngram, GroupSearchNGram.group_id))
+        if db.engine.name != 'postgresql':
+            assert ngrams
+        GroupSearchNGram.reindex()
+        assert set(GroupSearchNGram.query.with_entities(
+            GroupSearchNGram.ngram, GroupSearchNGram.group_id)) == ngrams
+        assert [g.name for g in Group.search(Group.query, 'amm')] == [
+            u'gamma']
+
+        tokens = set(MemberSearchToken.query.with_entities(
+            MemberSearchToken.id_group, MemberSearchToken.token,
+            MemberSearchToken.user_id))
+        assert (1, u'user2', 2) in tokens
+        MemberSearchToken.reindex()
+        assert set(MemberSearchToken.query.with_entities(
+            MemberSearchToken.id_group, MemberSearchToken.token,
+            MemberSearchToken.user_id)) == tokens
+
+        assert resolve_users_by_emails([u'user4@inveniosoftware.org']) == {
+            u'user4@inveniosoftware.org': 4}
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2016 CERN.
+#
+# Invenio is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Cache tests."""
+
+from __future__ import absolute_import, print_function
+
+import time
+
+from invenio_accounts.models import User
+from invenio_db import db
+
+from invenio_groups.cache import LRUCache, UserGroupsCache
+from invenio_groups.models import Group, Membership, MembershipState
+from invenio_groups.proxies import current_groups
+
+
+def test_lru_cache():
+    """Test LRU cache backend."""
+    cache = LRUCache(maxsize=2, default_timeout=0)
+    cache.set('a', [1])
+    cache.set('b', [2])
+    assert cache.get('a') == [1]
+    cache.set('c', [3])
+    assert cache.get('b') is None
+    assert cache.get('a') == [1]
+    assert cache.get('c') == [3]
+    assert len(cache) == 2
+
+    cache.delete_many('a', 'x')
+    assert cache.get('a') is None
+
+    cache.set('d', [4], timeout=0.01)
+    time.sleep(0.02)
+    assert cache.get('d') is None
+
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_user_groups_cache(app):
+    """Test user groups cache and its invalidation."""
+    with app.app_context():
+        cache = current_groups.user_groups_cache
+        u1 = User(email='test@example.com', password='test_password')
+        u2 = User(email='test2@example.com', password='test_password')
+        db.session.add_all([u1, u2])
+        g1 = Group.create(name='test1', admins=[u1])
+        g2 = Group.create(name='test2')
+        g3 = Group.create(name='test3', admins=[g2])
+        db.session.commit()
+
+        assert current_groups.get_user_groups_ids(u1) == set([g1.id])
+        assert cache.get(u1.id) == set([g1.id])
+        assert cache.stats()['hits'] == 1
+        assert cache.stats()['misses'] == 1
+        assert cache.get(u2.id) == set()
+
+        # Membership in a group administering another group.
+        g2.add_member(u2)
+        db.session.commit()
+        assert cache.get(u2.id) == set([g2.id, g3.id])
+
+        # Pending memberships do not count.
+        m = g1.add_member(u2, state=MembershipState.PENDING_ADMIN)
+        db.session.commit()
+        assert cache.get(u2.id) == set([g2.id, g3.id])
+        m.accept()
+        db.session.commit()
+        assert cache.get(u2.id) == set([g1.id, g2.id, g3.id])
+
+        g2.remove_member(u2)
+        db.session.commit()
+        assert cache.get(u2.id) == set([g1.id])
+
+        # Rolled back changes do not stay in the cache.
+        g2.add_member(u2)
+        assert cache.get(u2.id) == set([g1.id, g2.id, g3.id])
+        db.session.rollback()
+        assert cache.get(u2.id) == set([g1.id])
+
+        g1.add_admin(u2)
+        db.session.commit()
+        g1.delete()
+        db.session.commit()
+        assert cache.get(u1.id) == set()
+        assert cache.get(u2.id) == set()
+
+        stats = cache.stats()
+        assert stats['hit_ratio'] == \
+            float(stats['hits']) / (stats['hits'] + stats['misses'])
+
+
+def test_user_groups_cache_version():
+    """Test that version stamps expire like the cached groups."""
+    cache = UserGroupsCache(LRUCache(), timeout=0.01)
+    version = cache.version(1)
+    assert cache.version(1) == version
+    time.sleep(0.02)
+    assert cache.version(1) != version
+
+    version = cache.version(1)
+    cache.invalidate([1])
+    assert cache.version(1) != version
+
+
+def test_badge_counts_cache(app):
+    """Test badge counts cache."""
+    from invenio_groups.cache import BadgeCountsCache
+    with app.app_context():
+        u1 = User(email='test@example.com', password='test_password')
+        u2 = User(email='test2@example.com', password='test_password')
+        db.session.add_all([u1, u2])
+        g = Group.create(name='test', admins=[u1])
+        db.session.commit()
+
+        # Disabled by default.
+        assert current_groups.badge_counts_cache.timeout == 0
+        g.add_member(u2, state=MembershipState.PENDING_ADMIN)
+        db.session.commit()
+        assert current_groups.get_badge_counts(u1) == dict(
+            requests=1, invitations=0)
+
+        cache = BadgeCountsCache(LRUCache(), timeout=60)
+        assert cache.get(u1) == dict(requests=1, invitations=0)
+        g.remove_member(u2)
+        db.session.commit()
+        assert cache.get(u1) == dict(requests=1, invitations=0)
+        cache.invalidate([u1.id])
+        assert cache.get(u1) == dict(requests=0, invitations=0)
+
+
+def test_badge_counts_cache_invalidation(app, monkeypatch):
+    """Test that membership changes invalidate the cached badge counts."""
+    with app.app_context():
+        u1, u2, u3 = users = [
+            User(email='test{0}@example.com'.format(i),
+                 password='test_password') for i in range(3)]
+        db.session.add_all(users)
+        admins = Group.create(name='admins')
+        g = Group.create(name='test', admins=[u1, admins])
+        db.session.commit()
+        admins.add_member(u3)
+        db.session.commit()
+        monkeypatch.setattr(current_groups.badge_counts_cache, 'timeout', 60)
+
+        def counts(user):
+            return current_groups.get_badge_counts(user)
+
+        assert counts(u1) == counts(u2) == counts(u3) == dict(
+            requests=0, invitations=0)
+
+        # A request reaches every effective admin.
+        m = g.add_member(u2, state=MembershipState.PENDING_ADMIN)
+        db.session.commit()
+        assert counts(u1) == counts(u3) == dict(requests=1, invitations=0)
+
+        m.accept()
+        db.session.commit()
+        assert counts(u1) == counts(u3) == dict(requests=0, invitations=0)
+
+        # An invitation reaches the invited user.
+        g.invite(u3)
+        db.session.commit()
+        assert counts(u3) == dict(requests=0, invitations=1)
+        Membership.query.get((u3.id, g.id)).reject()
+        db.session.commit()
+        assert counts(u3) == dict(requests=0, invitations=0)
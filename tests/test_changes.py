@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2016 CERN.
+#
+# Invenio is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Change log tests."""
+
+from __future__ import absolute_import, print_function
+
+from datetime import datetime, timedelta
+
+from invenio_accounts.models import User
+from invenio_db import db
+
+from invenio_groups.models import Group, GroupAdmin, GroupChange, Membership, \
+    MembershipState
+
+
+def changes(seq=0):
+    """Get the change log entries after a sequence number as tuples."""
+    return [(c.operation, c.group_id, c.principal_type, c.principal_id,
+             c.state) for c in GroupChange.query_since(seq)]
+
+
+def test_change_log(example_group):
+    """Test that mutations append entries in order."""
+    app = example_group
+    with app.app_context():
+        group = app.get_group()
+        admin = app.get_admin()
+        member = app.get_member()
+        non_member = app.get_non_member()
+        assert changes() == [
+            ('admin-added', group.id, 'User', admin.id, None),
+            ('membership-created', group.id, 'User', member.id,
+             MembershipState.PENDING_USER),
+            ('membership-accepted', group.id, 'User', member.id,
+             MembershipState.ACTIVE),
+        ]
+
+        seq = GroupChange.last_seq()
+        Membership.create(
+            group, non_member, MembershipState.PENDING_ADMIN).reject()
+        GroupAdmin.create(group, non_member)
+        Membership.delete(group, member)
+        db.session.commit()
+        assert changes(seq) == [
+            ('membership-created', group.id, 'User', non_member.id,
+             MembershipState.PENDING_ADMIN),
+            ('membership-rejected', group.id, 'User', non_member.id,
+             MembershipState.PENDING_ADMIN),
+            ('admin-added', group.id, 'User', non_member.id, None),
+            ('membership-removed', group.id, 'User', member.id,
+             MembershipState.ACTIVE),
+        ]
+        assert GroupChange.query_since(groups_ids=[0]).count() == 0
+
+        # Entries are part of the transaction of the mutation.
+        seq = GroupChange.last_seq()
+        Membership.create(group, member)
+        db.session.rollback()
+        assert GroupChange.last_seq() == seq
+
+        group_id = group.id
+        group.delete(chunk_size=1)
+        db.session.commit()
+        assert changes(seq) == [
+            ('admin-removed', group_id, 'User', admin.id, None),
+            ('admin-removed', group_id, 'User', non_member.id, None),
+            ('group-deleted', group_id, 'Group', group_id, None),
+        ]
+
+
+def test_change_log_bulk(app):
+    """Test that bulk operations append entries in bulk."""
+    with app.app_context():
+        users = [User(email='user{0}@example.com'.format(i),
+                      password='test_password') for i in range(3)]
+        db.session.add_all(users)
+        group = Group.create(name='test')
+        db.session.commit()
+        ids = [u.id for u in users]
+
+        Membership.create_many(group, ids, MembershipState.PENDING_USER)
+        Membership.upsert_many(group, {ids[0]: MembershipState.ACTIVE})
+        Membership.delete_many(group, ids[1:])
+        db.session.commit()
+        assert changes() == [
+            ('membership-created', group.id, 'User', ids[0], 'U'),
+            ('membership-created', group.id, 'User', ids[1], 'U'),
+            ('membership-created', group.id, 'User', ids[2], 'U'),
+            ('membership-accepted', group.id, 'User', ids[0], 'M'),
+            ('membership-removed', group.id, 'User', ids[1], 'U'),
+            ('membership-removed', group.id, 'User', ids[2], 'U'),
+        ]
+        assert [c['seq'] for c in (
+            e.to_dict() for e in GroupChange.query_since())] == list(
+                range(1, 7))
+
+
+def test_change_log_compact(app):
+    """Test compaction of old entries."""
+    with app.app_context():
+        users = [User(email='user{0}@example.com'.format(i),
+                      password='test_password') for i in range(2)]
+        db.session.add_all(users)
+        group = Group.create(name='test')
+        db.session.commit()
+        ids = [u.id for u in users]
+
+        Membership.create_many(group, ids, MembershipState.PENDING_USER)
+        GroupAdmin.create_many(group, ids)
+        Membership.upsert_many(group, {ids[0]: MembershipState.ACTIVE})
+        Membership.delete_many(group, ids[1:])
+        db.session.commit()
+
+        assert GroupChange.compact(datetime.now() - timedelta(days=1)) == 0
+        assert GroupChange.compact(
+            datetime.now() + timedelta(seconds=1), chunk_size=2) == 2
+        # The last entry of each membership and admin is kept.
+        assert changes() == [
+            ('admin-added', group.id, 'User', ids[0], None),
+            ('admin-added', group.id, 'User', ids[1], None),
+            ('membership-accepted', group.id, 'User', ids[0], 'M'),
+            ('membership-removed', group.id, 'User', ids[1], 'U'),
+        ]
+        assert GroupChange.compact(datetime.now() + timedelta(seconds=1)) \
+            == 0
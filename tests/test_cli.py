@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2016 CERN.
+#
+# Invenio is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""CLI tests."""
+
+from __future__ import absolute_import, print_function
+
+from collections import namedtuple
+
+from click.testing import CliRunner
+from flask.cli import ScriptInfo
+from invenio_db import db
+
+from invenio_groups.cli import groups
+from invenio_groups.models import Group, GroupAdminClosure, GroupSearchNGram
+from invenio_groups.tasks import delete_group
+
+
+def test_repair_counters(example_group):
+    """Test repair-counters command."""
+    app = example_group
+    script_info = ScriptInfo(create_app=lambda info: app)
+    runner = CliRunner()
+
+    with app.app_context():
+        Group.query.update({Group.active_members_count: 0})
+        db.session.commit()
+
+    result = runner.invoke(
+        groups, ['repair-counters', '-g', 'test_group'], obj=script_info)
+    assert result.exit_code == 0
+    assert '1 group(s)' in result.output
+
+    with app.app_context():
+        assert app.get_group().active_members_count == 1
+
+    result = runner.invoke(groups, ['repair-counters'], obj=script_info)
+    assert result.exit_code == 0
+    assert '0 group(s)' in result.output
+
+
+def test_rebuild_admin_closure(example_group):
+    """Test rebuild-admin-closure command."""
+    app = example_group
+    script_info = ScriptInfo(create_app=lambda info: app)
+    runner = CliRunner()
+
+    with app.app_context():
+        GroupAdminClosure.query.delete()
+        db.session.commit()
+
+    result = runner.invoke(groups, ['rebuild-admin-closure'], obj=script_info)
+    assert result.exit_code == 0
+    assert '1 effective admin row(s)' in result.output
+
+    with app.app_context():
+        assert app.get_group().is_admin(app.get_admin())
+
+
+def test_delete(example_group, monkeypatch):
+    """Test delete command."""
+    app = example_group
+    script_info = ScriptInfo(create_app=lambda info: app)
+    runner = CliRunner()
+
+    result = runner.invoke(groups, ['delete', 'invalid'], obj=script_info)
+    assert result.exit_code != 0
+
+    delayed = []
+
+    def delay(group_id, chunk_size):
+        delayed.append((group_id, chunk_size))
+        return namedtuple('AsyncResult', 'id')('task-id')
+
+    monkeypatch.setattr(delete_group, 'delay', delay)
+    result = runner.invoke(
+        groups, ['delete', 'test_group', '--background'], obj=script_info)
+    assert result.exit_code == 0
+    assert 'Deleting group in task task-id.' in result.output
+    with app.app_context():
+        assert delayed == [(app.get_group().id, 1000)]
+
+    result = runner.invoke(
+        groups, ['delete', 'test_group', '--chunk-size', '1'],
+        obj=script_info)
+    assert result.exit_code == 0
+    assert 'Deleted 2/2 row(s).' in result.output
+
+    with app.app_context():
+        assert Group.get_by_name('test_group') is None
+
+
+def test_reindex_search(example_group):
+    """Test reindex-search command."""
+    app = example_group
+    script_info = ScriptInfo(create_app=lambda info: app)
+    runner = CliRunner()
+
+    with app.app_context():
+        GroupSearchNGram.query.delete()
+        db.session.commit()
+
+    result = runner.invoke(groups, ['reindex-search'], obj=script_info)
+    assert result.exit_code == 0
+    assert 'Indexed 1 group(s) and 1 membership(s).' in result.output
+
+    with app.app_context():
+        assert Group.search(Group.query, 'group').count() == 1
+
+
+def test_export(example_group, tmpdir):
+    """Test export command."""
+    app = example_group
+    script_info = ScriptInfo(create_app=lambda info: app)
+    runner = CliRunner()
+
+    result = runner.invoke(groups, ['export'], obj=script_info)
+    assert result.exit_code == 0
+    assert result.output.splitlines()[1].startswith('1,test_group,')
+
+    output = tmpdir.join('members.jsonl')
+    result = runner.invoke(
+        groups, ['export', '-g', 'test_group', '-f', 'jsonl',
+                 '-o', str(output)], obj=script_info)
+    assert result.exit_code == 0
+    assert len(output.readlines()) == 1
+
+    result = runner.invoke(
+        groups, ['export', '-g', 'invalid'], obj=script_info)
+    assert result.exit_code != 0
+
+
+def test_import(example_group, tmpdir):
+    """Test import command."""
+    app = example_group
+    script_info = ScriptInfo(create_app=lambda info: app)
+    runner = CliRunner()
+
+    source = tmpdir.join('members.csv')
+    source.write('group,email\ntest_group,test3@example.com\n'
+                 'test_group,invalid@example.com\n')
+    result = runner.invoke(groups, ['import', str(source)], obj=script_info)
+    assert result.exit_code == 0
+    assert 'Line 3: User invalid@example.com does not exist.' in \
+        result.output
+    assert 'Loaded 1/2 record(s).' in result.output
+
+    with app.app_context():
+        assert app.get_group().is_member(app.get_non_member())
+
+
+def test_compact_changes(example_group):
+    """Test compact-changes command."""
+    app = example_group
+    script_info = ScriptInfo(create_app=lambda info: app)
+    runner = CliRunner()
+
+    result = runner.invoke(groups, ['compact-changes'], obj=script_info)
+    assert result.exit_code == 0
+    assert 'Deleted 0 change log entries.' in result.output
+
+    result = runner.invoke(
+        groups, ['compact-changes', '--days', '-1'], obj=script_info)
+    assert result.exit_code == 0
+    assert 'Deleted 1 change log entries.' in result.output
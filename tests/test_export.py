@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2016 CERN.
+#
+# Invenio is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+
+"""Export tests."""
+
+from __future__ import absolute_import, print_function
+
+import csv
+import json
+
+from invenio_accounts.models import User
+from invenio_db import db
+
+from invenio_groups.export import EXPORT_FIELDS, export, iter_memberships
+from invenio_groups.models import Group, MembershipState
+
+
+def test_iter_memberships(example_group, count_queries):
+    """Test chunked iteration over memberships."""
+    app = example_group
+    with app.app_context():
+        group = app.get_group()
+        other = Group.create(name='other')
+        users = [User(email=u'm\xe9mber{0}@example.com'.format(i),
+                      password='test_password') for i in range(5)]
+        db.session.add_all(users)
+        db.session.commit()
+        group.add_members(users[:3])
+        other.add_members(users, state=MembershipState.PENDING_USER)
+        db.session.commit()
+
+        with count_queries('^SELECT') as queries:
+            rows = list(iter_memberships(chunk_size=2))
+        # 9 memberships, 2 per chunk.
+        assert len(queries) == 5
+        assert len(rows) == 9
+        assert [(r['group_id'], r['user_id']) for r in rows] == sorted(
+            (r['group_id'], r['user_id']) for r in rows)
+        assert list(rows[0]) == list(EXPORT_FIELDS)
+        assert rows[0]['group'] == 'test_group'
+        assert rows[0]['state'] == 'active'
+        assert rows[-1]['group'] == 'other'
+        assert rows[-1]['state'] == 'pending_user'
+
+        assert len(list(iter_memberships([other.id], chunk_size=5))) == 5
+        assert list(iter_memberships([])) == []
+
+
+def test_export_formats(example_group):
+    """Test CSV and JSON Lines serialization."""
+    app = example_group
+    with app.app_context():
+        group = app.get_group()
+        u = User(email=u'j\xf6rg@example.com', password='test_password')
+        db.session.add(u)
+        db.session.commit()
+        group.add_member(u)
+        db.session.commit()
+
+        lines = list(export('csv', groups_ids=[group.id]))
+        assert len(lines) == 3
+        rows = list(csv.reader(''.join(lines).splitlines()))
+        assert rows[0] == list(EXPORT_FIELDS)
+        assert rows[2][3] == u'j\xf6rg@example.com'
+
+        lines = list(export('jsonl', chunk_size=1))
+        assert len(lines) == 2
+        data = json.loads(lines[1])
+        assert data['email'] == u'j\xf6rg@example.com'
+        assert data['state'] == 'active'
+        assert data['created']
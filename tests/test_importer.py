@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2016 CERN.
+#
+# Invenio is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+
+"""Import tests."""
+
+from __future__ import absolute_import, print_function
+
+import io
+
+from invenio_accounts.models import User
+from invenio_db import db
+
+from invenio_groups.export import export
+from invenio_groups.importer import load, read_csv, read_jsonl
+from invenio_groups.models import Group, GroupAdmin, MemberSearchToken, \
+    Membership, MembershipState
+
+
+def test_load(example_group):
+    """Test batched import of memberships and admins."""
+    app = example_group
+    with app.app_context():
+        group = app.get_group()
+        member = app.get_member()
+        other = Group.create(name='other')
+        users = [User(email='User{0}@example.com'.format(i),
+                      password='test_password') for i in range(4)]
+        db.session.add_all(users)
+        db.session.commit()
+        ids = [u.id for u in users]
+
+        data = u'\n'.join([
+            u'group,email,user_id,state,admin',
+            u'test_group,user0@example.com,,,',
+            u'test_group,,{0},pending_user,no'.format(ids[1]),
+            u'test_group,test2@example.com,,pending_admin,',
+            u'other,user2@example.com,,active,true',
+            u'other,,{0},,'.format(ids[3]),
+            u'missing,user0@example.com,,,',
+            u'other,nobody@example.com,,,',
+            u'other,,999999,,',
+            u'other,user0@example.com,,invalid,',
+            u'other,user0@example.com,,,maybe',
+            u',user0@example.com,,,',
+            u'other,,,,',
+            u'other,,abc,,',
+        ])
+        rejects = []
+        progress = []
+        stats = load(read_csv(io.StringIO(data)), batch_size=4,
+                     chunk_size=2, progress=lambda s: progress.append(
+                         dict(s)),
+                     reject=lambda *args: rejects.append(args))
+
+        assert [line for line, reason in rejects] == list(range(7, 15))
+        assert 'missing' in rejects[0][1]
+        assert stats == dict(processed=13, loaded=5, rejected=8, created=4,
+                             updated=1, admins=1)
+        assert [p['processed'] for p in progress] == [4, 8, 12, 13]
+
+        group = app.get_group()
+        assert group.is_member(users[0])
+        assert Membership.get(group, users[1]).state == \
+            MembershipState.PENDING_USER
+        assert Membership.get(group, member).state == \
+            MembershipState.PENDING_ADMIN
+        assert group.active_members_count == 1
+        assert group.pending_requests_count == 1
+        assert group.pending_invitations_count == 1
+        assert other.is_admin(users[2])
+        assert other.is_member(users[3])
+        assert Membership.search(
+            Membership.query_by_group(other), 'user3').count() == 1
+
+        # Loading the same records again changes nothing.
+        stats = load(read_csv(io.StringIO(data)))
+        assert stats['created'] == stats['updated'] == stats['admins'] == 0
+
+        # Exported memberships can be loaded back.
+        exported = u''.join(export('jsonl'))
+        Membership.query.delete()
+        MemberSearchToken.query.delete()
+        db.session.commit()
+        Group.repair_counters()
+        stats = load(read_jsonl(io.StringIO(exported + u'\n[]\n')))
+        assert stats['created'] == 5
+        assert stats['rejected'] == 1
+        assert GroupAdmin.query.count() == 2
+
+
+def test_load_empty(app):
+    """Test import of no records."""
+    with app.app_context():
+        assert load([])['processed'] == 0
@@ -27,6 +27,9 @@
 
 from __future__ import absolute_import, print_function
 
+import warnings
+
+import pytest
 from flask import Flask, url_for
 
 from invenio_groups import InvenioGroups
@@ -51,6 +54,19 @@ def test_init():
     assert 'invenio-groups' in app.extensions
 
 
+def test_init_cache_backend_warning():
+    """Test the warning about identity needs with an in-process cache."""
+    app = Flask('testapp')
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        InvenioGroups(app)
+
+    app = Flask('testapp')
+    app.config['GROUPS_IDENTITY_NEEDS'] = True
+    with pytest.warns(RuntimeWarning):
+        InvenioGroups(app)
+
+
 def test_view(app):
     """Test view."""
     with app.app_context():
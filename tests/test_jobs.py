@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2016 CERN.
+#
+# Invenio is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+
+"""Background jobs tests."""
+
+from __future__ import absolute_import, print_function
+
+import json
+
+import pytest
+from flask import url_for
+from invenio_accounts.models import User
+from invenio_db import db
+
+from invenio_groups.jobs import ThreadPoolJobExecutor, execute_job, submit_job
+from invenio_groups.models import Group, GroupJob, InvitationStatus, \
+    JobStatus, Membership, MembershipState
+from invenio_groups.proxies import current_groups
+
+
+@pytest.fixture
+def database_uri(database_uri, tmpdir):
+    """Use a database file, in-memory SQLite cannot be shared by threads."""
+    if database_uri == 'sqlite://':
+        return 'sqlite:///' + str(tmpdir.join('test.db'))
+    return database_uri
+
+
+def login(client, user_id):
+    """Log in a user in the test client."""
+    with client.session_transaction() as sess:
+        sess['user_id'] = str(user_id)
+        sess['_user_id'] = str(user_id)
+        sess['_fresh'] = True
+
+
+class _Executor(object):
+    """Executor recording the submitted jobs."""
+
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, job_id):
+        self.submitted.append(job_id)
+
+
+def test_execute_jobs(example_group):
+    """Test execution of the job kinds."""
+    app = example_group
+    with app.app_context():
+        executor = _Executor()
+        group = app.get_group()
+        admin = app.get_admin()
+        users = [User(email='user{0}@example.com'.format(i),
+                      password='test_password') for i in range(5)]
+        db.session.add_all(users)
+        db.session.commit()
+        ids = [u.id for u in users]
+
+        job = submit_job(executor, 'invite', group, user=admin, emails=[
+            'User0@example.com', 'user0@example.com', 'test2@example.com',
+            'nobody@example.com', ''], chunk_size=2)
+        # Jobs are submitted once committed.
+        assert executor.submitted == []
+        db.session.commit()
+        assert executor.submitted == [job.id]
+        assert job.status == JobStatus.PENDING
+        assert job.user_id == admin.id
+
+        assert execute_job(job.id) == JobStatus.SUCCESS
+        job = GroupJob.query.get(job.id)
+        assert job.result == {
+            InvitationStatus.INVITED: ['user0@example.com'],
+            InvitationStatus.EXISTING: ['test2@example.com'],
+            InvitationStatus.NOT_FOUND: ['nobody@example.com'],
+        }
+        assert (job.done, job.total) == (3, 3)
+        # Jobs run only once.
+        assert execute_job(job.id) is None
+
+        job = submit_job(executor, 'add_members', group, users_ids=ids,
+                         state=MembershipState.PENDING_ADMIN, chunk_size=2)
+        db.session.commit()
+        assert execute_job(job.id) == JobStatus.SUCCESS
+        assert GroupJob.query.get(job.id).result == dict(added=4, skipped=1)
+        assert app.get_group().pending_requests_count == 4
+
+        job = submit_job(executor, 'remove_members', group,
+                         users_ids=ids[:3] + [admin.id], chunk_size=2)
+        db.session.commit()
+        assert execute_job(job.id) == JobStatus.SUCCESS
+        assert GroupJob.query.get(job.id).result == dict(
+            removed=3, skipped=1)
+        group = app.get_group()
+        assert group.pending_requests_count == 2
+        assert group.pending_invitations_count == 0
+        assert Membership.query.filter_by(id_group=group.id).count() == 3
+
+        assert GroupJob.query.get(job.id).to_dict()['status'] == \
+            JobStatus.SUCCESS
+
+        # The group of a failed job no longer exists.
+        group_id = group.id
+        group.delete()
+        db.session.commit()
+        job = GroupJob(kind='remove_members', group_id=group_id,
+                       payload=dict(users_ids=ids))
+        db.session.add(job)
+        db.session.commit()
+        assert execute_job(job.id) == JobStatus.FAILURE
+        assert 'does not exist' in GroupJob.query.get(job.id).error
+
+
+def test_submit_job_failure(example_group):
+    """Test that a job which cannot be submitted is marked as failed."""
+    app = example_group
+
+    class BrokenExecutor(object):
+        def submit(self, job_id):
+            raise IOError('Broker unavailable.')
+
+    with app.app_context():
+        submit_job(BrokenExecutor(), 'add_members', app.get_group(),
+                   users_ids=[])
+        db.session.commit()
+        job = GroupJob.query.one()
+        assert job.status == JobStatus.FAILURE
+        assert job.error == 'Broker unavailable.'
+        assert Group.query.get(job.group_id) is not None
+
+
+def test_submit_job_rollback(example_group):
+    """Test that a rolled back job is not submitted."""
+    app = example_group
+    with app.app_context():
+        executor = _Executor()
+        group = app.get_group()
+        group.description = 'Changed'
+        submit_job(executor, 'add_members', group, users_ids=[])
+        db.session.rollback()
+        assert executor.submitted == []
+        assert GroupJob.query.count() == 0
+        assert app.get_group().description != 'Changed'
+
+        with db.session.begin_nested():
+            job = submit_job(executor, 'add_members', app.get_group(),
+                             users_ids=[])
+        db.session.commit()
+        assert executor.submitted == [job.id]
+
+
+def test_thread_pool_executor(example_group):
+    """Test thread pool job executor."""
+    app = example_group
+    executor = ThreadPoolJobExecutor(app, max_workers=1)
+    with app.app_context():
+        job = submit_job(executor, 'add_members', app.get_group(),
+                         users_ids=[app.get_non_member().id])
+        db.session.commit()
+        job_id = job.id
+    # Wait for the queued job.
+    executor.shutdown()
+
+    with app.app_context():
+        assert GroupJob.query.get(job_id).status == JobStatus.SUCCESS
+        assert app.get_group().is_member(app.get_non_member())
+        # A job which already ran is skipped.
+        assert executor.submit(job_id).get(timeout=10) is None
+    executor.shutdown()
+
+
+def test_new_member_job(example_group):
+    """Test large invitation batches are sent in the background."""
+    app = example_group
+    app.config['GROUPS_INVITE_SYNC_LIMIT'] = 1
+    with app.app_context():
+        executor = ThreadPoolJobExecutor(app)
+        current_groups.jobs_executor = executor
+        group_id = app.get_group().id
+        admin_id = app.get_admin().id
+        member_id = app.get_member().id
+
+    with app.test_request_context():
+        new_member_url = url_for('invenio_groups.new_member',
+                                 group_id=group_id)
+
+    client = app.test_client()
+    login(client, admin_id)
+    # Blank lines do not count.
+    res = client.post(new_member_url, data=dict(
+        emails='nobody@example.com\n\n  \n'))
+    assert res.status_code == 302
+    with app.app_context():
+        assert GroupJob.query.count() == 0
+
+    res = client.post(new_member_url, data=dict(
+        emails='test3@example.com\nnobody@example.com'))
+    assert res.status_code == 302
+    executor.shutdown()
+
+    with app.test_request_context():
+        job = GroupJob.query.one()
+        assert job.status == JobStatus.SUCCESS
+        assert job.result['invited'] == ['test3@example.com']
+        job_status_url = url_for('invenio_groups.job_status',
+                                 job_id=job.id)
+
+    res = client.get(job_status_url)
+    assert res.status_code == 200
+    assert json.loads(res.get_data(as_text=True))['status'] == \
+        JobStatus.SUCCESS
+
+    login(client, member_id)
+    res = client.get(job_status_url)
+    assert res.status_code == 403
+
+
+def test_members_unfinished_jobs(example_group):
+    """Test the members view lists the jobs which are not finished."""
+    app = example_group
+    app.config['GROUPS_INVITE_SYNC_LIMIT'] = 1
+    with app.app_context():
+        executor = _Executor()
+        current_groups.jobs_executor = executor
+        group_id = app.get_group().id
+        admin_id = app.get_admin().id
+        done = GroupJob(kind='invite', group_id=group_id,
+                        status=JobStatus.SUCCESS)
+        db.session.add(done)
+        db.session.commit()
+
+    with app.test_request_context():
+        new_member_url = url_for('invenio_groups.new_member',
+                                 group_id=group_id)
+        members_url = url_for('invenio_groups.members', group_id=group_id)
+
+    client = app.test_client()
+    login(client, admin_id)
+    res = client.post(new_member_url, data=dict(
+        emails='test3@example.com\nnobody@example.com'), follow_redirects=True)
+    assert res.status_code == 200
+    with app.app_context():
+        job = GroupJob.query_unfinished(group_id).one()
+        assert executor.submitted == [job.id]
+        job_id = job.id
+    with client.session_transaction() as session:
+        assert 'queued as background job {0}'.format(job_id) in \
+            session['_flashes'][-1][1]
+    body = res.get_data(as_text=True)
+    assert 'Background job {0} is queued'.format(job_id) in body
+
+    with app.app_context():
+        job = GroupJob.query.get(job_id)
+        job.status, job.done, job.total = JobStatus.RUNNING, 1, 2
+        db.session.commit()
+    body = client.get(members_url).get_data(as_text=True)
+    assert 'Background job {0} is running: 1 of 2'.format(job_id) in body
+
+    with app.app_context():
+        GroupJob.query.get(job_id).status = JobStatus.SUCCESS
+        db.session.commit()
+        assert GroupJob.query_unfinished(group_id).count() == 0
+    assert 'job-status' not in client.get(members_url).get_data(as_text=True)
@@ -29,8 +29,8 @@ from sqlalchemy import event
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm.exc import FlushError, NoResultFound
 
-from invenio_groups.api import Group, Membership, MembershipState, \
-    PrivacyPolicy, SubscriptionPolicy
+from invenio_groups.api import Group, InvitationStatus, Membership, \
+    MembershipState, PrivacyPolicy, SubscriptionPolicy
 
 
 def test_subscription_policy_validate():
@@ -612,6 +612,43 @@ def test_membership_query_requests(app):
         assert Membership.query_requests(u3).count() == 1
 
 
+def test_membership_badge_counts(app):
+    """Test badge counts match the requests and invitations queries."""
+    with app.app_context():
+        from invenio_groups.models import Group, Membership, \
+            MembershipState
+        from invenio_accounts.models import User
+
+        a = User(email="admin@admin.admin", password="admin")
+        u1 = User(email="test@test.test", password="test")
+        u2 = User(email="test2@test2.test2", password="test2")
+        db.session.add_all([a, u1, u2])
+        db.session.commit()
+
+        assert Membership.badge_counts(a) == dict(
+            requests=0, invitations=0)
+
+        ad = Group.create(name="admin", admins=[a])
+        g1 = Group.create(name="test1", admins=[a])
+        g2 = Group.create(name="test2", admins=[ad])
+        Membership.create(ad, u1, MembershipState.ACTIVE)
+        Membership.create(g1, u1, MembershipState.PENDING_ADMIN)
+        Membership.create(g2, u2, MembershipState.PENDING_ADMIN)
+        Membership.create(g2, a, MembershipState.PENDING_USER)
+        Membership.create(g1, u2, MembershipState.PENDING_USER)
+        db.session.commit()
+
+        for user in [a, u1, u2]:
+            assert Membership.badge_counts(user) == dict(
+                requests=Membership.query_requests(user).count(),
+                invitations=Membership.query_invitations(user).count(),
+            )
+        assert Membership.badge_counts(a) == dict(
+            requests=2, invitations=1)
+        assert Membership.badge_counts(u1) == dict(
+            requests=1, invitations=0)
+
+
 def test_membership_query_by_group(app):
     """."""
     with app.app_context():
@@ -768,13 +805,42 @@ def test_invite_by_emails(app):
             ]
         )
 
-        assert result[0].state is MembershipState.PENDING_USER
-        assert result[1].state is MembershipState.PENDING_USER
-        assert result[2] is None
+        assert result == {
+            u1.email: InvitationStatus.INVITED,
+            u2.email: InvitationStatus.INVITED,
+            'invalid@example.com': InvitationStatus.NOT_FOUND,
+        }
+        assert Membership.get(g, u1).state == MembershipState.PENDING_USER
+        assert Membership.get(g, u2).state == MembershipState.PENDING_USER
 
         assert g.is_member(u1, with_pending=True)
         assert g.is_member(u2, with_pending=True)
         assert not g.is_member('invalid@example.com', with_pending=True)
+        assert g.pending_invitations_count == 2
+
+        u3 = User(email='Test3@Example.com', password='test_password')
+        db.session.add(u3)
+        db.session.commit()
+
+        result = g.invite_by_emails(
+            iter([' TEST@example.com ', 'test3@example.com', '',
+                  'test3@EXAMPLE.com']), chunk_size=1)
+        assert list(result.items()) == [
+            ('test@example.com', InvitationStatus.EXISTING),
+            ('test3@example.com', InvitationStatus.INVITED),
+        ]
+        assert g.is_member(u3, with_pending=True)
+        assert g.pending_invitations_count == 3
+
+        # Changed emails are found case insensitively too.
+        u3.email = 'TEST4@example.com'
+        db.session.commit()
+        result = g.invite_by_emails(
+            ['test3@example.com', 'test4@example.com'])
+        assert result == {
+            'test3@example.com': InvitationStatus.NOT_FOUND,
+            'test4@example.com': InvitationStatus.EXISTING,
+        }
 
 
 def test_can_see_members(example_group):
@@ -898,6 +964,48 @@ def test_group_search(example_group):
         assert group == Group.search(Group.query, 'st_gro').one()
 
 
+def test_group_search_ranking(app):
+    """Test indexed group search and ranking."""
+    with app.app_context():
+        from invenio_groups.models import GroupSearchNGram
+
+        Group.create(name='Physics', description='Particle physics')
+        Group.create(name='Astrophysics', description='Stars')
+        Group.create(name='Biology', description='Biophysics and more')
+        Group.create(name='100%_pure', description='Percent')
+        g = Group.create(name='Chemistry', description='')
+        db.session.commit()
+
+        def search(q):
+            return [x.name for x in Group.search(Group.query, q)]
+
+        assert search('physics') == ['Physics', 'Astrophysics', 'Biology']
+        assert search('PHYS') == ['Physics', 'Astrophysics', 'Biology']
+        assert search('ysic') == ['Astrophysics', 'Physics', 'Biology']
+        assert search('stars') == ['Astrophysics']
+        assert search('sicsphy') == []
+        assert search('0%_p') == ['100%_pure']
+        assert search('%') == ['100%_pure']
+        assert search('ph') == ['Physics', 'Astrophysics', 'Biology']
+        assert search('ry') == ['Chemistry']
+        assert search('b') == ['Biology']
+        assert search('  ') == search('') == [
+            'Physics', 'Astrophysics', 'Biology', '100%_pure', 'Chemistry']
+
+        g.update(name='Biochemistry')
+        db.session.commit()
+        assert search('bio') == ['Biochemistry', 'Biology']
+        g.delete()
+        db.session.commit()
+        assert search('bio') == ['Biology']
+        assert GroupSearchNGram.query.filter_by(group_id=g.id).count() == 0
+
+        GroupSearchNGram.query.delete()
+        assert search('bio') == []
+        assert GroupSearchNGram.reindex() == 4
+        assert search('bio') == ['Biology']
+
+
 def test_membership_search(example_group):
     """Test membership search function."""
     app = example_group
@@ -912,3 +1020,509 @@ def test_membership_search(example_group):
             Membership.query, 'test2@example').one().user_id)
         assert member.get_id() == str(Membership.search(
             Membership.query, '@example').one().user_id)
+
+
+def test_membership_search_tokens(app):
+    """Test indexed member search."""
+    with app.app_context():
+        from invenio_groups.models import MemberSearchToken
+
+        assert MemberSearchToken.tokens(' John.Smith@CERN.ch ') == set([
+            'john.smith@cern.ch', 'john.smith', '@cern.ch', 'cern.ch',
+            'john', 'smith', 'cern', 'ch'])
+        assert set(['mail.cern.ch', 'cern.ch', '@mail.cern.ch']) <= \
+            MemberSearchToken.tokens('john@mail.cern.ch')
+        assert MemberSearchToken.tokens(None) == set()
+
+        emails = ['john.smith@cern.ch', 'jane@cern.ch', 'john@example.org',
+                  'smithers@example.org', 'smith@example.org']
+        users = [User(email=e, password='test_password') for e in emails]
+        db.session.add_all(users)
+        g = Group.create(name='test')
+        other = Group.create(name='other')
+        db.session.commit()
+        g.add_member(users[0])
+        g.add_members(users[1:3])
+        g.add_member(users[3], state=MembershipState.PENDING_USER)
+        g.add_member(users[4])
+        other.add_member(users[1])
+        db.session.commit()
+
+        def search(q, group=g):
+            query = Membership.query_by_group(group, with_invitations=True)
+            return [m.user.email for m in Membership.search(
+                query, q, group_or_id=group)]
+
+        assert search('john') == ['john.smith@cern.ch', 'john@example.org']
+        assert search('JO') == ['john.smith@cern.ch', 'john@example.org']
+        # Exact token matches come first.
+        assert search('smith') == ['john.smith@cern.ch', 'smith@example.org',
+                                   'smithers@example.org']
+        assert search('@cern') == ['john.smith@cern.ch', 'jane@cern.ch']
+        assert search('john @cern') == ['john.smith@cern.ch']
+        assert search('cern.ch') == ['john.smith@cern.ch', 'jane@cern.ch']
+        assert search('example.org') == ['john@example.org',
+                                         'smithers@example.org',
+                                         'smith@example.org']
+        # Terms are prefixes of tokens, not arbitrary substrings.
+        assert search('ohn') == []
+        assert search('xample.org') == []
+        assert search('j_hn') == search('jo%') == []
+        assert search('jane', group=other) == ['jane@cern.ch']
+        assert search('john', group=other) == []
+        assert search(' ') == search('')
+
+        users[2].email = 'johnny@example.org'
+        db.session.commit()
+        assert search('johnny') == ['johnny@example.org']
+        assert search('@example.org') == ['johnny@example.org',
+                                          'smithers@example.org',
+                                          'smith@example.org']
+
+        g.remove_member(users[0])
+        db.session.commit()
+        assert search('smith') == ['smith@example.org',
+                                   'smithers@example.org']
+        assert MemberSearchToken.query.filter_by(
+            user_id=users[0].id).count() == 0
+
+        MemberSearchToken.query.delete()
+        assert search('jane') == []
+        assert MemberSearchToken.reindex(chunk_size=2) == 5
+        assert search('jane') == ['jane@cern.ch']
+        assert search('jane', group=other) == ['jane@cern.ch']
+
+
+def test_permission_cache(example_group, count_queries):
+    """Test request-scoped permission cache."""
+    app = example_group
+    with app.app_context():
+        from invenio_groups.models import PermissionCache
+
+        group = app.get_group()
+        admin = app.get_admin()
+        member = app.get_member()
+        non_member = app.get_non_member()
+        group2 = Group.create(name='test_group2')
+
+        with count_queries() as queries:
+            PermissionCache.preload([group, group2.id], admin)
+            PermissionCache.preload([group, group2.id], member)
+            assert len(queries) == 2
+
+            assert group.is_admin(admin)
+            assert not group.is_member(admin)
+            assert group.is_member(member)
+            assert not group.is_admin(member)
+            assert group.can_see_members(admin)
+            assert not group2.is_admin(admin)
+            assert not group2.is_member(member)
+            assert len(queries) == 2
+
+            # A miss is filled with a single query.
+            assert not group.is_member(non_member)
+            assert not group.is_admin(non_member)
+            assert len(queries) == 3
+
+        group2.add_member(member)
+        assert group2.is_member(member)
+        group2.remove_member(member)
+        assert not group2.is_member(member)
+
+        group2.add_admin(admin)
+        assert group2.is_admin(admin)
+
+        m = group2.add_member(non_member, state=MembershipState.PENDING_ADMIN)
+        assert not group2.is_member(non_member)
+        assert group2.is_member(non_member, with_pending=True)
+        m.accept()
+        assert group2.is_member(non_member)
+        m.reject()
+        assert not group2.is_member(non_member, with_pending=True)
+
+
+def test_permissions_for(example_group, count_queries):
+    """Test bulk evaluation of group permissions."""
+    app = example_group
+    with app.app_context():
+        group = app.get_group()
+        admin = app.get_admin()
+        member = app.get_member()
+        groups = [Group.create(name='test{0}'.format(i)) for i in range(5)]
+        ids = [g.id for g in groups]
+        db.session.commit()
+        assert group.id and member.id
+
+        with count_queries('^SELECT') as queries:
+            result = Group.permissions_for(member, [group] + ids)
+
+        # One query for the groups given by id and one for the permissions.
+        assert len(queries) == 2
+        assert set(result) == set([group.id] + ids)
+        assert result[group.id] == dict(
+            is_admin=False, is_member=True, can_edit=False, can_leave=True,
+            can_invite_others=False, can_see_members=False)
+        assert result[ids[0]]['is_member'] is False
+
+        result = Group.permissions_for(admin, [group])
+        assert result[group.id]['is_admin']
+        assert result[group.id]['can_edit']
+        assert not result[group.id]['can_leave']
+        assert Group.permissions_for(admin, []) == {}
+
+
+def test_membership_query_counts_by_group_ids(example_group):
+    """Test bulk members counting."""
+    app = example_group
+    with app.app_context():
+        group = app.get_group()
+        admin = app.get_admin()
+        non_member = app.get_non_member()
+        group2 = Group.create(name='test_group2')
+        group3 = Group.create(name='test_group3')
+        group.add_member(non_member, state=MembershipState.PENDING_ADMIN)
+        group2.add_member(admin, state=MembershipState.PENDING_USER)
+        group2.add_member(non_member)
+
+        rows = dict(
+            (row.id_group, tuple(row[1:])) for row in
+            Membership.query_counts_by_group_ids(
+                [group.id, group2.id, group3.id])
+        )
+        assert rows == {
+            group.id: (1, 1, 0),
+            group2.id: (1, 0, 1),
+        }
+        assert Membership.query_counts_by_group_ids().count() == 2
+        assert Membership.query_counts_by_group_ids([group3.id]).count() == 0
+        with pytest.raises(AssertionError):
+            Membership.query_counts_by_group_ids('invalid')
+
+
+def test_membership_counters(example_group):
+    """Test denormalized membership counters."""
+    app = example_group
+    with app.app_context():
+        group = app.get_group()
+        admin = app.get_admin()
+        non_member = app.get_non_member()
+
+        def counters():
+            return (group.active_members_count, group.pending_requests_count,
+                    group.pending_invitations_count)
+
+        assert counters() == (1, 0, 0)
+
+        m1 = group.add_member(non_member, state=MembershipState.PENDING_ADMIN)
+        assert counters() == (1, 1, 0)
+        m2 = group.invite(admin)
+        assert counters() == (1, 1, 1)
+
+        m1.accept()
+        assert counters() == (2, 0, 1)
+        m2.reject()
+        assert counters() == (2, 0, 0)
+        group.remove_member(non_member)
+        assert counters() == (1, 0, 0)
+        group.remove_member(non_member)
+        assert counters() == (1, 0, 0)
+        assert group.members_count() == 1
+
+        # Failed creation does not change the counters.
+        with pytest.raises(IntegrityError):
+            group.add_member(app.get_member())
+        db.session.rollback()
+        group = app.get_group()
+        assert counters() == (1, 0, 0)
+
+        Group.query.filter_by(id=group.id).update(
+            {Group.active_members_count: 42})
+        assert Group.repair_counters([group.id]) == 1
+        assert counters() == (1, 0, 0)
+        assert Group.repair_counters() == 0
+        assert Group.repair_counters([group.id]) == 0
+
+        # Groups are repaired in chunks from the batched counts.
+        group2 = Group.create(name='test_group2')
+        group2.invite(non_member)
+        Group.query.update({Group.active_members_count: 7,
+                            Group.pending_invitations_count: 7})
+        assert Group.repair_counters(chunk_size=1) == 2
+        assert counters() == (1, 0, 0)
+        assert (group2.active_members_count,
+                group2.pending_invitations_count) == (0, 1)
+        with pytest.raises(AssertionError):
+            Group.repair_counters('invalid')
+
+
+def test_group_admin_closure(app):
+    """Test nested group administration."""
+    with app.app_context():
+        from invenio_groups.models import GroupAdminClosure
+
+        u1 = User(email='test1@example.com', password='test_password')
+        u2 = User(email='test2@example.com', password='test_password')
+        u3 = User(email='test3@example.com', password='test_password')
+        db.session.add_all([u1, u2, u3])
+        db.session.commit()
+
+        a = Group.create(name='a', admins=[u1])
+        b = Group.create(name='b', admins=[a])
+        c = Group.create(name='c', admins=[b])
+        a.add_member(u2)
+
+        def admins(group):
+            return set(
+                (ga.admin_type, ga.admin_id) for ga in
+                GroupAdminClosure.query_by_group(group))
+
+        assert admins(a) == set([('User', u1.id)])
+        assert admins(b) == set([
+            ('Group', a.id), ('User', u1.id), ('User', u2.id)])
+        assert admins(c) == set([
+            ('Group', a.id), ('Group', b.id), ('User', u1.id),
+            ('User', u2.id)])
+        assert c.is_admin(u1)
+        assert c.is_admin(u2)
+        assert c.is_admin(a)
+        assert not c.is_admin(u3)
+        assert set(GroupAdminClosure.administered_ids(u2)) == set(
+            [b.id, c.id])
+
+        # Pending requests of nested groups are visible.
+        c.add_member(u3, state=MembershipState.PENDING_ADMIN)
+        assert Membership.query_requests(u2).count() == 1
+        assert Membership.query_requests(u1).count() == 1
+        assert Group.query_by_user(u2).count() == 3
+
+        # Membership changes are propagated.
+        a.remove_member(u2)
+        assert not c.is_admin(u2)
+        assert Membership.query_requests(u2).count() == 0
+        m = a.add_member(u2, state=MembershipState.PENDING_ADMIN)
+        assert not c.is_admin(u2)
+        m.accept()
+        assert c.is_admin(u2)
+
+        # Admin changes are propagated.
+        b.remove_admin(a)
+        assert admins(c) == set([('Group', b.id)])
+        assert not c.is_admin(u1)
+        b.add_admin(a)
+        assert c.is_admin(u1)
+
+        # Cycles are supported.
+        a.add_admin(c)
+        assert ('Group', a.id) in admins(a)
+        assert a.is_admin(u2)
+
+        a.delete()
+        assert admins(b) == set()
+        assert admins(c) == set([('Group', b.id)])
+        assert GroupAdminClosure.query.filter_by(admin_type='Group',
+                                                 admin_id=a.id).count() == 0
+
+        GroupAdminClosure.query.delete()
+        assert len(GroupAdminClosure.rebuild()) == 1
+        assert admins(c) == set([('Group', b.id)])
+
+
+def test_group_admin_closure_membership_change(app):
+    """Test that a membership change only refreshes the changed user."""
+    with app.app_context():
+        from invenio_groups.models import GroupAdminClosure
+
+        u1 = User(email='test1@example.com', password='test_password')
+        u2 = User(email='test2@example.com', password='test_password')
+        u3 = User(email='test3@example.com', password='test_password')
+        db.session.add_all([u1, u2, u3])
+        db.session.commit()
+
+        a = Group.create(name='a')
+        b = Group.create(name='b', admins=[a])
+        c = Group.create(name='c', admins=[b])
+        a.add_member(u1)
+        a.add_member(u2)
+
+        def admins(group):
+            return set(
+                (ga.admin_type, ga.admin_id) for ga in
+                GroupAdminClosure.query_by_group(group))
+
+        # Make the rows of the other users stale: a full recomputation
+        # would restore them.
+        GroupAdminClosure.query.filter(
+            GroupAdminClosure.admin_type == 'User',
+            GroupAdminClosure.admin_id == u1.id,
+        ).delete()
+        GroupAdminClosure.query.filter_by(
+            admin_type='Group', admin_id=b.id).delete()
+
+        Membership.create(a, u3)
+        assert admins(b) == set([('Group', a.id), ('User', u2.id),
+                                 ('User', u3.id)])
+        assert admins(c) == set([('Group', a.id), ('User', u2.id),
+                                 ('User', u3.id)])
+
+        Membership.delete(a, u2)
+        assert admins(c) == set([('Group', a.id), ('User', u3.id)])
+
+
+def test_group_add_members(app):
+    """Test bulk insertion of memberships."""
+    with app.app_context():
+        users = [User(email='test{0}@example.com'.format(i),
+                      password='test_password') for i in range(5)]
+        db.session.add_all(users)
+        g = Group.create(name='test')
+        admin_group = Group.create(name='admins')
+        administered = Group.create(name='administered', admins=[g])
+        db.session.commit()
+        g.add_member(users[0], state=MembershipState.PENDING_USER)
+
+        result = g.add_members(
+            users[:3] + [users[3].id, users[3].id], chunk_size=2)
+        assert result == dict(added=3, skipped=1)
+        assert g.members_count() == 3
+        assert g.pending_invitations_count == 1
+        assert Membership.get(g, users[0]).state == \
+            MembershipState.PENDING_USER
+        assert Membership.get(g, users[1]).is_active()
+        assert g.is_member(users[3])
+        assert administered.is_admin(users[3])
+
+        result = g.add_members(
+            iter([users[3], users[4]]), state=MembershipState.PENDING_ADMIN)
+        assert result == dict(added=1, skipped=1)
+        assert g.pending_requests_count == 1
+        assert not administered.is_admin(users[4])
+
+        assert admin_group.add_members([]) == dict(added=0, skipped=0)
+        with pytest.raises(AssertionError):
+            g.add_members([users[4]], state='invalid')
+
+
+def test_membership_create_many_race(app, monkeypatch):
+    """Test bulk insertion racing with a concurrent insertion."""
+    with app.app_context():
+        users = [User(email='test{0}@example.com'.format(i),
+                      password='test_password') for i in range(3)]
+        db.session.add_all(users)
+        g = Group.create(name='test')
+        db.session.commit()
+        g.add_member(users[1], state=MembershipState.PENDING_ADMIN)
+        db.session.commit()
+
+        # The first lookup misses the membership, as if it was added
+        # concurrently.
+        query = db.Model.__dict__['query']
+        lookups = []
+
+        class MissingFirst(object):
+            def __get__(self, obj, owner):
+                lookups.append(owner)
+                result = query.__get__(obj, owner)
+                if len(lookups) == 1:
+                    result = result.filter(db.false())
+                return result
+
+        monkeypatch.setattr(Membership, 'query', MissingFirst())
+        created, existing = Membership.create_many(
+            g, users, state=MembershipState.PENDING_ADMIN)
+        monkeypatch.undo()
+        db.session.commit()
+
+        assert created == [users[0].id, users[2].id]
+        assert existing == [users[1].id]
+        assert Group.query.get(g.id).pending_requests_count == 3
+        assert Membership.search(
+            Membership.query_by_group(g, state=MembershipState.PENDING_ADMIN),
+            'test', group_or_id=g).count() == 3
+
+
+def test_membership_create_many_unknown_user(app):
+    """Test bulk insertion of a user which does not exist."""
+    with app.app_context():
+        user = User(email='test@example.com', password='test_password')
+        db.session.add(user)
+        g = Group.create(name='test')
+        db.session.commit()
+        if db.engine.name == 'sqlite':
+            db.session.execute('PRAGMA foreign_keys = ON')
+
+        with pytest.raises(IntegrityError):
+            Membership.create_many(g, [user.id, user.id + 1])
+        db.session.rollback()
+        assert Membership.query.count() == 0
+        assert Group.query.get(g.id).members_count() == 0
+
+
+def test_group_delete_in_chunks(app):
+    """Test chunked deletion of a group."""
+    with app.app_context():
+        from invenio_groups.models import GroupAdmin, GroupAdminClosure
+
+        users = [User(email='test{0}@example.com'.format(i),
+                      password='test_password') for i in range(5)]
+        db.session.add_all(users)
+        g = Group.create(name='test', admins=[users[0]])
+        administered = Group.create(name='administered', admins=[g])
+        g.add_members(users[:3])
+        g.add_members(users[3:], state=MembershipState.PENDING_ADMIN)
+        db.session.commit()
+        group_id, administered_id = g.id, administered.id
+        assert administered.is_admin(users[1])
+
+        calls = []
+
+        def progress(*args):
+            # Every committed chunk leaves the effective admins up to date.
+            assert set(GroupAdminClosure.query.filter_by(
+                group_id=administered_id).with_entities(
+                    GroupAdminClosure.admin_type, GroupAdminClosure.admin_id,
+            )) == GroupAdminClosure._resolve(administered_id)
+            calls.append(args)
+
+        deleted = g.delete_in_chunks(chunk_size=2, progress=progress)
+        assert deleted == 6
+        assert calls == [(2, 6), (4, 6), (5, 6), (6, 6), (6, 6)]
+
+        assert Group.query.get(group_id) is None
+        assert Membership.query.filter_by(id_group=group_id).count() == 0
+        assert GroupAdmin.query.filter_by(group_id=group_id).count() == 0
+        assert GroupAdmin.query.filter_by(admin_id=group_id).count() == 0
+        assert GroupAdminClosure.query.count() == 0
+        assert not Group.query.get(administered.id).is_admin(users[1])
+
+
+def test_group_admin_users_ids(example_group, count_queries):
+    """Test bulk lookup of the admins among members."""
+    app = example_group
+    with app.app_context():
+        from sqlalchemy.orm import selectinload
+
+        group = app.get_group()
+        admin = app.get_admin()
+        member = app.get_member()
+        admins = Group.create(name='admins', admins=[admin])
+        group.add_admin(admins)
+        group.add_member(admin)
+        u = User(email='nested@example.com', password='test_password')
+        db.session.add(u)
+        db.session.commit()
+        admins.add_member(u)
+        db.session.commit()
+
+        assert group.admin_users_ids() == set([admin.id, u.id])
+        assert group.admin_users_ids([member.id, admin.id]) == set(
+            [admin.id])
+        assert group.admin_users_ids([]) == set()
+
+        db.session.expunge_all()
+        with count_queries() as queries:
+            members = Membership.query_by_group(
+                group.id, with_invitations=True,
+                options=[selectinload(Membership.user)]).all()
+            assert set(m.user.email for m in members) == set(
+                ['test@example.com', 'test2@example.com'])
+        assert len(queries) == 2
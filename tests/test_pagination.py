@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2016 CERN.
+#
+# Invenio is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Pagination tests."""
+
+from __future__ import absolute_import, print_function
+
+from datetime import datetime
+
+import pytest
+from invenio_accounts.models import User
+from invenio_db import db
+
+from invenio_groups.models import Group, Membership, MembershipState
+from invenio_groups.pagination import decode_cursor, encode_cursor
+
+
+def _pages(paginate, **kwargs):
+    """Follow next cursors and collect the pages."""
+    pages = []
+    cursor = None
+    while True:
+        page = paginate(cursor=cursor, **kwargs)
+        pages.append(page)
+        if not page.has_next:
+            return pages
+        cursor = page.next_cursor
+
+
+def test_cursor_encoding():
+    """Test cursor encoding."""
+    now = datetime(2016, 1, 2, 3, 4, 5, 6)
+    cursor = encode_cursor(['a', 1, now], ['asc', 'desc', 'asc'])
+    assert '=' not in cursor
+    assert decode_cursor(cursor, ['asc', 'desc', 'asc']) == (
+        ['a', 1, now], False)
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, ['asc', 'asc', 'asc'])
+    with pytest.raises(ValueError):
+        decode_cursor('invalid', ['asc'])
+    with pytest.raises(ValueError):
+        decode_cursor(cursor + 'x', ['asc', 'desc', 'asc'])
+
+
+def test_membership_paginate(app):
+    """Test keyset pagination of group members."""
+    with app.app_context():
+        users = [User(email='test{0}@example.com'.format(i),
+                      password='test_password') for i in range(7)]
+        db.session.add_all(users)
+        g = Group.create(name='test')
+        db.session.commit()
+        g.add_members(users[:4])
+        g.add_members(users[4:], state=MembershipState.PENDING_USER)
+        db.session.commit()
+
+        def paginate(**kwargs):
+            return Membership.paginate(
+                Membership.query_by_group(g, with_invitations=True),
+                per_page=3, **kwargs)
+
+        def ids(pages):
+            return [[m.user_id for m in p.items] for p in pages]
+
+        active = sorted(u.id for u in users[:4])
+        pending = sorted(u.id for u in users[4:])
+
+        # ``M`` (active) sorts before ``U`` (pending user).
+        pages = _pages(paginate)
+        assert ids(pages) == [active[:3], active[3:] + pending[:2],
+                              pending[2:]]
+        assert not pages[0].has_prev
+        assert pages[1].has_prev
+        assert pages[0].total is None
+
+        # All keys descending.
+        pages = _pages(paginate, s='desc')
+        assert ids(pages) == [pending[::-1], active[:0:-1], active[:1]]
+
+        # Backward navigation returns the same pages.
+        prev = paginate(cursor=pages[2].prev_cursor, s='desc')
+        assert ids([prev]) == ids([pages[1]])
+        assert prev.has_next and prev.has_prev
+        prev = paginate(cursor=prev.prev_cursor, s='desc')
+        assert ids([prev]) == ids([pages[0]])
+        assert not prev.has_prev
+        assert prev.prev_cursor is None
+
+        pages = _pages(paginate, sort='user', s='desc')
+        assert sum(ids(pages), []) == sorted(active + pending, reverse=True)
+
+        pages = _pages(paginate, sort='created')
+        assert sorted(sum(ids(pages), [])) == sorted(active + pending)
+
+        with pytest.raises(ValueError):
+            paginate(cursor=pages[0].next_cursor, s='desc')
+        with pytest.raises(AssertionError):
+            paginate(sort='invalid')
+
+
+def test_group_paginate(app):
+    """Test keyset pagination of the groups of a user."""
+    with app.app_context():
+        user = User(email='test@example.com', password='test_password')
+        db.session.add(user)
+        db.session.commit()
+        names = ['c', 'a', 'e', 'b', 'd']
+        for name in names:
+            Group.create(name=name, admins=[user])
+        Group.create(name='other')
+        db.session.commit()
+
+        query = Group.query_by_user(user)
+        assert [g.name for g in query] == sorted(names)
+
+        pages = _pages(lambda **kwargs: Group.paginate(
+            query, per_page=2, **kwargs))
+        assert [[g.name for g in p.items] for p in pages] == [
+            ['a', 'b'], ['c', 'd'], ['e']]
+
+        prev = Group.paginate(query, per_page=2, cursor=pages[2].prev_cursor)
+        assert [g.name for g in prev.items] == ['c', 'd']
+
+        with pytest.raises(ValueError):
+            Group.paginate(query, cursor='invalid')
+
+
+def test_group_paginate_search(app):
+    """Test that search results are paginated by relevance."""
+    with app.app_context():
+        for name in ['xphys', 'phys', 'aphys', 'physics', 'other']:
+            Group.create(name=name)
+        Group.create(name='bio', description='biophysics')
+        db.session.commit()
+
+        query = Group.search(Group.query, 'phys')
+        pages = _pages(lambda **kwargs: Group.paginate(
+            query, per_page=2, q='phys', **kwargs))
+        assert [[g.name for g in p.items] for p in pages] == [
+            ['phys', 'physics'], ['aphys', 'xphys'], ['bio']]
+
+        prev = Group.paginate(query, per_page=2, q='phys',
+                              cursor=pages[2].prev_cursor)
+        assert [g.name for g in prev.items] == ['aphys', 'xphys']
+
+        with pytest.raises(ValueError):
+            Group.paginate(query, per_page=2, cursor=pages[1].next_cursor)
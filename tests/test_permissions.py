@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2016 CERN.
+#
+# Invenio is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Identity needs tests."""
+
+from __future__ import absolute_import, print_function
+
+import pytest
+from flask import session
+from flask_principal import AnonymousIdentity, Identity, identity_loaded
+from invenio_db import db
+
+from invenio_groups.models import Group, GroupAdmin, Membership
+from invenio_groups.permissions import GroupAdminNeed, GroupNeed, \
+    get_user_groups
+
+
+@pytest.fixture
+def app_config():
+    """Provide the identities with the needs of the groups."""
+    return dict(GROUPS_IDENTITY_NEEDS=True)
+
+
+def load(app, user_id):
+    """Load the identity of a user."""
+    identity = Identity(user_id)
+    identity_loaded.send(app, identity=identity)
+    return identity
+
+
+def test_identity_needs(example_group):
+    """Test needs of the groups of a user."""
+    app = example_group
+    with app.test_request_context():
+        group = app.get_group()
+        admin = load(app, app.get_admin().id)
+        member = load(app, app.get_member().id)
+        non_member = load(app, app.get_non_member().id)
+
+        assert GroupAdminNeed(group.id) in admin.provides
+        assert GroupNeed(group.id) not in admin.provides
+        assert GroupNeed(group.id) in member.provides
+        assert GroupAdminNeed(group.id) not in member.provides
+        assert not any(need.method.startswith('group')
+                       for need in non_member.provides)
+
+        anonymous = AnonymousIdentity()
+        identity_loaded.send(app, identity=anonymous)
+        assert anonymous.provides == set()
+
+        # Admins of an admin group are effective admins.
+        other = Group.create(name='other', admins=[group])
+        db.session.commit()
+        assert GroupAdminNeed(other.id) in load(
+            app, app.get_member().id).provides
+
+
+def test_identity_needs_session(example_group, count_queries):
+    """Test that the groups are kept in the session until they change."""
+    app = example_group
+    with app.test_request_context():
+        group = app.get_group()
+        member = app.get_member()
+        non_member = app.get_non_member()
+        assert get_user_groups(member.id) == ([group.id], [])
+
+        with count_queries('groups_members') as queries:
+            assert get_user_groups(member.id) == ([group.id], [])
+        assert queries == []
+
+        # Another user is fetched again.
+        assert get_user_groups(non_member.id) == ([], [])
+        GroupAdmin.create(group, non_member)
+        db.session.commit()
+        assert get_user_groups(non_member.id) == ([], [group.id])
+
+        # Changes replace the version stamp.
+        assert get_user_groups(member.id) == ([group.id], [])
+        Membership.delete(group, member)
+        db.session.commit()
+        assert GroupNeed(group.id) not in load(app, member.id).provides
+        assert session['invenio_groups_needs']['members'] == []
+
+        app.config['GROUPS_IDENTITY_SESSION_LIMIT'] = 0
+        assert get_user_groups(non_member.id) == ([], [group.id])
+        assert 'invenio_groups_needs' not in session
+
+
+def test_identity_needs_session_max_age(example_group):
+    """Test that old groups in the session are fetched again."""
+    app = example_group
+    with app.test_request_context():
+        group = app.get_group()
+        member = app.get_member()
+        assert get_user_groups(member.id) == ([group.id], [])
+
+        # Changes made by another process are not invalidated in the
+        # in-process cache backend of this one.
+        db.session.execute(Membership.__table__.delete())
+        db.session.commit()
+        assert get_user_groups(member.id) == ([group.id], [])
+
+        session['invenio_groups_needs']['loaded'] -= \
+            app.config['GROUPS_CACHE_TIMEOUT']
+        assert get_user_groups(member.id) == ([], [])
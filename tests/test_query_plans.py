@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2016 CERN.
+#
+# Invenio is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Query plan tests.
+
+Each query used on a hot path must be answered with index lookups, not with
+table or full index scans.
+"""
+
+from __future__ import absolute_import, print_function
+
+import re
+from datetime import datetime
+
+from invenio_accounts.models import User
+from invenio_db import db
+
+from invenio_groups.models import LOWER_EMAIL_INDEX_DIALECTS, Group, \
+    GroupAdmin, GroupAdminClosure, GroupChange, Membership, MembershipState
+
+
+def explain(query):
+    """Get the query plan of a query as text."""
+    sql = str(query.statement.compile(
+        dialect=db.engine.dialect, compile_kwargs={'literal_binds': True}))
+    if db.engine.name == 'postgresql':
+        # Tables of the tests are tiny, make scans unattractive.
+        db.session.execute('SET LOCAL enable_seqscan = off')
+        return '\n'.join(
+            row[0] for row in db.session.execute('EXPLAIN ' + sql))
+    return '\n'.join(
+        row[-1] for row in db.session.execute('EXPLAIN QUERY PLAN ' + sql))
+
+
+def assert_uses_index(query, *tables):
+    """Check that the tables are only accessed through indexes."""
+    plan = explain(query)
+    for table in tables:
+        if db.engine.name == 'postgresql':
+            assert not re.search(r'Seq Scan on {0}\b'.format(table), plan), \
+                plan
+            assert re.search(r'Index.* on {0}\b'.format(table), plan), plan
+        else:
+            assert not re.search(
+                r'SCAN (TABLE )?{0}\b'.format(table), plan), plan
+            assert re.search(
+                r'SEARCH (TABLE )?{0}\b'.format(table), plan), plan
+
+
+def test_membership_query_plans(example_group):
+    """Test query plans of membership queries."""
+    app = example_group
+    with app.app_context():
+        group = app.get_group()
+        admin = app.get_admin()
+        member = app.get_member()
+
+        assert_uses_index(Membership.query_by_group(group), 'groups_members')
+        assert_uses_index(
+            Membership.query_by_group(group, with_invitations=True),
+            'groups_members')
+        assert_uses_index(Membership.query_by_user(member), 'groups_members')
+        assert_uses_index(
+            Membership.query_invitations(member), 'groups_members')
+        assert_uses_index(
+            Membership.query_requests(admin),
+            'groups_members', 'groups_admin_closure')
+        assert_uses_index(
+            Membership.query_badge_counts(admin),
+            'groups', 'groups_members', 'groups_admin_closure')
+        search = Membership.search(
+            Membership.query_by_group(group), 'test', group_or_id=group)
+        assert_uses_index(search, 'groups_members', 'groups_members_search')
+        if db.engine.name == 'sqlite':
+            # The LIKE prefix is a range of the index.
+            assert 'token>? AND token<?' in explain(search)
+        assert_uses_index(
+            Membership.search(Membership.query_by_group(group), 'test'),
+            'groups_members', 'groups_members_search')
+        assert_uses_index(
+            Membership.query_by_group(group, with_invitations=True).order_by(
+                Membership.state, Membership.user_id).limit(10),
+            'groups_members')
+
+
+def test_membership_pagination_query_plans(example_group):
+    """Test that pages of members are read in the order of an index."""
+    app = example_group
+    with app.app_context():
+        group = app.get_group()
+        group.add_member(app.get_admin())
+        group.add_member(
+            app.get_non_member(), state=MembershipState.PENDING_USER)
+        db.session.commit()
+
+        for sort, with_invitations in (('state', True), ('user', False)):
+            for s in ('asc', 'desc'):
+                def paginate(cursor=None):
+                    return Membership.paginate(
+                        Membership.query_by_group(
+                            group, with_invitations=with_invitations),
+                        per_page=1, sort=sort, s=s, cursor=cursor)
+
+                page = paginate(paginate().next_cursor)
+                query = page.query.limit(page.per_page + 1)
+                assert_uses_index(query, 'groups_members')
+                plan = explain(query)
+                if db.engine.name == 'postgresql':
+                    assert not re.search(r'\bSort\b', plan), plan
+                else:
+                    assert 'TEMP B-TREE' not in plan, plan
+
+
+def test_admin_query_plans(example_group):
+    """Test query plans of admin queries."""
+    app = example_group
+    with app.app_context():
+        group = app.get_group()
+        admin = app.get_admin()
+
+        assert_uses_index(GroupAdmin.query_by_group(group), 'groups_admin')
+        assert_uses_index(GroupAdmin.query_by_admin(admin), 'groups_admin')
+        assert_uses_index(
+            GroupAdminClosure.query_by_group(group), 'groups_admin_closure')
+        assert_uses_index(
+            GroupAdminClosure.query_by_admin(admin), 'groups_admin_closure')
+
+
+def test_group_query_plans(example_group):
+    """Test query plans of group queries."""
+    app = example_group
+    with app.app_context():
+        admin = app.get_admin()
+
+        assert_uses_index(
+            Group.query_by_user(admin),
+            'groups', 'groups_members', 'groups_admin_closure')
+        assert_uses_index(
+            Group.query_by_user(admin, with_pending=True),
+            'groups', 'groups_members', 'groups_admin_closure')
+        assert_uses_index(
+            Group.query_roles_by_user(admin.id),
+            'groups_members', 'groups_admin_closure')
+        if db.engine.name == 'postgresql':
+            plan = explain(Group.search(Group.query, 'test'))
+            assert not re.search(r'Seq Scan on groups\b', plan), plan
+            assert re.search(r'Index.* on ix_groups_name_trgm\b', plan), plan
+            assert re.search(
+                r'Index.* on ix_groups_description_trgm\b', plan), plan
+        else:
+            assert_uses_index(
+                Group.search(Group.query, 'test'), 'groups_search_ngram')
+
+
+def test_sync_query_plans(example_group):
+    """Test query plans of the synchronization feeds."""
+    app = example_group
+    with app.app_context():
+        since = datetime(2016, 1, 1)
+        assert_uses_index(Group.query_modified_since(since), 'groups')
+        assert_uses_index(
+            Membership.query_modified_since(since), 'groups_members')
+        assert_uses_index(
+            GroupChange.query_tombstones(since), 'groups_change')
+
+
+def test_user_query_plans(app):
+    """Test query plans of the user lookups by email."""
+    with app.app_context():
+        if db.engine.name in LOWER_EMAIL_INDEX_DIALECTS:
+            assert_uses_index(User.query.filter(
+                db.func.lower(User.email).in_([u'test@example.com'])),
+                'accounts_user')
@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2016 CERN.
+#
+# Invenio is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Signals tests."""
+
+from __future__ import absolute_import, print_function
+
+from contextlib import contextmanager
+
+from invenio_accounts.models import User
+from invenio_db import db
+
+from invenio_groups import signals
+from invenio_groups.models import Group, GroupAdmin, Membership, \
+    MembershipState
+
+SIGNALS = ('group_created', 'group_updated', 'group_deleted',
+           'membership_created', 'membership_accepted', 'membership_updated',
+           'membership_rejected', 'membership_removed', 'admin_added',
+           'admin_removed')
+
+
+@contextmanager
+def recorded(app):
+    """Record the signals sent by an application."""
+    events = []
+
+    def _receiver(name):
+        def receiver(sender, **kwargs):
+            events.append((name, kwargs))
+        return receiver
+
+    receivers = [(getattr(signals, name), _receiver(name))
+                 for name in SIGNALS]
+    for signal, receiver in receivers:
+        signal.connect(receiver, sender=app)
+    try:
+        yield events
+    finally:
+        for signal, receiver in receivers:
+            signal.disconnect(receiver, sender=app)
+
+
+def test_signals_after_commit(app):
+    """Test that signals are sent once changes are committed."""
+    with app.app_context():
+        admin = User(email='admin@example.com', password='test_password')
+        user = User(email='user@example.com', password='test_password')
+        db.session.add_all([admin, user])
+        db.session.commit()
+
+        with recorded(app) as events:
+            group = Group.create(name='test', admins=[admin])
+            Membership.create(group, user, MembershipState.PENDING_ADMIN)
+            assert events == []
+            db.session.commit()
+            assert events == [
+                ('group_created', dict(groups_ids=[group.id])),
+                ('admin_added', dict(admins=[(group.id, 'User', admin.id)])),
+                ('membership_created', dict(memberships=[
+                    (group.id, user.id, MembershipState.PENDING_ADMIN)])),
+            ]
+
+            del events[:]
+            group.update(description='updated')
+            Membership.query.filter_by(group=group).one().accept()
+            db.session.commit()
+            assert events == [
+                ('group_updated', dict(groups_ids=[group.id])),
+                ('membership_accepted', dict(memberships=[
+                    (group.id, user.id, MembershipState.ACTIVE)])),
+            ]
+
+            del events[:]
+            group_id = group.id
+            group.delete()
+            db.session.commit()
+            assert events == [
+                ('membership_removed', dict(memberships=[
+                    (group_id, user.id, MembershipState.ACTIVE)])),
+                ('admin_removed', dict(admins=[
+                    (group_id, 'User', admin.id)])),
+                ('group_deleted', dict(groups_ids=[group_id])),
+            ]
+
+
+def test_signals_rollback(app):
+    """Test that rolled back changes send no signals."""
+    with app.app_context():
+        user = User(email='user@example.com', password='test_password')
+        db.session.add(user)
+        group = Group.create(name='test')
+        db.session.commit()
+
+        with recorded(app) as events:
+            Membership.create(group, user, MembershipState.PENDING_USER)
+            db.session.rollback()
+            assert events == []
+
+            membership = Membership.create(
+                group, user, MembershipState.PENDING_USER)
+            try:
+                with db.session.begin_nested():
+                    membership.reject()
+                    raise ValueError()
+            except ValueError:
+                pass
+            GroupAdmin.create(group, user)
+            db.session.commit()
+            assert events == [
+                ('membership_created', dict(memberships=[
+                    (group.id, user.id, MembershipState.PENDING_USER)])),
+                ('admin_added', dict(admins=[(group.id, 'User', user.id)])),
+            ]
+
+            del events[:]
+            with db.session.begin_nested():
+                GroupAdmin.delete(group, user)
+            db.session.rollback()
+            db.session.close()
+            assert events == []
+
+
+def test_signals_batched(app):
+    """Test that bulk operations send one signal per batch."""
+    with app.app_context():
+        users = [User(email='user{0}@example.com'.format(i),
+                      password='test_password') for i in range(5)]
+        db.session.add_all(users)
+        group = Group.create(name='test')
+        db.session.commit()
+        ids = [u.id for u in users]
+
+        with recorded(app) as events:
+            Membership.create_many(
+                group, ids[:3], MembershipState.PENDING_USER, chunk_size=2)
+            GroupAdmin.create_many(group, ids[3:], chunk_size=1)
+            db.session.commit()
+            assert events == [
+                ('membership_created', dict(memberships=[
+                    (group.id, user_id, MembershipState.PENDING_USER)
+                    for user_id in ids[:3]])),
+                ('admin_added', dict(admins=[
+                    (group.id, 'User', user_id) for user_id in ids[3:]])),
+            ]
+
+            del events[:]
+            Membership.upsert_many(group, {
+                ids[0]: MembershipState.ACTIVE,
+                ids[1]: MembershipState.PENDING_ADMIN,
+                ids[2]: MembershipState.PENDING_USER,
+                ids[3]: MembershipState.ACTIVE,
+            }, chunk_size=2)
+            db.session.commit()
+            assert events == [
+                ('membership_created', dict(memberships=[
+                    (group.id, ids[3], MembershipState.ACTIVE)])),
+                ('membership_accepted', dict(memberships=[
+                    (group.id, ids[0], MembershipState.ACTIVE)])),
+                ('membership_updated', dict(memberships=[
+                    (group.id, ids[1], MembershipState.PENDING_ADMIN)])),
+            ]
+
+            del events[:]
+            Membership.delete_many(group, ids, chunk_size=2)
+            db.session.commit()
+            assert len(events) == 1
+            assert events[0][0] == 'membership_removed'
+            assert sorted(events[0][1]['memberships']) == [
+                (group.id, ids[0], MembershipState.ACTIVE),
+                (group.id, ids[1], MembershipState.PENDING_ADMIN),
+                (group.id, ids[2], MembershipState.PENDING_USER),
+                (group.id, ids[3], MembershipState.ACTIVE),
+            ]
+
+
+def test_signals_failing_receiver(app):
+    """Test that a failing receiver does not prevent other signals."""
+    with app.app_context():
+        def fail(sender, **kwargs):
+            raise ValueError()
+
+        with recorded(app) as events:
+            with signals.group_created.connected_to(fail, sender=app):
+                group = Group.create(name='test')
+                group.update(description='updated')
+                db.session.commit()
+            assert events == [
+                ('group_created', dict(groups_ids=[group.id])),
+                ('group_updated', dict(groups_ids=[group.id])),
+            ]
@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2016 CERN.
+#
+# Invenio is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Incremental synchronization tests."""
+
+from __future__ import absolute_import, print_function
+
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from flask import url_for
+from invenio_accounts.models import User
+from invenio_db import db
+
+from invenio_groups.models import Group, Membership, MembershipState
+from invenio_groups.sync import changes, parse_timestamp
+
+
+def login(client, user_id):
+    """Log in a user in the test client."""
+    with client.session_transaction() as sess:
+        sess['user_id'] = str(user_id)
+        sess['_user_id'] = str(user_id)
+        sess['_fresh'] = True
+
+
+def test_parse_timestamp():
+    """Test parsing of dates."""
+    assert parse_timestamp('2016-01-02') == datetime(2016, 1, 2)
+    assert parse_timestamp('2016-01-02T03:04:05') == \
+        datetime(2016, 1, 2, 3, 4, 5)
+    assert parse_timestamp('2016-01-02T03:04:05.000006') == \
+        datetime(2016, 1, 2, 3, 4, 5, 6)
+    with pytest.raises(ValueError):
+        parse_timestamp('yesterday')
+
+
+def test_sync_changes(example_group):
+    """Test feeds of modified groups and memberships."""
+    app = example_group
+    with app.app_context():
+        group = app.get_group()
+        member = app.get_member()
+        non_member = app.get_non_member()
+        old = datetime(2016, 1, 1)
+        Group.query.update({Group.modified: old})
+        Membership.query.update({Membership.modified: old})
+        db.session.commit()
+
+        page = changes('groups')
+        assert [g['id'] for g in page['items']] == [group.id]
+        assert page['items'][0]['modified'] == old.isoformat()
+        assert not page['has_more']
+        assert changes('groups', since=old + timedelta(seconds=1)) == dict(
+            items=[], cursor=None, has_more=False)
+
+        page = changes('memberships', since=old)
+        assert page['items'] == [dict(
+            group_id=group.id, user_id=member.id, state='M',
+            created=page['items'][0]['created'], modified=old.isoformat())]
+        cursor = page['cursor']
+        assert changes('memberships', cursor=cursor) == dict(
+            items=[], cursor=cursor, has_more=False)
+
+        # Resume from the cursor of the previous synchronization.
+        Membership.create(group, non_member, MembershipState.PENDING_ADMIN)
+        group.update(description='changed')
+        db.session.commit()
+        page = changes('memberships', cursor=cursor)
+        assert [(m['user_id'], m['state']) for m in page['items']] == [
+            (non_member.id, 'A')]
+        page = changes('groups', cursor=changes('groups')['cursor'])
+        assert page['items'] == []
+        page = changes('groups', since=old + timedelta(seconds=1))
+        assert page['items'][0]['description'] == 'changed'
+
+        with pytest.raises(ValueError):
+            changes('groups', cursor='invalid')
+
+
+def test_sync_deletions(example_group):
+    """Test feed of tombstones."""
+    app = example_group
+    with app.app_context():
+        group = app.get_group()
+        group_id = group.id
+        member_id = app.get_member().id
+        assert changes('deletions')['items'] == []
+
+        users = [User(email='user{0}@example.com'.format(i),
+                      password='test_password') for i in range(3)]
+        db.session.add_all(users)
+        db.session.commit()
+        Membership.create_many(group, users)
+        Membership.delete_many(group, users[:2])
+        db.session.commit()
+
+        page = changes('deletions', per_page=1)
+        assert page['has_more']
+        assert [(c['operation'], c['principal_id']) for c in page['items']] \
+            == [('membership-removed', users[0].id)]
+        page = changes('deletions', cursor=page['cursor'])
+        assert [(c['operation'], c['principal_id']) for c in page['items']] \
+            == [('membership-removed', users[1].id)]
+        cursor = page['cursor']
+
+        group.delete()
+        db.session.commit()
+        page = changes('deletions', cursor=cursor)
+        assert sorted(
+            (c['operation'], c['group_id'], c['principal_id'], c['state'])
+            for c in page['items']
+        ) == sorted([
+            ('membership-removed', group_id, member_id, 'M'),
+            ('membership-removed', group_id, users[2].id, 'M'),
+            ('group-deleted', group_id, group_id, None),
+        ])
+        assert changes('deletions', since=datetime.now() + timedelta(
+            seconds=1))['items'] == []
+
+
+def test_sync_view(example_group):
+    """Test the synchronization endpoint."""
+    app = example_group
+    with app.app_context():
+        datastore = app.extensions['security'].datastore
+        admin = app.get_admin()
+        datastore.add_role_to_user(admin, datastore.create_role(name='admin'))
+        db.session.commit()
+        admin_id = admin.id
+        member_id = app.get_member().id
+        group_id = app.get_group().id
+
+    with app.test_request_context():
+        groups_url = url_for('invenio_groups.sync', feed='groups')
+        members_url = url_for('invenio_groups.sync', feed='memberships',
+                              per_page=0, since='2016-01-01')
+        invalid_url = url_for('invenio_groups.sync', feed='invalid')
+        bad_since_url = url_for('invenio_groups.sync', feed='groups',
+                                since='yesterday')
+        bad_cursor_url = url_for('invenio_groups.sync', feed='groups',
+                                 cursor='invalid')
+
+    client = app.test_client()
+    login(client, member_id)
+    assert client.get(groups_url).status_code == 403
+
+    login(client, admin_id)
+    res = client.get(groups_url)
+    assert res.status_code == 200
+    data = json.loads(res.get_data(as_text=True))
+    assert [g['id'] for g in data['items']] == [group_id]
+    assert data['cursor']
+
+    res = client.get(members_url)
+    assert res.status_code == 200
+    data = json.loads(res.get_data(as_text=True))
+    assert len(data['items']) == 1
+    assert not data['has_more']
+
+    assert client.get(invalid_url).status_code == 404
+    assert client.get(bad_since_url).status_code == 400
+    assert client.get(bad_cursor_url).status_code == 400
+
+    app.config['GROUPS_SYNC_ROLE'] = None
+    assert client.get(groups_url).status_code == 404
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2016 CERN.
+#
+# Invenio is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Task tests."""
+
+from __future__ import absolute_import, print_function
+
+from invenio_db import db
+
+from invenio_groups.jobs import submit_job
+from invenio_groups.models import Group, JobStatus, Membership
+from invenio_groups.tasks import delete_group, run_job
+
+
+class Executor(object):
+    """Executor leaving the jobs pending."""
+
+    def submit(self, job_id):
+        """Do nothing."""
+
+
+def test_delete_group(example_group):
+    """Test delete_group task."""
+    app = example_group
+    with app.app_context():
+        group_id = app.get_group().id
+        assert delete_group(group_id, chunk_size=1) == 2
+        assert Group.query.get(group_id) is None
+        assert Membership.query.filter_by(id_group=group_id).count() == 0
+        assert delete_group(group_id) is None
+
+
+def test_run_job(example_group):
+    """Test run_job task."""
+    app = example_group
+    with app.app_context():
+        group = app.get_group()
+        user = app.get_non_member()
+        job = submit_job(Executor(), 'add_members', group,
+                         users_ids=[user.id])
+        db.session.commit()
+        assert run_job(job.id) == JobStatus.SUCCESS
+        assert app.get_group().is_member(user)
+        assert run_job(job.id) is None
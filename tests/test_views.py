@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Invenio.
+# Copyright (C) 2016 CERN.
+#
+# Invenio is free software; you can redistribute it
+# and/or modify it under the terms of the GNU General Public License as
+# published by the Free Software Foundation; either version 2 of the
+# License, or (at your option) any later version.
+#
+# Invenio is distributed in the hope that it will be
+# useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Invenio; if not, write to the
+# Free Software Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+# MA 02111-1307, USA.
+#
+# In applying this license, CERN does not
+# waive the privileges and immunities granted to it by virtue of its status
+# as an Intergovernmental Organization or submit itself to any jurisdiction.
+
+"""Views tests."""
+
+from __future__ import absolute_import, print_function
+
+from flask import url_for
+from invenio_accounts.models import User
+from invenio_db import db
+
+
+def login(client, user):
+    """Log in a user in the test client."""
+    with client.session_transaction() as sess:
+        sess['user_id'] = str(user.id)
+        sess['_user_id'] = str(user.id)
+        sess['_fresh'] = True
+
+
+def test_index(example_group):
+    """Test groups listing."""
+    app = example_group
+    with app.test_request_context():
+        with app.test_client() as client:
+            login(client, app.get_admin())
+            res = client.get(url_for('invenio_groups.index'))
+            assert res.status_code == 200
+            assert b'test_group' in res.data
+            assert url_for(
+                'invenio_groups.manage',
+                group_id=app.get_group().id).encode('utf-8') in res.data
+
+            res = client.get(url_for('invenio_groups.index', cursor='x'))
+            assert res.status_code == 400
+
+
+def test_members(example_group):
+    """Test cursor pagination of the members view."""
+    app = example_group
+    with app.app_context():
+        group = app.get_group()
+        users = [User(email='member{0}@example.com'.format(i),
+                      password='test_password') for i in range(5)]
+        db.session.add_all(users)
+        db.session.commit()
+        group.add_members(users)
+        db.session.commit()
+        group_id = group.id
+
+    with app.test_request_context():
+        with app.test_client() as client:
+            login(client, app.get_admin())
+            url = url_for('invenio_groups.members', group_id=group_id,
+                          per_page=4)
+            res = client.get(url)
+            assert res.status_code == 200
+            assert b'out of 6' in res.data
+            assert b'title="next"' in res.data
+            assert b'member0@example.com' in res.data
+            assert b'member4@example.com' not in res.data
+
+            res = client.get(url_for(
+                'invenio_groups.members', group_id=group_id, per_page=4,
+                q='member'))
+            assert res.status_code == 200
+            # Search results are capped instead of paginated.
+            assert b'Displaying 5 items' in res.data
+            assert b'member4@example.com' in res.data
+
+            res = client.get(url_for(
+                'invenio_groups.members', group_id=group_id,
+                cursor='invalid'))
+            assert res.status_code == 400
+
+
+def test_requests_and_invitations(example_group):
+    """Test cursor pagination of pending requests and invitations."""
+    from invenio_groups.models import Group, MembershipState
+    app = example_group
+    with app.app_context():
+        admin = app.get_admin()
+        users = [User(email='pending{0}@example.com'.format(i),
+                      password='test_password') for i in range(3)]
+        db.session.add_all(users)
+        db.session.commit()
+        app.get_group().add_members(
+            users, state=MembershipState.PENDING_ADMIN)
+        for i in range(3):
+            Group.create(name='invited{0}'.format(i)).add_member(
+                admin, state=MembershipState.PENDING_USER)
+        db.session.commit()
+
+    with app.test_request_context():
+        with app.test_client() as client:
+            login(client, app.get_admin())
+            res = client.get(url_for('invenio_groups.requests', per_page=2))
+            assert res.status_code == 200
+            assert b'Displaying 2 items out of 3' in res.data
+            assert b'pending0@example.com' in res.data
+            assert b'pending2@example.com' not in res.data
+            assert b'title="next"' in res.data
+
+            res = client.get(url_for('invenio_groups.invitations',
+                                     per_page=2))
+            assert res.status_code == 200
+            assert b'Displaying 2 items out of 3' in res.data
+            assert b'invited0' in res.data
+            assert b'invited2' not in res.data
+
+            res = client.get(url_for('invenio_groups.requests',
+                                     cursor='invalid'))
+            assert res.status_code == 400
+
+
+def test_members_queries(example_group, count_queries):
+    """Test the members view runs a constant number of queries."""
+    app = example_group
+    with app.app_context():
+        group = app.get_group()
+        users = [User(email='member{0}@example.com'.format(i),
+                      password='test_password') for i in range(6)]
+        db.session.add_all(users)
+        db.session.commit()
+        group.add_members(users + [app.get_admin()])
+        db.session.commit()
+        group_id = group.id
+
+    def members_queries(client, per_page):
+        with app.app_context(), count_queries('^SELECT') as queries:
+            res = client.get(url_for('invenio_groups.members',
+                                     group_id=group_id, per_page=per_page))
+        assert res.status_code == 200
+        # Admins cannot be removed.
+        assert res.data.count(b'Remove') == per_page - 1
+        return len(queries)
+
+    with app.test_request_context():
+        with app.test_client() as client:
+            login(client, app.get_admin())
+            # The first request stores the groups of the user in the session.
+            members_queries(client, 2)
+            assert members_queries(client, 2) == members_queries(client, 6)
+
+
+def test_export_members(example_group):
+    """Test streamed export of group members."""
+    app = example_group
+    with app.test_request_context():
+        admin, member = app.get_admin(), app.get_member()
+        url = url_for('invenio_groups.export_members',
+                      group_id=app.get_group().id)
+
+    # Streamed responses cannot be used with a context preserving client.
+    client = app.test_client()
+    login(client, admin)
+    res = client.get(url)
+    assert res.status_code == 200
+    assert res.mimetype == 'text/csv'
+    assert b'test2@example.com' in res.data
+
+    res = client.get(url + '?format=jsonl')
+    assert res.status_code == 200
+    assert res.data.count(b'\n') == 1
+
+    res = client.get(url + '?format=xml')
+    assert res.status_code == 400
+
+    login(client, member)
+    res = client.get(url)
+    assert res.status_code == 403
+
+    with app.app_context():
+        group = app.get_group()
+        group.is_managed = True
+        db.session.commit()
+    login(client, admin)
+    res = client.get(url)
+    assert res.status_code == 200
+    assert b'test2@example.com' in res.data
+
+
+def test_delete(example_group, monkeypatch):
+    """Test large groups are deleted in the background."""
+    from invenio_groups import views
+    from invenio_groups.models import Group
+
+    app = example_group
+    app.config['GROUPS_DELETE_SYNC_LIMIT'] = 0
+    delayed = []
+    monkeypatch.setattr(views.delete_group, 'delay', delayed.append)
+
+    with app.test_request_context():
+        group_id = app.get_group().id
+        url = url_for('invenio_groups.delete', group_id=group_id)
+        with app.test_client() as client:
+            login(client, app.get_admin())
+            res = client.post(url)
+            assert res.status_code == 302
+            assert delayed == [group_id]
+            assert Group.query.get(group_id) is not None
+
+            app.config['GROUPS_DELETE_SYNC_LIMIT'] = 1
+            res = client.post(url)
+            assert res.status_code == 302
+            assert delayed == [group_id]
+            assert Group.query.get(group_id) is None